@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark directory scanning: the scandir-based scan_directory against the
+previous glob + is_file + stat implementation, and recursive scans of a
+directory tree with different numbers of threads.
+
+Usage:
+    python benchmark_scan.py [--files N] [--repeat N] [--directory PATH]
+                             [--tree] [--workers 1 2 4 8] [--latency MS]
+
+Without --directory a temporary folder with --files empty files is created
+(spread over nested folders with --tree). Stat calls are counted by
+wrapping os.stat (used by Path.stat/is_file) and the DirEntry.stat of
+every os.scandir entry. Thread scaling shows best on network shares, where
+each listing waits on the server; --latency adds such a wait to every
+directory listing to simulate one.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+from src.models.file_model import FileModel
+from src.utils.file_utils import iter_directory, scan_directory
+
+
+def scan_directory_glob(directory_path: str) -> List[FileModel]:
+    """The previous scan_directory, kept for comparison"""
+    path = Path(directory_path)
+    if not path.exists() or not path.is_dir():
+        return []
+
+    files = []
+    for file_path in path.glob("*"):
+        if file_path.is_file():
+            files.append(FileModel(file_path))
+
+    files.sort(key=lambda x: x.name.lower())
+    return files
+
+
+class _EagerFileModel:
+    """The previous FileModel, kept for comparison"""
+
+    def __init__(self, file_path: Path, file_stat: os.stat_result,
+                 relative_path: Optional[str] = None):
+        self.path = file_path
+        self.name = file_path.name
+        self.relative_path = relative_path or self.name
+        self.extension = file_path.suffix.lower()
+        self.filename_without_ext = file_path.stem
+        self.size = file_stat.st_size
+        self.mod_time = file_stat.st_mtime
+        self.mod_time_formatted = datetime.fromtimestamp(
+            file_stat.st_mtime).strftime('%Y-%m-%d %H:%M')
+
+
+class _CountingEntry:
+    """DirEntry proxy that counts stat() calls"""
+
+    def __init__(self, entry: os.DirEntry, counter: List[int]):
+        self._entry = entry
+        self._counter = counter
+        self.name = entry.name
+        self.path = entry.path
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        self._counter[0] += 1
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def __getattr__(self, name: str):
+        return getattr(self._entry, name)
+
+
+class _CountingScandir:
+    """Context manager and iterator over counted scandir entries"""
+
+    def __init__(self, scandir, path, counter: List[int]):
+        self._iterator = scandir(path)
+        self._counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._iterator.close()
+
+    def __iter__(self):
+        return (_CountingEntry(entry, self._counter) for entry in self._iterator)
+
+
+@contextmanager
+def count_stat_calls() -> Iterator[List[int]]:
+    """Count stat calls made through os.stat and scandir entries"""
+    counter = [0]
+    original_stat = os.stat
+    original_scandir = os.scandir
+
+    def counting_stat(*args, **kwargs):
+        counter[0] += 1
+        return original_stat(*args, **kwargs)
+
+    os.stat = counting_stat
+    os.scandir = lambda path=".": _CountingScandir(original_scandir, path, counter)
+    try:
+        yield counter
+    finally:
+        os.stat = original_stat
+        os.scandir = original_scandir
+
+
+def benchmark(directory: str, repeat: int) -> None:
+    """Time both scanners and print their stat call counts"""
+    for label, scan in (("glob + stat", scan_directory_glob),
+                        ("scandir", scan_directory)):
+        with count_stat_calls() as counter:
+            count = len(scan(directory))
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scan(directory)
+            best = min(best, time.perf_counter() - start)
+
+        print(f"{label:12} {count:8d} files  {counter[0]:8d} stat calls  "
+              f"{best * 1000:9.1f} ms")
+
+
+@contextmanager
+def listing_latency(seconds: float) -> Iterator[None]:
+    """Delay every os.scandir call, like a directory listing over a network"""
+    original_scandir = os.scandir
+
+    def slow_scandir(path="."):
+        time.sleep(seconds)
+        return original_scandir(path)
+
+    os.scandir = slow_scandir
+    try:
+        yield
+    finally:
+        os.scandir = original_scandir
+
+
+def benchmark_tree(directory: str, repeat: int, workers: List[int]) -> None:
+    """Time recursive scans with each number of threads"""
+    for count in workers:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = sum(1 for _ in iter_directory(directory, workers=count))
+            best = min(best, time.perf_counter() - start)
+
+        print(f"{count:3d} threads  {found:8d} files  {best * 1000:9.1f} ms  "
+              f"{found / best:10.0f} files/s")
+
+
+def create_tree(directory: str, files: int, fanout: int = 8, per_folder: int = 50) -> None:
+    """Fill a folder with empty files spread over nested subfolders"""
+    folders = [directory]
+    for i in range(files):
+        if i % per_folder == 0 and i:
+            # Breadth-first: each folder gets up to fanout subfolders
+            parent = folders[(len(folders) - 1) // fanout]
+            folders.append(os.path.join(parent, f"folder_{len(folders):05d}"))
+            os.mkdir(folders[-1])
+        open(os.path.join(folders[-1], f"document_{i:07d}.pdf"), "wb").close()
+
+
+def benchmark_memory(files: int) -> None:
+    """Measure the memory held by FileModels for a generated file list"""
+    file_stat = os.stat(__file__)
+    base = os.path.join(tempfile.gettempdir(), "share", "inbound", "project_documents")
+    relative_paths = [os.path.join(f"folder_{i % 50:02d}", f"document_{i:07d}.pdf")
+                      for i in range(files)]
+    paths = [os.path.join(base, relative_path) for relative_path in relative_paths]
+
+    builders: List[Callable[[str, str], object]] = [
+        lambda path, relative_path: _EagerFileModel(Path(path), file_stat, relative_path),
+        lambda path, relative_path: FileModel(path, file_stat, relative_path),
+    ]
+    for label, build in zip(("eager", "slotted"), builders):
+        # Paths and relative paths are shared input, so not counted
+        tracemalloc.start()
+        start = time.perf_counter()
+        models = [build(path, relative_path) for path, relative_path in zip(paths, relative_paths)]
+        elapsed = time.perf_counter() - start
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del models
+
+        print(f"{label:8} {files:8d} files  {held / 2 ** 20:9.1f} MB  "
+              f"{held / files:6.0f} bytes/file  {elapsed * 1000:9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=100000,
+                        help="number of files in the generated folder")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed runs per scanner (the best is reported)")
+    parser.add_argument("--directory", help="existing folder to scan instead")
+    parser.add_argument("--tree", action="store_true",
+                        help="benchmark recursive scans with --workers threads")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="thread counts for --tree")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="simulated delay per directory listing in --tree, in ms")
+    parser.add_argument("--memory", action="store_true",
+                        help="measure the memory held by --files FileModels")
+    args = parser.parse_args()
+
+    if args.memory:
+        benchmark_memory(args.files)
+        return
+
+    def run(directory: str) -> None:
+        if not args.tree:
+            benchmark(directory, args.repeat)
+            return
+        with listing_latency(args.latency / 1000):
+            benchmark_tree(directory, args.repeat, args.workers)
+
+    if args.directory:
+        run(args.directory)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="scan_benchmark_") as directory:
+        if args.tree:
+            create_tree(directory, args.files)
+        else:
+            for i in range(args.files):
+                open(os.path.join(directory, f"document_{i:07d}.pdf"), "wb").close()
+            os.mkdir(os.path.join(directory, "subfolder"))
+        run(directory)
+
+
+if __name__ == "__main__":
+    main()
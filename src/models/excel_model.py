@@ -5,55 +5,940 @@
 Excel data model for representing Excel spreadsheet data
 """
 
+import hashlib
+import itertools
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional, Tuple
+from openpyxl import load_workbook
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Sequence, Tuple, Union
+
+from src.models.file_model import FileModel
+from src.models.match_index import MatchIndex, FUZZY_TIME_BUDGET
+from src.models.name_buffer import NameBuffer
+from src.utils.cache_utils import FrameCache, LRUCache
+from src.utils.file_utils import sniff_csv_format
+from src.utils.string_utils import (DEFAULT_NORMALIZATION, NORMALIZATION_STEPS,
+                                    format_value, normalize_name, normalize_series)
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE: Optional[str] = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = None
+
+class LoadCancelled(Exception):
+    """Raised inside load_data when loading is cancelled"""
+
+
+# Sentinel for match cache misses, since None is a cached "no match"
+_NOT_CACHED = object()
+
+# Most filename segments tried against a composite key; the number of
+# lookups grows with the permutations of this many segments
+MAX_KEY_SEGMENTS = 8
+
+# Rows per chunk when streaming a workbook
+STREAM_CHUNK_ROWS = 10000
+
+# Limits for the per-column caches of normalized names and match indexes.
+# The index of a 200k-row name column takes about 50 MB with partial
+# lookups and 180 MB with fuzzy ones, so several columns fit.
+NORMALIZED_CACHE_SIZE = 16
+INDEX_CACHE_SIZE = 8
+INDEX_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Text columns with at most this many distinct values per row are stored
+# as categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+# Text columns holding only dates in this form are stored as datetimes
+ISO_DATE_PATTERN = r"\d{4}-\d{2}-\d{2}"
+
+# Match index (or name buffer) and fuzzy threshold of a match_all worker
+# process. Only set inside the workers, by _init_match_worker.
+_worker_state: Optional[Tuple[Union[MatchIndex, NameBuffer], Optional[float]]] = None
+
+
+def _match_pool_context() -> multiprocessing.context.BaseContext:
+    """
+    Get the multiprocessing context for match_all worker pools
+
+    Workers are started by a fork server (or spawned where there is none)
+    rather than forked: forking the threaded Tk application could copy
+    locks held by its other threads and deadlock the workers.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _init_match_worker(name_index: Union[MatchIndex, NameBuffer],
+                       fuzzy_threshold: Optional[float]) -> None:
+    """Receive the match index once, when a worker process starts"""
+    global _worker_state
+    _worker_state = (name_index, fuzzy_threshold)
+
+
+def _match_stems_in_worker(stems: List[str]) -> List[Tuple[Optional[int], Optional[str]]]:
+    """Run the fallback matching for a chunk of stems in a worker process"""
+    name_index, fuzzy_threshold = _worker_state  # type: ignore
+    return [_match_fallback(name_index, fuzzy_threshold, stem) for stem in stems]
+
+
+def _match_fallback(name_index: Union[MatchIndex, NameBuffer], fuzzy_threshold: Optional[float],
+                    stem: str, time_budget: Optional[float] = None
+                    ) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Match a normalized stem that has no exact match
+
+    Args:
+        name_index: Index over the name column; a NameBuffer is enough
+                    when fuzzy_threshold is None
+        fuzzy_threshold: Minimum fuzzy score, or None to skip fuzzy matching
+        stem: Normalized filename without extension
+        time_budget: Time limit for the fuzzy lookup, or None for an
+                     exhaustive, deterministic lookup
+
+    Returns:
+        Tuple of the matched row position and match kind, or (None, None)
+    """
+    idx = name_index.find_partial(stem)
+    if idx is not None:
+        return idx, "partial"
+
+    if fuzzy_threshold is not None:
+        candidates = name_index.find_fuzzy(stem, top_k=1, time_budget=time_budget)
+        if candidates and candidates[0][1] >= fuzzy_threshold:
+            return candidates[0][0], "fuzzy"
+
+    return None, None
+
+
+def compact_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the columns of a DataFrame to compact dtypes
+
+    Columns of Python numbers, booleans and datetimes become native NumPy
+    columns, "YYYY-MM-DD" strings become datetimes, low-cardinality text
+    becomes categorical and other text uses Arrow strings when pyarrow is
+    installed. The values render the same through format_value().
+
+    Args:
+        frame: DataFrame as parsed
+
+    Returns:
+        DataFrame with compact dtypes (columns already compact are shared)
+    """
+    compacted = frame.copy(deep=False)
+    for i in range(len(frame.columns)):
+        compacted.isetitem(i, _compact_column(frame.iloc[:, i]))
+    return compacted
+
+
+def _compact_column(series: pd.Series) -> pd.Series:
+    """Convert one column to a compact dtype, see compact_frame()"""
+    if isinstance(series.dtype, pd.CategoricalDtype) or (
+            isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM"):
+        return series
+
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    missing = series.isna()
+    try:
+        if kind == "integer" and not missing.any():
+            return series.astype(np.int64)
+        if kind == "floating":
+            return series.astype(np.float64)
+        if kind == "boolean" and not missing.any():
+            return series.astype(bool)
+        if kind in ("datetime", "datetime64"):
+            return pd.to_datetime(series)
+        if kind == "empty" and len(series):
+            # All missing, which read_excel reads as float
+            return series.astype(np.float64)
+    except (OverflowError, TypeError, ValueError):
+        return series
+
+    if kind != "string":
+        return series
+
+    # Checking the distinct values, a sample first, keeps this cheap for
+    # both repetitive and unique columns
+    uniques = pd.Series(series[~missing].unique(), dtype=object)
+    if all(uniques.iloc[:100].str.fullmatch(ISO_DATE_PATTERN)) and \
+            all(uniques.str.fullmatch(ISO_DATE_PATTERN)):
+        try:
+            return pd.to_datetime(series, format="%Y-%m-%d")
+        except ValueError:
+            pass
+
+    if len(uniques) <= CATEGORY_MAX_RATIO * len(series):
+        return series.astype("category")
+    if TEXT_DTYPE is not None:
+        return series.astype(TEXT_DTYPE)
+    return series
+
+
+def _column_hashes(series: pd.Series) -> np.ndarray:
+    """
+    Hash the cells of a column independently of the column's dtype
+
+    Numbers hash by their value as a float, so 5 and 5.0 hash alike, and
+    other values by their format_value() text; missing cells hash as 0.
+    Native numbers, text and dates at midnight are hashed in bulk, other
+    values once per distinct value.
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iuf":
+        return _hash_numbers(series.to_numpy(dtype=np.float64))
+
+    hashes = np.zeros(len(series), dtype=np.uint64)
+    todo = ~series.isna().to_numpy()
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind == "M":
+        midnight = todo & (series.dt.normalize() == series).to_numpy()
+        hashes[midnight] = pd.util.hash_array(
+            series[midnight].dt.strftime("%Y-%m-%d").to_numpy(dtype=object))
+        todo &= ~midnight
+    elif pd.api.types.infer_dtype(series, skipna=True) == "string":
+        hashes[todo] = pd.util.hash_array(series[todo].to_numpy(dtype=object))
+        return hashes
+
+    codes, uniques = pd.factorize(series[todo])
+    uniques = np.asarray(uniques, dtype=object)
+    numbers = np.array([isinstance(value, (int, float, np.integer, np.floating)) and
+                        not isinstance(value, (bool, np.bool_)) for value in uniques], dtype=bool)
+    unique_hashes = np.empty(len(uniques), dtype=np.uint64)
+    unique_hashes[numbers] = _hash_numbers(uniques[numbers].astype(np.float64))
+    unique_hashes[~numbers] = pd.util.hash_array(
+        np.array([format_value(value) for value in uniques[~numbers]], dtype=object))
+    hashes[todo] = unique_hashes[codes]
+    return hashes
+
+
+def _hash_numbers(numbers: np.ndarray) -> np.ndarray:
+    """Hash float values, with -0.0 as 0.0 and NaN as 0"""
+    hashes = pd.util.hash_array(numbers + 0.0)
+    hashes[np.isnan(numbers)] = 0
+    return hashes
+
+
+def _pair_rows(old: pd.DataFrame, new: pd.DataFrame) -> np.ndarray:
+    """
+    Pair the rows of two versions of a sheet by their values
+
+    Identical rows are paired by a hash of their values, repeated rows in
+    order of appearance. The values are hashed independently of the
+    compacted dtypes (see _column_hashes()), so rows stay paired when a
+    column's dtype changes, e.g. an int column that becomes float because
+    of a new blank cell.
+
+    Args:
+        old: Previous version
+        new: Current version, with the same columns
+
+    Returns:
+        For each row of new, the position of its identical row in old, or -1
+    """
+    def keyed(frame: pd.DataFrame) -> pd.DataFrame:
+        hashes = np.zeros(len(frame), dtype=np.uint64)
+        for i in range(frame.shape[1]):
+            # Wraps around on overflow, as intended
+            hashes = hashes * np.uint64(1000003) ^ _column_hashes(frame.iloc[:, i])
+        occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+        return pd.DataFrame({"hash": hashes, "occurrence": occurrence})
+
+    old_keys = keyed(old)
+    old_keys["position"] = np.arange(len(old))
+    paired = keyed(new).merge(old_keys, on=["hash", "occurrence"], how="left")
+    return paired["position"].fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _named_width(values: Sequence[Any]) -> int:
+    """Count the cells of a header row up to its last non-empty one"""
+    width = len(values)
+    while width and values[width - 1] is None:
+        width -= 1
+    return width
+
+
+def _header_names(values: Sequence[Any]) -> List[str]:
+    """
+    Name the columns of a header row the way pd.read_excel does
+
+    Empty cells become "Unnamed: <position>". A repeated name gets a
+    ".1", ".2", ... suffix, skipping names that occur in the header;
+    named columns are numbered before unnamed ones.
+
+    Args:
+        values: Cell values of the header row
+
+    Returns:
+        Unique column names, in sheet order
+    """
+    names = [str(value) if value is not None else f"Unnamed: {i}"
+             for i, value in enumerate(values)]
+    taken = set(names)
+    counts: Dict[str, int] = {}
+    order = ([i for i, value in enumerate(values) if value is not None] +
+             [i for i, value in enumerate(values) if value is None])
+    for i in order:
+        column = names[i]
+        count = counts.get(column, 0)
+        while count > 0:
+            counts[names[i]] = count + 1
+            column = f"{names[i]}.{count}"
+            count = count + 1 if column in taken else counts.get(column, 0)
+        names[i] = column
+        counts[column] = count + 1
+
+    return names
+
+
+def _column_reader(series: pd.Series) -> Callable[[np.ndarray], List[Any]]:
+    """
+    Build a function that reads a column's values at given row positions
+
+    The column is converted to a NumPy array once; each read is then a
+    fancy-indexing pass and a tolist(), giving plain Python values.
+
+    Args:
+        series: Column to read
+
+    Returns:
+        Function from an array of row positions to a list of values
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        # Missing values have code -1, which picks the NaN at the end
+        lookup = np.append(series.cat.categories.to_numpy(dtype=object), np.nan)
+        return lambda positions: lookup[codes[positions]].tolist()
+
+    if isinstance(dtype, np.dtype) and dtype.kind == "M":
+        # Microsecond precision makes tolist() give datetime objects
+        values = series.to_numpy().astype("datetime64[us]")
+        return lambda positions: [pd.NaT if value is None else value
+                                  for value in values[positions].tolist()]
+
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcO":
+        values = series.to_numpy()
+    else:
+        values = series.to_numpy(dtype=object, na_value=np.nan)
+    return lambda positions: values[positions].tolist()
 
 
 class ExcelModel:
     """Model for representing Excel data"""
 
-    def __init__(self, file_path: str = None):  # type: ignore
+    def __init__(self, file_path: str = None, cache_dir: str = None):  # type: ignore
         """
         Initialize an Excel model
 
         Args:
             file_path: Path to the Excel file (optional)
+            cache_dir: Directory for the on-disk cache of parsed workbooks
+                       (optional; no caching if omitted)
         """
         self.file_path = file_path
-        self.data = None
+        self._data = None
         self.columns = []
 
-        # Column mappings
-        self.name_column = ""
+        # Column mappings; the first key column is the name column
+        self._key_columns: Tuple[str, ...] = ()
         self.id_column = ""
         self.date_column = ""
 
+        # Minimum similarity for find_match to fall back to the best fuzzy
+        # candidate when there is no exact or partial match (None disables it)
+        self.fuzzy_threshold: Optional[float] = None
+
+        # Normalization steps applied to names and filenames before matching
+        self._normalization: Tuple[str, ...] = DEFAULT_NORMALIZATION
+
+        # Normalized name columns, keyed by (column, normalization steps)
+        self._normalized_names = LRUCache(maxsize=NORMALIZED_CACHE_SIZE)
+
+        # Match indexes, built lazily the first time a column (or composite
+        # key) is used and kept so that switching back to it is instant.
+        # Keyed by (kind, columns, normalization steps).
+        self._index_cache = LRUCache(maxsize=INDEX_CACHE_SIZE, max_cost=INDEX_CACHE_MAX_BYTES)
+
+        # Recent find_match results and the workbook fingerprint they depend on
+        self.match_cache = LRUCache(maxsize=1024)
+        self._fingerprint: Optional[str] = None
+
+        # Per-column readers used by get_rows, built on first use
+        self._row_readers: Optional[Tuple[Tuple[str, ...], List[Callable[[np.ndarray], List[Any]]]]] = None
+
+        # Size and modification time of the loaded file, and the columns
+        # requested, so that reload() can repeat the load after an edit
+        self._source_stat: Optional[Tuple[int, int]] = None
+        self._load_columns: Optional[List[str]] = None
+
+        # Parsed workbooks on disk, so unchanged files reload without parsing
+        self.frame_cache = FrameCache(cache_dir) if cache_dir else None  # type: ignore
+
         if file_path:
             self.load_data(file_path)
 
-    def load_data(self, file_path: str) -> bool:
+    @property
+    def data(self) -> Optional[pd.DataFrame]:
+        """Loaded spreadsheet data"""
+        return self._data
+
+    @data.setter
+    def data(self, value: Optional[pd.DataFrame]) -> None:
+        self._data = value
+        self._normalized_names.clear()
+        self._index_cache.clear()
+        self._fingerprint = None
+        self._row_readers = None
+        self.match_cache.clear()
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the loaded data's contents, computed once per load"""
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            if self._data is not None:
+                digest.update(repr(list(self._data.columns)).encode("utf-8"))
+                row_hashes = pd.util.hash_pandas_object(self._data, index=False)
+                digest.update(row_hashes.to_numpy().tobytes())
+            self._fingerprint = digest.hexdigest()
+
+        return self._fingerprint
+
+    @property
+    def key_columns(self) -> Tuple[str, ...]:
+        """Columns that together identify the row a file belongs to"""
+        return self._key_columns
+
+    @key_columns.setter
+    def key_columns(self, columns: Tuple[str, ...]) -> None:
+        self._key_columns = tuple(column for column in columns if column)
+
+    @property
+    def name_column(self) -> str:
+        """Column holding the names that files are matched against"""
+        return self._key_columns[0] if self._key_columns else ""
+
+    @name_column.setter
+    def name_column(self, value: str) -> None:
+        # Replace the first key column and keep the others
+        others = tuple(column for column in self._key_columns[1:] if column != value)
+        self.key_columns = (value,) + others if value else ()
+
+    @property
+    def normalization(self) -> Tuple[str, ...]:
+        """Names of the normalization steps applied before matching"""
+        return self._normalization
+
+    @normalization.setter
+    def normalization(self, steps: Tuple[str, ...]) -> None:
+        steps = tuple(steps)
+        unknown = [step for step in steps if step not in NORMALIZATION_STEPS]
+        if unknown:
+            raise ValueError(f"Unknown normalization step(s): {', '.join(unknown)}")
+
+        self._normalization = steps
+
+    def load_data(self, file_path: str, columns: Optional[List[str]] = None,
+                  chunk_size: int = STREAM_CHUNK_ROWS,
+                  progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                  cancel: Optional[threading.Event] = None,
+                  on_header: Optional[Callable[[List[str]], None]] = None) -> bool:
         """
         Load data from Excel file
 
+        By default every column is read. When columns is given, only the
+        mapped name, ID and date columns plus the listed ones (e.g. those
+        used by the filename pattern) are kept: .xlsx files are then
+        streamed in read-only mode, chunk_size rows at a time, so memory
+        does not grow with the unused columns. The name index is built as
+        soon as the rows are read.
+
+        With a frame cache, an unchanged file is loaded from the cache
+        instead of being parsed, and a freshly parsed file is added to it.
+
+        Progress reporting and cancellation need the streaming reader, so
+        passing either streams .xlsx files even when all columns are loaded;
+        the result is the same as from pd.read_excel. Other workbooks (.xls)
+        are parsed in a single pd.read_excel call, so progress is reported
+        once it returns and cancelling takes effect then. The callbacks are
+        called on the loading thread.
+
+        CSV and TSV files are always read in chunks, with the encoding and
+        delimiter sniffed from the first block of the file.
+
         Args:
-            file_path: Path to the Excel file
+            file_path: Path to the Excel, CSV or TSV file
+            columns: Extra columns to load, or None to load all columns
+            chunk_size: Number of rows per chunk when streaming
+            progress: Called with (rows parsed, total rows or None) after
+                      each chunk
+            cancel: Event that stops loading when set
+            on_header: Called with the loaded column names as soon as the
+                       header is known
 
         Returns:
-            True if loading was successful, False otherwise
+            True if loading was successful, False otherwise (including
+            when cancelled)
         """
         try:
-            self.data = pd.read_excel(file_path)
-            self.columns = list(self.data.columns)
-            self.file_path = file_path
+            # Taken before reading, so that edits made during the load are
+            # picked up by the next has_changed()
+            source_stat = self._stat_source(file_path)
+
+            cache_key = None
+            if self.frame_cache is not None:
+                cache_key = self.frame_cache.key_for(
+                    file_path, None if columns is None else sorted(columns))
+                if self._load_cached(file_path, cache_key):
+                    if on_header:
+                        on_header(self.columns)
+                    if progress:
+                        progress(len(self.data), len(self.data))  # type: ignore
+                    self._source_stat, self._load_columns = source_stat, columns
+                    return True
 
-            # Try to guess column mappings
-            self._guess_column_mappings()
+            delimited = file_path.lower().endswith((".csv", ".tsv"))
+            stream = delimited or (
+                file_path.lower().endswith((".xlsx", ".xlsm")) and
+                (columns is not None or progress is not None or cancel is not None))
+            if delimited:
+                self._load_csv(file_path, columns, chunk_size, progress, cancel, on_header)
+            elif stream:
+                self._load_streaming(file_path, columns, chunk_size, progress, cancel, on_header)
+            elif columns is None:
+                frame = pd.read_excel(file_path)
+                if cancel is not None and cancel.is_set():
+                    raise LoadCancelled()
+                self.data = compact_frame(frame)
+                self.columns = list(self.data.columns)
+                self.file_path = file_path
 
+                # Try to guess column mappings
+                self._guess_column_mappings()
+            else:
+                header = list(pd.read_excel(file_path, nrows=0).columns)
+                keep = self._project_columns(header, columns)
+                frame = pd.read_excel(file_path, usecols=keep)
+                if cancel is not None and cancel.is_set():
+                    raise LoadCancelled()
+                self.data = compact_frame(frame)
+                self.columns = keep
+                self.file_path = file_path
+
+            if not stream:
+                if on_header:
+                    on_header(self.columns)
+                if progress:
+                    progress(len(self.data), len(self.data))  # type: ignore
+
+            if cache_key is not None:
+                try:
+                    self.frame_cache.store(cache_key, self.data)  # type: ignore
+                except Exception as e:
+                    print(f"Error caching Excel file: {str(e)}")
+
+            self._source_stat, self._load_columns = source_stat, columns
             return True
+        except LoadCancelled:
+            return False
         except Exception as e:
             print(f"Error loading Excel file: {str(e)}")
             return False
 
+    def _load_cached(self, file_path: str, cache_key: str) -> bool:
+        """
+        Load data from the frame cache
+
+        Args:
+            file_path: Path to the Excel file
+            cache_key: Frame cache key for the file and column selection
+
+        Returns:
+            True if a valid cache entry was loaded, False otherwise
+        """
+        data = self.frame_cache.load(cache_key)  # type: ignore
+        if data is None:
+            return False
+
+        self.data = data
+        self.columns = list(data.columns)
+        self.file_path = file_path
+        self._guess_column_mappings()
+        return True
+
+    def _project_columns(self, header: List[str], columns: Optional[List[str]]) -> List[str]:
+        """
+        Pick the columns to load from a header
+
+        Column mappings are guessed from the full header first.
+
+        Args:
+            header: All column names in the sheet
+            columns: Extra columns requested by the caller, or None for all
+
+        Returns:
+            Mapped and requested columns, in sheet order
+        """
+        self.columns = header
+        self._guess_column_mappings()
+        if columns is None:
+            return list(header)
+
+        wanted = set(self.key_columns) | set(columns)
+        wanted.update(column for column in (self.id_column, self.date_column) if column)
+        return [column for column in header if column in wanted]
+
+    def _load_streaming(self, file_path: str, columns: Optional[List[str]], chunk_size: int,
+                        progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                        cancel: Optional[threading.Event] = None,
+                        on_header: Optional[Callable[[List[str]], None]] = None) -> None:
+        """
+        Stream the projected columns of an .xlsx file
+
+        Args:
+            file_path: Path to the Excel file
+            columns: Extra columns requested by the caller, or None for all
+            chunk_size: Number of rows per chunk
+            progress: Called with (rows parsed, total rows or None) per chunk
+            cancel: Event that stops loading when set
+            on_header: Called with the projected column names
+        """
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            total = sheet.max_row - 1 if sheet.max_row else None
+            rows = sheet.iter_rows(values_only=True)
+            header_row = next(rows, ())
+            header = _header_names(header_row)
+            keep = self._project_columns(header, columns)
+
+            # Formatted cells pad the rows; unnamed columns after the last
+            # named one are only kept if they hold data, like read_excel
+            trailing = [column for column in header[_named_width(header_row):]
+                        if column in keep]
+            if on_header:
+                on_header(keep[:len(keep) - len(trailing)])
+
+            chunks = self._iter_sheet_chunks(rows, header, keep, chunk_size, cancel)
+            self._load_chunks(file_path, keep, chunks, total, progress, cancel, trailing)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _iter_sheet_chunks(rows: Iterator[Tuple[Any, ...]], header: List[str], keep: List[str],
+                           chunk_size: int, cancel: Optional[threading.Event] = None
+                           ) -> Iterator[pd.DataFrame]:
+        """
+        Group worksheet rows into DataFrame chunks of the projected columns
+
+        Args:
+            rows: Row value tuples after the header
+            header: All column names in the sheet
+            keep: Columns to keep
+            chunk_size: Number of rows per chunk
+            cancel: Event that stops loading when set
+
+        Returns:
+            Iterator over DataFrame chunks
+        """
+        # Columns are picked by position, in sheet order like keep
+        wanted = set(keep)
+        positions = [i for i, column in enumerate(header) if column in wanted]
+        buffer: List[Tuple[Any, ...]] = []
+        pending_empty: List[Tuple[Any, ...]] = []
+
+        for row in rows:
+            if cancel is not None and cancel.is_set():
+                raise LoadCancelled()
+
+            values = tuple(row[i] if i < len(row) else None for i in positions)
+
+            # Empty rows only count if data follows them, like read_excel
+            if all(value is None for value in values):
+                pending_empty.append(values)
+                continue
+            buffer.extend(pending_empty)
+            pending_empty.clear()
+            buffer.append(values)
+
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=keep).fillna(np.nan)
+                buffer = []
+
+        if buffer:
+            yield pd.DataFrame(buffer, columns=keep).fillna(np.nan)
+
+    def _load_csv(self, file_path: str, columns: Optional[List[str]], chunk_size: int,
+                  progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                  cancel: Optional[threading.Event] = None,
+                  on_header: Optional[Callable[[List[str]], None]] = None) -> None:
+        """
+        Read a CSV/TSV file in chunks
+
+        The encoding and delimiter are sniffed from the first block only.
+
+        Args:
+            file_path: Path to the CSV/TSV file
+            columns: Extra columns requested by the caller, or None for all
+            chunk_size: Number of rows per chunk
+            progress: Called with (rows parsed, None) per chunk
+            cancel: Event that stops loading when set
+            on_header: Called with the projected column names
+        """
+        encoding, delimiter = sniff_csv_format(file_path)
+        header = list(pd.read_csv(file_path, sep=delimiter, encoding=encoding, nrows=0).columns)
+        keep = self._project_columns(header, columns)
+        if on_header:
+            on_header(keep)
+
+        with pd.read_csv(file_path, sep=delimiter, encoding=encoding,
+                         usecols=keep, chunksize=chunk_size) as reader:
+            chunks = (chunk[keep] for chunk in reader)
+            self._load_chunks(file_path, keep, chunks, None, progress, cancel)
+
+    def _load_chunks(self, file_path: str, keep: List[str], chunks: Iterable[pd.DataFrame],
+                     total: Optional[int] = None,
+                     progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                     cancel: Optional[threading.Event] = None,
+                     trailing: Sequence[str] = ()) -> None:
+        """
+        Assemble the data from chunks and build the name index
+
+        Args:
+            file_path: Path to the source file
+            keep: Loaded column names
+            chunks: DataFrame chunks in file order
+            total: Total number of rows, if known
+            progress: Called with (rows parsed, total) per chunk
+            cancel: Event that stops loading when set
+            trailing: Last columns of keep that are dropped, from the end,
+                      as long as they hold no data
+        """
+        frames: List[pd.DataFrame] = []
+        rows = 0
+
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                raise LoadCancelled()
+
+            chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+            rows += len(chunk)
+            frames.append(chunk)
+
+            if progress:
+                progress(rows, total)
+
+        if not frames:
+            frames.append(pd.DataFrame(columns=keep))
+
+        data = pd.concat(frames) if len(frames) > 1 else frames[0]
+        empty = list(itertools.takewhile(lambda column: data[column].isna().all(),
+                                         reversed(trailing)))
+        if empty:
+            data = data.drop(columns=empty)
+            keep = [column for column in keep if column not in empty]
+
+        self.data = compact_frame(data)
+        self.columns = keep
+        self.file_path = file_path
+
+        # Normalized from the final column: a chunk's dtype can differ from
+        # it (an int chunk in a column that a later blank makes float), and
+        # would render its names differently
+        if self.name_column:
+            self._get_name_index()
+
+    @staticmethod
+    def _stat_source(file_path: str) -> Tuple[int, int]:
+        """Get the (size, modification time) of a file"""
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def has_changed(self) -> bool:
+        """
+        Check whether the loaded file was modified since it was loaded
+
+        Only the file's size and modification time are compared, so this
+        is cheap enough to poll.
+
+        Returns:
+            True if the file changed (or disappeared), False otherwise
+        """
+        if not self.file_path or self._source_stat is None:
+            return False
+
+        try:
+            return self._stat_source(self.file_path) != self._source_stat
+        except OSError:
+            return True
+
+    def reload(self) -> Optional[Dict[str, int]]:
+        """
+        Load the file again and apply the differences
+
+        Returns:
+            Row counts from update_data(), or None if loading failed
+        """
+        latest = self.load_latest()
+        if latest is None:
+            return None
+
+        return self.apply_latest(latest)
+
+    def load_latest(self) -> Optional["ExcelModel"]:
+        """
+        Load the current version of the file into a new model
+
+        The same column selection (plus the mapped columns) and frame cache
+        are used. This model is not changed, except that a version that
+        fails to load counts as seen, so it is not retried until the file
+        changes again; it is safe to call from a background thread.
+
+        Returns:
+            Loaded model to pass to apply_latest(), or None if loading failed
+        """
+        columns = self._load_columns
+        if columns is not None:
+            # Keep the columns mapped since the first load
+            columns = list(columns) + [column for column in
+                                       self.key_columns + (self.id_column, self.date_column)
+                                       if column]
+
+        latest = ExcelModel()
+        latest.frame_cache = self.frame_cache
+        if not latest.load_data(self.file_path, columns=columns):  # type: ignore
+            try:
+                self._source_stat = self._stat_source(self.file_path)  # type: ignore
+            except OSError:
+                pass
+            return None
+
+        return latest
+
+    def apply_latest(self, latest: "ExcelModel") -> Dict[str, int]:
+        """
+        Switch to the data of a model returned by load_latest()
+
+        Args:
+            latest: Model holding the current version of the file
+
+        Returns:
+            Row counts from update_data()
+        """
+        changes = self.update_data(latest.data)  # type: ignore
+        self._source_stat = latest._source_stat
+        return changes
+
+    def update_data(self, data: pd.DataFrame) -> Dict[str, int]:
+        """
+        Replace the data with a new version of the same sheet
+
+        Rows are paired with the old version by a hash of their values. The
+        name index is renumbered and only inserted (or changed) rows are
+        indexed. Cached matches are kept, renumbered, unless their row is
+        gone or an inserted row could now match the file instead. Column
+        mappings are kept. If the columns differ, everything is replaced.
+
+        Args:
+            data: New version of the data, e.g. from load_data() on another
+                  model
+
+        Returns:
+            Dictionary with the number of "kept", "inserted" and "deleted"
+            rows
+        """
+        old_data = self.data
+        if old_data is None or list(old_data.columns) != list(data.columns):
+            self.data = data
+            self.columns = list(data.columns)
+            return {"kept": 0, "inserted": len(data),
+                    "deleted": 0 if old_data is None else len(old_data)}
+
+        old_positions = _pair_rows(old_data, data)
+        if self.name_column and old_data[self.name_column].dtype != data[self.name_column].dtype:
+            # Paired names can still render differently (5 and 5.0); such
+            # rows are treated as changed so that their names are indexed again
+            before = normalize_series(old_data[self.name_column], self.normalization).to_numpy()
+            after = normalize_series(data[self.name_column], self.normalization).to_numpy()
+            old_positions[(old_positions >= 0) & (before[old_positions] != after)] = -1
+        kept = old_positions >= 0
+        remap = np.full(len(old_data), -1, dtype=np.int64)
+        remap[old_positions[kept]] = np.flatnonzero(kept)
+        inserted = np.flatnonzero(~kept)
+
+        # Take what survives out of the caches before the data setter clears them
+        key = (self.name_column, self.normalization)
+        old_names = self._normalized_names.get(key) if self.name_column else None
+        name_index = self._index_cache.get(("name",) + key) if self.name_column else None
+        old_fingerprint = self.fingerprint
+        cached_matches = self.match_cache.items()
+
+        self.data = data
+        changes = {"kept": int(kept.sum()), "inserted": len(inserted),
+                   "deleted": len(old_data) - int(kept.sum())}
+        if not self.name_column:
+            return changes
+
+        inserted_names = normalize_series(data[self.name_column].iloc[inserted],
+                                          self.normalization)
+        if old_names is not None:
+            names = np.empty(len(data), dtype=object)
+            names[kept] = old_names.to_numpy()[old_positions[kept]]
+            names[inserted] = inserted_names.to_numpy()
+            self._normalized_names.put(key, pd.Series(names, index=data.index, dtype=object))
+
+            if name_index is not None:
+                name_index.rebase(names.tolist(), old_positions.tolist())
+                self._index_cache.put(("name",) + key, name_index,
+                                      cost=name_index.estimate_memory())
+
+        # A kept match stays the earliest candidate only if the kept rows
+        # did not move past each other
+        if np.all(np.diff(old_positions[kept]) > 0):
+            self._keep_matches(cached_matches, old_fingerprint, remap,
+                               MatchIndex(inserted_names.tolist()))
+
+        return changes
+
+    def _keep_matches(self, cached_matches: List[Tuple[Any, Any]], old_fingerprint: str,
+                      remap: np.ndarray, inserted_index: MatchIndex) -> None:
+        """
+        Carry find_match results over to updated data
+
+        Args:
+            cached_matches: match_cache entries before the update
+            old_fingerprint: Fingerprint of the data before the update
+            remap: New position of every old row, or -1 if it is gone
+            inserted_index: Match index over the inserted rows only
+        """
+        settings = (self.key_columns, self.id_column, self.date_column,
+                    self.normalization, self.fuzzy_threshold)
+        for key, idx in cached_matches:
+            filename, fingerprint = key[0], key[-1]
+            if fingerprint != old_fingerprint or key[1:-1] != settings or len(self.key_columns) > 1:
+                continue
+            if idx is not None and remap[idx] < 0:
+                continue
+
+            # Could one of the inserted rows win over the cached result?
+            filename_without_ext, full_name = self._prepare_filename(filename)
+            if (inserted_index.find_exact(filename_without_ext) or
+                    inserted_index.find_exact(full_name) or
+                    _match_fallback(inserted_index, self.fuzzy_threshold,
+                                    filename_without_ext)[0] is not None):
+                continue
+
+            new_key = (filename,) + settings + (self.fingerprint,)
+            self.match_cache.put(new_key, None if idx is None else int(remap[idx]))
+
     def _guess_column_mappings(self) -> None:
         """Guess column mappings based on column names"""
         if not self.columns:
@@ -65,9 +950,9 @@ class ExcelModel:
         date_matches = [col for col in self.columns if 'date' in col.lower()]
 
         if name_matches:
-            self.name_column = name_matches[0]
+            self.key_columns = (name_matches[0],)
         elif self.columns:
-            self.name_column = self.columns[0]
+            self.key_columns = (self.columns[0],)
 
         if id_matches:
             self.id_column = id_matches[0]
@@ -77,6 +962,175 @@ class ExcelModel:
         if date_matches:
             self.date_column = date_matches[0]
 
+    def _get_normalized_names(self, column: Optional[str] = None) -> pd.Series:
+        """
+        Get a normalized name column
+
+        The column is normalized in one vectorized pass and memoized per
+        column and normalization steps, so switching back and forth between
+        settings does not reprocess the sheet.
+
+        Args:
+            column: Column to normalize (defaults to the name column)
+
+        Returns:
+            Series of normalized names with object dtype
+        """
+        column = column or self.name_column
+        key = (column, self.normalization)
+        names = self._normalized_names.get(key)
+        if names is None:
+            names = normalize_series(self.data[column], self.normalization)  # type: ignore
+            self._normalized_names.put(key, names)
+
+        return names
+
+    def _get_name_index(self) -> MatchIndex:
+        """
+        Get the match index for the current name column
+
+        Only the exact lookup is built up front; see _prepare_name_index().
+
+        Returns:
+            MatchIndex over the normalized name values
+        """
+        key = ("name", self.name_column, self.normalization)
+        name_index = self._index_cache.get(key)
+        if name_index is None:
+            name_index = MatchIndex(self._get_normalized_names().tolist())
+            self._index_cache.put(key, name_index, cost=name_index.estimate_memory())
+
+        return name_index
+
+    def _prepare_name_index(self, fuzzy: bool = False) -> MatchIndex:
+        """
+        Get the match index for the current name column, ready for partial
+        (and optionally fuzzy) lookups
+
+        The cache entry's cost is updated when the lookups had to be built.
+
+        Args:
+            fuzzy: Whether the fuzzy index is needed as well
+
+        Returns:
+            MatchIndex over the normalized name values
+        """
+        name_index = self._get_name_index()
+        if not name_index.is_prepared(fuzzy):
+            name_index.prepare(fuzzy)
+            self._index_cache.put(("name", self.name_column, self.normalization), name_index,
+                                  cost=name_index.estimate_memory())
+
+        return name_index
+
+    def _get_name_buffer(self) -> NameBuffer:
+        """
+        Get the memory-mapped name buffer for the current name column
+
+        Returns:
+            NameBuffer over the normalized name values
+        """
+        key = ("buffer", self.name_column, self.normalization)
+        name_buffer = self._index_cache.get(key)
+        if name_buffer is None:
+            # The arrays live in the page cache, not on the heap
+            name_buffer = NameBuffer.build(self._get_normalized_names().tolist())
+            self._index_cache.put(key, name_buffer)
+
+        return name_buffer
+
+    def prepare_index(self) -> None:
+        """
+        Build the match index for the current name column ahead of time
+
+        Useful after loading in a background thread, so that the first match
+        on the UI thread does not pay for the build. The fuzzy index is
+        built too when fuzzy matching is enabled, and the fingerprint that
+        keys the match cache is computed.
+        """
+        if self.data is not None and self.name_column:
+            self._prepare_name_index(fuzzy=self.fuzzy_threshold is not None)
+            self.fingerprint
+
+    def _get_composite_index(self) -> Dict[Tuple[str, ...], List[int]]:
+        """
+        Get the hashed index over the key columns
+
+        Returns:
+            Dictionary mapping each tuple of normalized key values to the
+            row positions holding it, in sheet order
+        """
+        cache_key = ("composite", self.key_columns, self.normalization)
+        index = self._index_cache.get(cache_key)
+        if index is None:
+            columns = [self._get_normalized_names(column).tolist()
+                       for column in self.key_columns]
+            index = {}
+            for position, key in enumerate(zip(*columns)):
+                index.setdefault(key, []).append(position)
+            self._index_cache.put(cache_key, index, cost=200 * len(columns[0]))
+
+        return index
+
+    def _find_composite(self, filename_without_ext: str) -> Optional[int]:
+        """
+        Match filename segments against the composite key
+
+        The normalized filename is split on " - " separators and every
+        ordering of as many segments as there are key columns is looked up,
+        so "Audit - Michael Brown - Notes" matches the key
+        (ProjectName="Audit", Manager="Michael Brown").
+
+        Args:
+            filename_without_ext: Normalized filename without extension
+
+        Returns:
+            Earliest matching row position, or None
+        """
+        segments = [segment.strip() for segment in
+                    re.split(r'\s+-\s+', filename_without_ext)]
+        segments = list(dict.fromkeys(segment for segment in segments if segment))
+        segments = segments[:MAX_KEY_SEGMENTS]
+
+        index = self._get_composite_index()
+        best = None
+        for key in itertools.permutations(segments, len(self.key_columns)):
+            rows = index.get(key)
+            if rows and (best is None or rows[0] < best):
+                best = rows[0]
+
+        return best
+
+    def _prepare_filename(self, filename: str) -> Tuple[str, str]:
+        """
+        Prepare a filename for matching
+
+        Args:
+            filename: Filename to match
+
+        Returns:
+            Tuple of the normalized filename without and with its extension
+        """
+        # Remove extension from filename for matching
+        filename_without_ext = filename
+        if '.' in filename:
+            filename_without_ext = filename.rsplit('.', 1)[0]
+
+        return (normalize_name(filename_without_ext, self.normalization),
+                normalize_name(filename, self.normalization))
+
+    def memory_per_row(self) -> float:
+        """
+        Measure the memory held by the loaded data
+
+        Returns:
+            Bytes per row, including string contents (0 if nothing is loaded)
+        """
+        if self.data is None or not len(self.data):
+            return 0.0
+
+        return float(self.data.memory_usage(deep=True).sum()) / len(self.data)
+
     def get_row_as_dict(self, row_idx: int) -> Dict[str, Any]:
         """
         Get a specific row as a dictionary
@@ -90,13 +1144,50 @@ class ExcelModel:
         if self.data is None or row_idx >= len(self.data):
             return {}
 
-        row = self.data.iloc[row_idx]
-        return {col: row[col] for col in self.columns}
+        return self.get_rows([row_idx])[0]
+
+    def get_rows(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        """
+        Get several rows as dictionaries
+
+        Values are read from cached NumPy arrays of the columns, so no
+        pandas object is built per row.
+
+        Args:
+            indices: Row indices
+
+        Returns:
+            List of dictionaries like get_row_as_dict(), in the order of
+            indices
+        """
+        if self.data is None:
+            return []
+
+        positions = np.asarray(indices, dtype=np.intp)
+        values = [read(positions) for read in self._get_row_readers()]
+        return [dict(zip(self.columns, row)) for row in zip(*values)]
+
+    def _get_row_readers(self) -> List[Callable[[np.ndarray], List[Any]]]:
+        """
+        Get the readers for the loaded columns
+
+        Returns:
+            One reader per entry in columns
+        """
+        columns = tuple(self.columns)
+        if self._row_readers is None or self._row_readers[0] != columns:
+            self._row_readers = (columns, [_column_reader(self.data[column])  # type: ignore
+                                           for column in columns])
+
+        return self._row_readers[1]
 
     def find_match(self, filename: str) -> Tuple[bool, Optional[int], Optional[Dict[str, Any]]]:
         """
         Find a matching row for a filename
 
+        Results are cached per filename, column mapping and workbook
+        fingerprint, so selecting the same file again skips the lookup.
+
         Args:
             filename: Filename to match
 
@@ -109,23 +1200,223 @@ class ExcelModel:
         if self.data is None or not self.name_column:
             return False, None, None
 
-        # Remove extension from filename for matching
-        filename_without_ext = filename
-        if '.' in filename:
-            filename_without_ext = filename.rsplit('.', 1)[0]
+        key = (filename, self.key_columns, self.id_column, self.date_column,
+               self.normalization, self.fuzzy_threshold, self.fingerprint)
+        idx = self.match_cache.get(key, _NOT_CACHED)
+        if idx is _NOT_CACHED:
+            idx = self._match_row(filename)
+            self.match_cache.put(key, idx)
+
+        if idx is None:
+            return False, None, None
+
+        return True, idx, self.get_row_as_dict(idx)
+
+    def _match_row(self, filename: str) -> Optional[int]:
+        """
+        Look up the matching row for a filename, bypassing the cache
 
-        # Try exact match first
-        for idx, row in self.data.iterrows():
-            excel_value = str(row[self.name_column])
+        Args:
+            filename: Filename to match
+
+        Returns:
+            Row index of the match, or None
+        """
+        filename_without_ext, filename = self._prepare_filename(filename)
 
-            if excel_value == filename_without_ext or excel_value == filename:
-                return True, idx, self.get_row_as_dict(idx)  # type: ignore
+        # With several key columns, try the composite key first
+        if len(self.key_columns) > 1:
+            idx = self._find_composite(filename_without_ext)
+            if idx is not None:
+                return idx
 
-        # Try partial match if exact match failed
-        for idx, row in self.data.iterrows():
-            excel_value = str(row[self.name_column])
+        # Try exact match on the name column, taking the earliest row for either form
+        name_index = self._get_name_index()
+        positions = (name_index.find_exact(filename_without_ext)[:1] +
+                     name_index.find_exact(filename)[:1])
+        if positions:
+            return min(positions)
 
-            if filename_without_ext in excel_value or excel_value in filename_without_ext:
-                return True, idx, self.get_row_as_dict(idx)  # type: ignore
+        # Try partial (and, if enabled, fuzzy) match if exact match failed
+        name_index = self._prepare_name_index(fuzzy=self.fuzzy_threshold is not None)
+        idx, _ = _match_fallback(name_index, self.fuzzy_threshold, filename_without_ext,
+                                 time_budget=FUZZY_TIME_BUDGET)
+        return idx
 
-        return False, None, None
+    def find_fuzzy_matches(self, filename: str, top_k: int = 5,
+                           time_budget: Optional[float] = FUZZY_TIME_BUDGET) -> List[Tuple[int, float]]:
+        """
+        Find the rows whose names are most similar to a filename
+
+        Args:
+            filename: Filename to match
+            top_k: Maximum number of candidates to return
+            time_budget: Time limit for the lookup in seconds, or None for
+                         no limit
+
+        Returns:
+            List of (row index, similarity score) tuples, best first, with
+            scores between 0 and 1
+        """
+        if self.data is None or not self.name_column:
+            return []
+
+        filename_without_ext, _ = self._prepare_filename(filename)
+        return self._prepare_name_index(fuzzy=True).find_fuzzy(
+            filename_without_ext, top_k=top_k, time_budget=time_budget)
+
+    def match_all(self, files: List[FileModel], workers: int = 1) -> pd.DataFrame:
+        """
+        Match a whole list of files against the data in one pass
+
+        Exact matches are resolved with a single join against the name
+        index; only files without an exact (or composite key) match go
+        through the partial fallback. Results are identical to calling
+        find_match per file, except that fuzzy lookups run without a time
+        budget so that batch results never depend on machine load.
+
+        With more than one worker, the fallback matching is split across a
+        process pool. The index is built before the pool starts and sent
+        once to each worker as it starts, and results are merged in input
+        order, so the output does not depend on the worker count. With
+        fuzzy matching the whole MatchIndex, fuzzy postings included, is
+        pickled to every worker; without it the workers only need partial
+        lookups and share a memory-mapped NameBuffer instead. Workers are
+        never forked (see _match_pool_context()), so this is safe to call
+        from any thread, also concurrently.
+
+        Workers import the main module the way spawned processes do, so a
+        script calling match_all with several workers must do so under an
+        if __name__ == "__main__" guard. Without it the workers fail to
+        start and matching falls back to a single process.
+
+        Args:
+            files: List of FileModel objects, e.g. from scan_directory
+            workers: Number of worker processes for the fallback matching
+
+        Returns:
+            DataFrame with one row per file, in input order, and columns
+            "file" (path relative to the scanned folder, so files with the
+            same name in different subfolders stay apart), "row_index"
+            (matched row or <NA>) and "match_kind" ("composite", "exact",
+            "partial", "fuzzy" or None)
+        """
+        names = pd.Series([file.name for file in files], dtype=object)
+        result = pd.DataFrame({
+            "file": pd.Series([file.relative_path for file in files], dtype=object),
+            "row_index": pd.array([pd.NA] * len(names), dtype="Int64"),
+            "match_kind": pd.Series([None] * len(names), dtype=object)
+        })
+
+        if self.data is None or not self.name_column or not len(names):
+            return result
+
+        # Same rules as find_match: drop everything after the last dot,
+        # then normalize both forms
+        has_ext = names.str.contains(".", regex=False)
+        stems = names.where(~has_ext, names.str.rsplit(".", n=1).str[0])
+        stems = normalize_series(stems, self.normalization)
+        keys = normalize_series(names, self.normalization)
+
+        # With several key columns the composite key takes precedence
+        if len(self.key_columns) > 1:
+            composite_rows = {stem: self._find_composite(stem) for stem in stems.unique()}
+            self._record_matches(result, stems.map(composite_rows), "composite")
+
+        # First row position for every distinct name value
+        name_index = self._get_name_index()
+        first_rows = pd.DataFrame({
+            "key": pd.Series(name_index.values, dtype=object),
+            "row": np.arange(len(name_index))
+        }).drop_duplicates("key")
+
+        # Left joins keep the input order; the earlier row of the two wins
+        stem_rows = pd.DataFrame({"key": stems}).merge(
+            first_rows, on="key", how="left")["row"].to_numpy(dtype=float)
+        name_rows = pd.DataFrame({"key": keys}).merge(
+            first_rows, on="key", how="left")["row"].to_numpy(dtype=float)
+        self._record_matches(result, pd.Series(np.fmin(stem_rows, name_rows)), "exact")
+
+        # Partial and fuzzy fallback, once per distinct unmatched stem
+        unmatched = stems[result["match_kind"].isna()]
+        unique_stems = list(unmatched.unique())
+        if workers > 1 and len(unique_stems) > 1:
+            fallback = self._match_fallback_parallel(unique_stems, workers)
+        elif unique_stems:
+            fallback = self._match_fallback_serial(unique_stems)
+        else:
+            fallback = []
+
+        for kind in ("partial", "fuzzy"):
+            kind_rows = {stem: idx for stem, (idx, match_kind) in zip(unique_stems, fallback)
+                         if match_kind == kind}
+            self._record_matches(result, unmatched.map(kind_rows), kind)
+
+        return result
+
+    def _match_fallback_serial(self, stems: List[str]) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Run the fallback matching for many stems in this process
+
+        Args:
+            stems: Distinct normalized stems to match
+
+        Returns:
+            (row position, match kind) for each stem, in input order
+        """
+        name_index = self._prepare_name_index(fuzzy=self.fuzzy_threshold is not None)
+        return [_match_fallback(name_index, self.fuzzy_threshold, stem) for stem in stems]
+
+    def _match_fallback_parallel(self, stems: List[str],
+                                 workers: int) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Run the fallback matching for many stems in a process pool
+
+        Falls back to matching in this process if the pool breaks, e.g.
+        when workers fail to start because the main module runs match_all
+        without an if __name__ == "__main__" guard.
+
+        Args:
+            stems: Distinct normalized stems to match
+            workers: Number of worker processes
+
+        Returns:
+            (row position, match kind) for each stem, in input order
+        """
+        shared: Union[MatchIndex, NameBuffer]
+        if self.fuzzy_threshold is None:
+            # Workers map the same files instead of each holding the index
+            shared = self._get_name_buffer()
+        else:
+            shared = self._prepare_name_index(fuzzy=True)
+
+        # A few chunks per worker balances the load without many round trips
+        chunk_size = max(1, -(-len(stems) // (workers * 4)))
+        chunks = [stems[i:i + chunk_size] for i in range(0, len(stems), chunk_size)]
+
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=_match_pool_context(),
+            initializer=_init_match_worker, initargs=(shared, self.fuzzy_threshold))
+        try:
+            with executor:
+                return [match for chunk in executor.map(_match_stems_in_worker, chunks)
+                        for match in chunk]
+        except BrokenProcessPool as e:
+            print(f"Error starting match workers, matching in one process: {str(e)}")
+            return self._match_fallback_serial(stems)
+
+    @staticmethod
+    def _record_matches(result: pd.DataFrame, rows: pd.Series, kind: str) -> None:
+        """
+        Fill in match results for files that are still unmatched
+
+        Args:
+            result: Match table being built by match_all
+            rows: Matched row positions (NaN/None where there is no match),
+                  indexed like result
+            kind: Match kind to record
+        """
+        rows = rows.dropna()
+        rows = rows[result.loc[rows.index, "match_kind"].isna()]
+        result.loc[rows.index, "row_index"] = rows.astype(np.int64).to_numpy()
+        result.loc[rows.index, "match_kind"] = kind
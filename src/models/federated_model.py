@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Excel model over several sheets and workbooks
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from src.models.excel_model import ExcelModel, compact_frame
+from src.utils.file_utils import sniff_csv_format
+from src.utils.string_utils import normalize_series
+
+# Columns added to every row to record where it was loaded from
+SOURCE_FILE_COLUMN = "Source File"
+SOURCE_SHEET_COLUMN = "Source Sheet"
+SOURCE_COLUMNS = [SOURCE_FILE_COLUMN, SOURCE_SHEET_COLUMN]
+
+# Default number of files parsed at the same time
+DEFAULT_LOAD_WORKERS = 4
+
+
+class FederatedExcelModel(ExcelModel):
+    """Excel model that matches against many sheets as one table"""
+
+    def __init__(self, cache_dir: str = None, max_workers: int = DEFAULT_LOAD_WORKERS):  # type: ignore
+        """
+        Initialize a federated Excel model
+
+        Rows of every loaded sheet are stacked in load order, with the
+        source file and sheet recorded in SOURCE_FILE_COLUMN and
+        SOURCE_SHEET_COLUMN, and matched through a single index.
+
+        Args:
+            cache_dir: Directory for the on-disk cache of parsed workbooks
+                       (optional; no caching if omitted)
+            max_workers: Number of files parsed at the same time
+        """
+        super().__init__(cache_dir=cache_dir)
+        self.max_workers = max_workers
+
+        # (file, sheet) of every loaded sheet, in row order
+        self.sources: List[Tuple[str, str]] = []
+
+    def load_files(self, file_paths: Sequence[str],
+                   sheets: Optional[Sequence[str]] = None) -> bool:
+        """
+        Load sheets from several files, replacing the current data
+
+        Files are parsed concurrently in a thread pool; their rows are
+        stacked in the order of file_paths and then sheet order.
+
+        Args:
+            file_paths: Paths to Excel, CSV or TSV files
+            sheets: Names of the sheets to load from each workbook, or None
+                    for every sheet (missing sheets are skipped)
+
+        Returns:
+            True if loading was successful, False otherwise
+        """
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                loaded = list(executor.map(
+                    lambda file_path: self._read_file(file_path, sheets), file_paths))
+        except Exception as e:
+            print(f"Error loading Excel files: {str(e)}")
+            return False
+
+        self.data = None
+        self.columns = []
+        self.sources = []
+        self.file_path = file_paths[0] if file_paths else None
+        self._append_frames([frame for frame in loaded if frame is not None])
+        self._guess_column_mappings()
+        return True
+
+    def add_sheet(self, file_path: str, sheet_name: Optional[str] = None) -> bool:
+        """
+        Append one more sheet to the loaded data
+
+        Only the new sheet is parsed (or read from the frame cache),
+        compacted and normalized; the rows already loaded keep their
+        positions and are stacked with it into a new frame (see
+        _append_frames()).
+
+        Args:
+            file_path: Path to an Excel, CSV or TSV file
+            sheet_name: Sheet to load, or None for the first sheet
+
+        Returns:
+            True if loading was successful, False otherwise
+        """
+        try:
+            frame = self._read_file(file_path, None if sheet_name is None else [sheet_name],
+                                    first_only=sheet_name is None)
+            if frame is None:
+                raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        except Exception as e:
+            print(f"Error loading Excel sheet: {str(e)}")
+            return False
+
+        first = self.data is None
+        self._append_frames([frame])
+        if first:
+            self.file_path = file_path
+            self._guess_column_mappings()
+        return True
+
+    def get_source(self, row_idx: int) -> Tuple[str, str]:
+        """
+        Get the file and sheet a row was loaded from
+
+        Args:
+            row_idx: Row index
+
+        Returns:
+            Tuple of (file path, sheet name)
+        """
+        row = self.get_row_as_dict(row_idx)
+        return row[SOURCE_FILE_COLUMN], row[SOURCE_SHEET_COLUMN]
+
+    def _read_file(self, file_path: str, sheets: Optional[Sequence[str]] = None,
+                   first_only: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Load the wanted sheets of one file as a single compact frame
+
+        The sheets are stacked, compacted once and given the source columns;
+        with a frame cache, the result is cached per file and sheet
+        selection, so an unchanged file is not parsed again.
+
+        Args:
+            file_path: Path to an Excel, CSV or TSV file
+            sheets: Names of the sheets to load, or None for every sheet
+            first_only: Load only the first sheet
+
+        Returns:
+            Frame with the rows of the sheets in sheet order, or None if no
+            sheet was found
+        """
+        cache_key = None
+        if self.frame_cache is not None:
+            cache_key = self.frame_cache.key_for(
+                file_path, ("sheets", None if sheets is None else sorted(sheets), first_only))
+            frame = self.frame_cache.load(cache_key)
+            if frame is not None:
+                return frame
+
+        loaded = self._read_sheets(file_path, sheets, first_only)
+        if not loaded:
+            return None
+
+        # Sheet columns in first-seen order
+        columns: List[str] = []
+        for _, _, sheet in loaded:
+            columns.extend(column for column in sheet.columns
+                           if column not in columns and column not in SOURCE_COLUMNS)
+
+        frame = compact_frame(pd.concat([sheet for _, _, sheet in loaded],
+                                        ignore_index=True).reindex(columns=columns))
+
+        # Categorical source columns; their categories also record sheets
+        # without rows
+        sizes = [len(sheet) for _, _, sheet in loaded]
+        frame[SOURCE_FILE_COLUMN] = pd.Categorical.from_codes(
+            np.zeros(len(frame), dtype=np.int8), categories=[file_path])
+        frame[SOURCE_SHEET_COLUMN] = pd.Categorical.from_codes(
+            np.repeat(np.arange(len(loaded)), sizes), categories=[name for _, name, _ in loaded])
+
+        if cache_key is not None:
+            try:
+                self.frame_cache.store(cache_key, frame)  # type: ignore
+            except Exception as e:
+                print(f"Error caching Excel file: {str(e)}")
+
+        return frame
+
+    @staticmethod
+    def _read_sheets(file_path: str, sheets: Optional[Sequence[str]] = None,
+                     first_only: bool = False) -> List[Tuple[str, str, pd.DataFrame]]:
+        """
+        Parse the wanted sheets of one file
+
+        Args:
+            file_path: Path to an Excel, CSV or TSV file
+            sheets: Names of the sheets to load, or None for every sheet
+            first_only: Load only the first sheet
+
+        Returns:
+            List of (file path, sheet name, data) in sheet order
+        """
+        if file_path.lower().endswith((".csv", ".tsv")):
+            # A delimited file is a workbook with a single sheet named after it
+            sheet_name = Path(file_path).stem
+            if sheets is not None and sheet_name not in sheets:
+                return []
+            encoding, delimiter = sniff_csv_format(file_path)
+            return [(file_path, sheet_name,
+                     pd.read_csv(file_path, sep=delimiter, encoding=encoding))]
+
+        with pd.ExcelFile(file_path) as workbook:
+            names = [str(name) for name in workbook.sheet_names]
+            if first_only:
+                names = names[:1]
+            elif sheets is not None:
+                names = [name for name in names if name in sheets]
+
+            return [(file_path, name, workbook.parse(name)) for name in names]
+
+    def _append_frames(self, loaded: List[pd.DataFrame]) -> None:
+        """
+        Stack frames from _read_file() under the loaded data
+
+        The whole data is concatenated into a new frame, but the loaded rows
+        are not compacted again (see _stack_frames()). A name index that is
+        already built is extended with the new rows instead of being
+        rebuilt, unless the name column's dtype changed and the loaded rows
+        now render differently; every other cache starts over.
+
+        Args:
+            loaded: Frames to append, in order
+        """
+        if not loaded:
+            return
+
+        for frame in loaded:
+            file_path = frame[SOURCE_FILE_COLUMN].cat.categories[0]
+            self.sources.extend((file_path, str(sheet_name)) for sheet_name
+                                in frame[SOURCE_SHEET_COLUMN].cat.categories)
+
+        start = 0 if self.data is None else len(self.data)
+        frames = list(loaded) if self.data is None else [self.data] + list(loaded)
+
+        # Sheet columns in first-seen order, source columns last
+        columns = [column for column in self.columns if column not in SOURCE_COLUMNS]
+        for frame in frames:
+            columns.extend(column for column in frame.columns
+                           if column not in columns and column not in SOURCE_COLUMNS)
+        columns.extend(SOURCE_COLUMNS)
+
+        # Keep the name index across the reset done by the data setter
+        key = (self.name_column, self.normalization)
+        names = self._normalized_names.get(key)
+        name_index = self._index_cache.get(("name",) + key)
+        old_dtype = None if names is None else self.data[self.name_column].dtype  # type: ignore
+
+        self.data = _stack_frames(frames, columns)
+        self.columns = columns
+
+        if names is not None and name_index is not None and \
+                _same_rendering(old_dtype, self.data[self.name_column].dtype):
+            added = normalize_series(self.data[self.name_column].iloc[start:],
+                                     self.normalization)
+            name_index.add(added.tolist())
+            self._normalized_names.put(key, pd.concat([names, added]))
+            self._index_cache.put(("name",) + key, name_index,
+                                  cost=name_index.estimate_memory())
+
+
+def _same_rendering(old: Any, new: Any) -> bool:
+    """
+    Check whether values keep their string form when a column changes dtype
+
+    Merged categories keep the values of the loaded rows; any other change
+    (e.g. an int column turned float by the new rows) may render them
+    differently.
+
+    Args:
+        old: Dtype of the column before stacking
+        new: Dtype of the stacked column
+
+    Returns:
+        True if the loaded rows render the same in both dtypes
+    """
+    if isinstance(old, pd.CategoricalDtype) and isinstance(new, pd.CategoricalDtype):
+        return old.categories.dtype == new.categories.dtype
+    return old == new
+
+
+def _stack_frames(frames: List[pd.DataFrame], columns: List[str]) -> pd.DataFrame:
+    """
+    Stack compact frames, keeping their compact dtypes
+
+    Columns with the same dtype in every frame are copied as they are and
+    categorical columns are merged with union_categoricals, so appending a
+    sheet does not compact the rows already loaded again. Only a column
+    whose dtype differs between the frames (or that some frames lack) is
+    compacted again after stacking.
+
+    Args:
+        frames: Frames to stack, in order
+        columns: Columns of the result, in order
+
+    Returns:
+        Stacked frame with a fresh RangeIndex
+    """
+    if len(frames) == 1 and list(frames[0].columns) == columns:
+        return frames[0]
+
+    stacked = pd.concat(frames, ignore_index=True).reindex(columns=columns)
+    drifted = []
+    for i, column in enumerate(columns):
+        parts = [frame[column] for frame in frames if column in frame.columns]
+        if len(parts) == len(frames) and len({part.dtype for part in parts}) == 1:
+            continue
+
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            empty = parts[0].cat.categories[:0]
+            parts = [frame[column] if column in frame.columns else
+                     pd.Series(pd.Categorical.from_codes(np.full(len(frame), -1), categories=empty))
+                     for frame in frames]
+            try:
+                stacked.isetitem(i, pd.Series(union_categoricals(parts), index=stacked.index))
+                continue
+            except TypeError:
+                # Categories of different types
+                pass
+
+        drifted.append(i)
+
+    if drifted:
+        compacted = compact_frame(stacked.iloc[:, drifted])
+        for position, i in enumerate(drifted):
+            stacked.isetitem(i, compacted.iloc[:, position])
+
+    return stacked
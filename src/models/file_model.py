@@ -5,32 +5,108 @@
 File model for representing file information
 """
 
+import os
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 
 
 class FileModel:
     """Model for representing file information"""
 
-    def __init__(self, file_path: Path):
+    # Scans of large shares hold millions of these, so instances have no
+    # __dict__, keep the path as a string and format fields on first use
+    __slots__ = ("_path", "name", "relative_path", "size", "_mod_time", "_mod_time_formatted")
+
+    def __init__(self, file_path: Union[Path, str], file_stat: Optional[os.stat_result] = None,
+                 relative_path: Optional[str] = None):
         """
-        Initialize a file model from a Path object
+        Initialize a file model from a path
 
         Args:
-            file_path: Path object pointing to the file
+            file_path: Path pointing to the file
+            file_stat: Stat result of the file if already known (optional;
+                       the file is stat'ed if omitted)
+            relative_path: Path relative to the scanned folder (optional;
+                           defaults to the file name)
         """
-        self.path = file_path
-        self.name = file_path.name
-        self.extension = file_path.suffix.lower()
-        self.filename_without_ext = file_path.stem
+        self._set_path(file_path, relative_path)
 
         # Get file stats
-        file_stat = file_path.stat()
+        if file_stat is None:
+            file_stat = os.stat(self._path)
         self.size = file_stat.st_size
         self.mod_time = file_stat.st_mtime
-        self.mod_time_formatted = datetime.fromtimestamp(
-            file_stat.st_mtime).strftime('%Y-%m-%d %H:%M')
+
+    @classmethod
+    def from_values(cls, file_path: Union[Path, str], size: int, mod_time: float,
+                    relative_path: Optional[str] = None) -> 'FileModel':
+        """
+        Create a FileModel instance from known file information, without a stat call
+
+        Args:
+            file_path: Path pointing to the file
+            size: File size in bytes
+            mod_time: Modification time as a timestamp
+            relative_path: Path relative to the scanned folder (optional)
+
+        Returns:
+            FileModel instance
+        """
+        file_model = cls.__new__(cls)
+        file_model._set_path(file_path, relative_path)
+        file_model.size = size
+        file_model.mod_time = mod_time
+        return file_model
+
+    def _set_path(self, file_path: Union[Path, str], relative_path: Optional[str]) -> None:
+        """Set the path, name and relative path"""
+        self._path = os.fspath(file_path)
+        self.name = os.path.basename(self._path)
+        self.relative_path = relative_path or self.name
+
+    @property
+    def path(self) -> Path:
+        """Path object pointing to the file"""
+        return Path(self._path)
+
+    @path.setter
+    def path(self, file_path: Union[Path, str]) -> None:
+        self._path = os.fspath(file_path)
+
+    @property
+    def extension(self) -> str:
+        """Lower-case extension including the dot, as in Path.suffix"""
+        dot = self.name.rfind('.')
+        return self.name[dot:].lower() if 0 < dot < len(self.name) - 1 else ""
+
+    @property
+    def filename_without_ext(self) -> str:
+        """File name without its extension, as in Path.stem"""
+        dot = self.name.rfind('.')
+        return self.name[:dot] if 0 < dot < len(self.name) - 1 else self.name
+
+    @property
+    def mod_time(self) -> float:
+        """Modification time as a timestamp"""
+        return self._mod_time
+
+    @mod_time.setter
+    def mod_time(self, mod_time: float) -> None:
+        self._mod_time = mod_time
+        self._mod_time_formatted = None
+
+    @property
+    def mod_time_formatted(self) -> str:
+        """Modification time as "YYYY-MM-DD HH:MM", formatted on first use"""
+        if self._mod_time_formatted is None:
+            self._mod_time_formatted = datetime.fromtimestamp(
+                self._mod_time).strftime('%Y-%m-%d %H:%M')
+        return self._mod_time_formatted
+
+    @mod_time_formatted.setter
+    def mod_time_formatted(self, mod_time_formatted: str) -> None:
+        self._mod_time_formatted = mod_time_formatted
 
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -42,12 +118,30 @@ class FileModel:
         return {
             "path": self.path,
             "name": self.name,
+            "relative_path": self.relative_path,
             "size": self.size,
             "mod_time": self.mod_time,
             "mod_time_formatted": self.mod_time_formatted,
             "extension": self.extension
         }
 
+    @classmethod
+    def from_dir_entry(cls, entry: os.DirEntry, relative_path: Optional[str] = None) -> 'FileModel':
+        """
+        Create a FileModel instance from an os.scandir entry
+
+        The entry's stat result is reused; it comes with the directory
+        listing on Windows and costs a single stat call elsewhere.
+
+        Args:
+            entry: Directory entry of the file
+            relative_path: Path relative to the scanned folder (optional)
+
+        Returns:
+            FileModel instance
+        """
+        return cls(entry.path, entry.stat(), relative_path)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'FileModel':
         """
@@ -59,9 +153,8 @@ class FileModel:
         Returns:
             FileModel instance
         """
-        file_model = cls(data["path"])
-        file_model.size = data["size"]
-        file_model.mod_time = data["mod_time"]
+        file_model = cls.from_values(data["path"], data["size"], data["mod_time"],
+                                     data.get("relative_path"))
         file_model.mod_time_formatted = data["mod_time_formatted"]
         return file_model
 
@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Match index for looking up spreadsheet rows by name
+"""
+
+import bisect
+import re
+import time
+from array import array
+from typing import Dict, List, Iterable, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Default time budget for a fuzzy query, in seconds
+FUZZY_TIME_BUDGET = 0.05
+
+
+def get_trigrams(text: str) -> Set[str]:
+    """
+    Get the set of character trigrams in a string
+
+    Args:
+        text: String to split
+
+    Returns:
+        Set of all three-character substrings
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def fold_for_fuzzy(text: str) -> str:
+    """
+    Fold a string for fuzzy comparison
+
+    Case is folded, runs of non-alphanumeric characters become a single
+    space, and the result is padded so word boundaries form trigrams.
+
+    Args:
+        text: String to fold
+
+    Returns:
+        Folded string
+    """
+    folded = re.sub(r'[\W_]+', ' ', text.casefold()).strip()
+    return f" {folded} " if folded else ""
+
+
+class MatchIndex:
+    """Lookup structures over the values of a name column"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        """
+        Initialize a match index
+
+        Only the exact lookup is built when rows are added; the partial and
+        fuzzy lookups are built on their first query, or by prepare().
+
+        Args:
+            values: Name values in sheet order (optional)
+        """
+        self.values: List[str] = []
+
+        # Exact lookup: value -> row positions in sheet order
+        self._rows: Dict[str, List[int]] = {}
+
+        # Partial lookup, built on the first partial query: trigram -> row
+        # positions in sheet order, used to find the values that contain a
+        # query, and the lengths of the distinct values, used to look up
+        # the substrings of a query that could be values
+        self._trigrams: Optional[Dict[str, array]] = None
+        self._lengths: Set[int] = set()
+        self._partial_indexed = 0
+
+        # Fuzzy index over folded values, built on the first fuzzy query:
+        # trigram -> folded value IDs, plus each value's rows and size
+        self._fuzzy_trigrams: Optional[Dict[str, array]] = None
+        self._fuzzy_ids: Dict[str, int] = {}
+        self._fuzzy_rows: List[List[int]] = []
+        self._fuzzy_sizes = array("i")
+        self._fuzzy_indexed = 0
+
+        self.add(values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, values: Iterable[str]) -> None:
+        """
+        Append rows to the index
+
+        Args:
+            values: Name values of the new rows, in sheet order
+        """
+        for value in values:
+            position = len(self.values)
+            self.values.append(value)
+
+            rows = self._rows.get(value)
+            if rows is None:
+                self._rows[value] = [position]
+            else:
+                rows.append(position)
+
+    def rebase(self, values: Sequence[str], old_positions: Sequence[int]) -> None:
+        """
+        Move the index to a new version of the rows
+
+        Rows kept from the old version only have their positions renumbered;
+        just the inserted rows are indexed from scratch. Lookups then give
+        the same results as an index built from the new values. The fuzzy
+        index is dropped and rebuilt on the next fuzzy query.
+
+        Args:
+            values: Name values of the new version, in sheet order
+            old_positions: For each new row, its position in the old version,
+                           or -1 for an inserted (or changed) row; kept rows
+                           must have the same value as before
+        """
+        if self._trigrams is not None:
+            # Renumbering assumes every old row is in the postings
+            self._update_partial_index()
+
+        remap = [-1] * len(self.values)
+        inserted = []
+        for position, old_position in enumerate(old_positions):
+            if old_position >= 0:
+                remap[old_position] = position
+            else:
+                inserted.append(position)
+
+        rows: Dict[str, List[int]] = {}
+        for value, positions in self._rows.items():
+            kept = sorted(remap[position] for position in positions if remap[position] >= 0)
+            if kept:
+                rows[value] = kept
+        self._rows = rows
+
+        self.values = list(values)
+        for position in inserted:
+            value = self.values[position]
+            positions = self._rows.get(value)
+            if positions is None:
+                self._rows[value] = [position]
+            else:
+                bisect.insort(positions, position)
+
+        if self._trigrams is not None:
+            trigrams: Dict[str, array] = {}
+            for trigram, positions in self._trigrams.items():
+                kept = sorted(remap[position] for position in positions if remap[position] >= 0)
+                if kept:
+                    trigrams[trigram] = array("i", kept)
+            for position in inserted:
+                for trigram in get_trigrams(self.values[position]):
+                    posting = trigrams.get(trigram)
+                    if posting is None:
+                        trigrams[trigram] = array("i", [position])
+                    else:
+                        posting.insert(bisect.bisect(posting, position), position)
+            self._trigrams = trigrams
+            self._lengths = {len(value) for value in self._rows}
+            self._partial_indexed = len(self.values)
+
+        self._fuzzy_trigrams = None
+        self._fuzzy_ids = {}
+        self._fuzzy_rows = []
+        self._fuzzy_sizes = array("i")
+        self._fuzzy_indexed = 0
+
+    def estimate_memory(self) -> int:
+        """
+        Estimate the memory held by the index
+
+        This is a rough figure from the entry counts, cheap enough to call
+        after every build; it is meant for cache limits, not accounting.
+        Strings shared with the values passed in are not counted.
+
+        Returns:
+            Estimated size in bytes
+        """
+        exact_bytes = 100 * len(self._rows) + 16 * len(self.values)
+
+        partial_bytes = 0
+        if self._trigrams is not None:
+            partial_bytes = (4 * sum(len(posting) for posting in self._trigrams.values()) +
+                             150 * len(self._trigrams))
+
+        fuzzy_bytes = 0
+        if self._fuzzy_trigrams is not None:
+            fuzzy_bytes = (4 * sum(len(posting) for posting in self._fuzzy_trigrams.values()) +
+                           150 * len(self._fuzzy_trigrams) +
+                           sum(len(folded) for folded in self._fuzzy_ids) +
+                           250 * len(self._fuzzy_rows))
+
+        return exact_bytes + partial_bytes + fuzzy_bytes
+
+    def is_prepared(self, fuzzy: bool = False) -> bool:
+        """
+        Check whether the lookups are built for every added row
+
+        Args:
+            fuzzy: Whether the fuzzy index is needed as well
+
+        Returns:
+            True if prepare() has nothing left to build
+        """
+        if self._trigrams is None or self._partial_indexed < len(self.values):
+            return False
+        return not fuzzy or (self._fuzzy_trigrams is not None and
+                             self._fuzzy_indexed == len(self.values))
+
+    def prepare(self, fuzzy: bool = False) -> None:
+        """
+        Finish building the lazily built parts of the index
+
+        Call before sharing the index with worker processes, so that each
+        worker does not build them again, or from a background thread, so
+        that the first query does not pay for the build.
+
+        Args:
+            fuzzy: Whether to build the fuzzy index as well
+        """
+        self._update_partial_index()
+        if fuzzy:
+            self._update_fuzzy_index()
+
+    def find_exact(self, key: str) -> List[int]:
+        """
+        Find the rows whose value equals a key
+
+        Args:
+            key: Value to look up
+
+        Returns:
+            Row positions in sheet order (empty if none)
+        """
+        return self._rows.get(key, [])
+
+    def find_partial(self, query: str) -> Optional[int]:
+        """
+        Find the first row whose value contains the query or is contained in it
+
+        Args:
+            query: String to match
+
+        Returns:
+            Row position of the earliest matching row, or None
+        """
+        self._update_partial_index()
+        candidates = [position for position in (self._find_containing(query),
+                                                self._find_contained_in(query))
+                      if position is not None]
+        return min(candidates) if candidates else None
+
+    def find_fuzzy(self, query: str, top_k: int = 5,
+                   time_budget: Optional[float] = FUZZY_TIME_BUDGET) -> List[Tuple[int, float]]:
+        """
+        Find the rows most similar to a query
+
+        Similarity is the Dice coefficient of the trigram sets of the folded
+        strings. Only rows sharing at least one trigram with the query are
+        scored, so the cost follows the number of candidates rather than the
+        number of rows; counting and scoring are NumPy passes over the
+        posting arrays. Posting lists are taken rarest first; once the time
+        budget is half spent the remaining, most common trigrams are skipped
+        and the scores are computed from the trigrams taken so far.
+
+        Args:
+            query: String to match
+            top_k: Maximum number of rows to return
+            time_budget: Approximate time limit for the query, in seconds,
+                         or None to always score every candidate (results
+                         are then independent of machine load)
+
+        Returns:
+            List of (row position, score) tuples, best first; ties are
+            ordered by sheet position
+        """
+        self._update_fuzzy_index()
+        query_trigrams = get_trigrams(fold_for_fuzzy(query))
+        if not query_trigrams or top_k <= 0:
+            return []
+
+        postings = sorted((self._fuzzy_trigrams.get(trigram, ())  # type: ignore
+                           for trigram in query_trigrams), key=len)
+
+        # Gathering gets half the budget; counting and scoring the
+        # candidates take far less than the rest
+        deadline = None if time_budget is None else time.perf_counter() + time_budget / 2
+        gathered = []
+        for posting in postings:
+            if posting:
+                gathered.append(np.frombuffer(posting, dtype=np.intc))
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+        if not gathered:
+            return []
+
+        counts = np.bincount(np.concatenate(gathered), minlength=len(self._fuzzy_rows))
+        value_ids = np.flatnonzero(counts)
+        sizes = np.frombuffer(self._fuzzy_sizes, dtype=np.intc)[value_ids]
+        scores = 2.0 * counts[value_ids] / (len(query_trigrams) + sizes)
+
+        # Keep the top_k scores (and anything tied with the last of them),
+        # then order by score; value IDs follow sheet order, so the lower
+        # ID wins a tie
+        if len(scores) > top_k:
+            kept = scores >= -np.partition(-scores, top_k - 1)[top_k - 1]
+            value_ids, scores = value_ids[kept], scores[kept]
+        best = np.lexsort((value_ids, -scores))[:top_k]
+
+        results: List[Tuple[int, float]] = []
+        for value_id, score in zip(value_ids[best].tolist(), scores[best].tolist()):
+            results.extend((position, score) for position in self._fuzzy_rows[value_id])
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:top_k]
+
+    def _update_partial_index(self) -> None:
+        """Bring the partial lookup up to date with the added rows"""
+        if self._trigrams is None:
+            self._trigrams = {}
+
+        trigrams = self._trigrams
+        for position in range(self._partial_indexed, len(self.values)):
+            value = self.values[position]
+            self._lengths.add(len(value))
+            for trigram in get_trigrams(value):
+                posting = trigrams.get(trigram)
+                if posting is None:
+                    trigrams[trigram] = posting = array("i")
+                posting.append(position)
+
+        self._partial_indexed = len(self.values)
+
+    def _update_fuzzy_index(self) -> None:
+        """Bring the fuzzy index up to date with the added rows"""
+        if self._fuzzy_trigrams is None:
+            self._fuzzy_trigrams = {}
+
+        for position in range(self._fuzzy_indexed, len(self.values)):
+            folded = fold_for_fuzzy(self.values[position])
+            value_id = self._fuzzy_ids.get(folded)
+            if value_id is not None:
+                self._fuzzy_rows[value_id].append(position)
+                continue
+
+            value_id = len(self._fuzzy_rows)
+            self._fuzzy_ids[folded] = value_id
+            self._fuzzy_rows.append([position])
+            trigrams = get_trigrams(folded)
+            self._fuzzy_sizes.append(len(trigrams))
+            for trigram in trigrams:
+                posting = self._fuzzy_trigrams.get(trigram)
+                if posting is None:
+                    self._fuzzy_trigrams[trigram] = posting = array("i")
+                posting.append(value_id)
+
+        self._fuzzy_indexed = len(self.values)
+
+    def _find_containing(self, query: str) -> Optional[int]:
+        """Find the first row whose value contains the query"""
+        if len(query) < 3:
+            # Too short to have a trigram, fall back to a scan
+            for position, value in enumerate(self.values):
+                if query in value:
+                    return position
+            return None
+
+        # Every matching row must hold the query's rarest trigram, so only
+        # that posting list needs to be verified
+        postings = [self._trigrams.get(trigram, ())  # type: ignore
+                    for trigram in get_trigrams(query)]
+        for position in min(postings, key=len):
+            if query in self.values[position]:
+                return position
+
+        return None
+
+    def _find_contained_in(self, query: str) -> Optional[int]:
+        """
+        Find the first row whose value is contained in the query
+
+        Every substring of the query with the length of some value is looked
+        up in the exact index, so the cost grows with the query length times
+        the number of distinct value lengths, not with the number of rows.
+        """
+        best = None
+        for length in self._lengths:
+            if length > len(query):
+                continue
+            for start in range(len(query) - length + 1 if length else 1):
+                rows = self._rows.get(query[start:start + length])
+                if rows and (best is None or rows[0] < best):
+                    best = rows[0]
+
+        return best
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Memory-mapped name column for partial matching across processes
+"""
+
+import mmap
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Rows processed at a time while building the trigram postings
+BUILD_BLOCK_ROWS = 65536
+
+# Longest query whose substrings are looked up among the distinct values;
+# longer queries scan every value instead
+MAX_SUBSTRING_QUERY = 256
+
+# Candidate rows searched one by one for a partial match; the blob span
+# holding the remaining candidates is searched in one go
+SEARCHED_CANDIDATES = 64
+
+# Ends every name in the buffer; never part of UTF-8 text, so a match of
+# UTF-8 query bytes cannot span two names
+SEPARATOR = b"\xff"
+
+
+def _trigram_keys(codes: np.ndarray) -> np.ndarray:
+    """Pack each run of three bytes of a uint8 array into an int32"""
+    codes = codes.astype(np.int32)
+    return (codes[:-2] << 16) | (codes[1:-1] << 8) | codes[2:]
+
+
+def _hash_names(names: List[str]) -> np.ndarray:
+    """Hash names to uint64, the same way in every process"""
+    return pd.util.hash_array(np.array(names, dtype=object), categorize=False)
+
+
+class NameBuffer:
+    """
+    Partial-match lookups over a name column stored in files
+
+    Names are stored UTF-8 encoded in one blob, each followed by a
+    separator byte, with the offset of every name, the sorted hashes of the
+    distinct names and CSR-style postings of every byte trigram. The blob
+    and arrays are memory-mapped, so processes opening the same directory
+    share one copy through the page cache, the files take the size of the
+    text however long the longest name is, and lookups are searches over
+    the blob and NumPy operations over the arrays, without building a
+    Python string per row. Results equal MatchIndex.find_partial().
+
+    Pickling a NameBuffer only sends its directory.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Open a name buffer written by build()
+
+        Args:
+            directory: Directory holding the buffer files
+        """
+        self.directory = str(directory)
+        self._owned: Optional[str] = None
+
+        path = Path(directory)
+        self.blob: Union[mmap.mmap, bytes] = b""
+        with open(path / "names.bin", "rb") as f:
+            if path.joinpath("names.bin").stat().st_size:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self.sorted_hashes = np.load(path / "sorted_hashes.npy", mmap_mode="r")
+        self.sorted_first = np.load(path / "sorted_first.npy", mmap_mode="r")
+        self.trigram_keys = np.load(path / "trigram_keys.npy", mmap_mode="r")
+        self.trigram_offsets = np.load(path / "trigram_offsets.npy", mmap_mode="r")
+        self.trigram_rows = np.load(path / "trigram_rows.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        return NameBuffer, (self.directory,)
+
+    def __del__(self) -> None:
+        if isinstance(getattr(self, "blob", None), mmap.mmap):
+            self.blob.close()  # type: ignore
+        if getattr(self, "_owned", None) is not None:
+            shutil.rmtree(self._owned, ignore_errors=True)  # type: ignore
+
+    @classmethod
+    def build(cls, values: Iterable[str], directory: Optional[str] = None) -> "NameBuffer":
+        """
+        Encode name values and write the buffer files
+
+        Args:
+            values: Name values in sheet order
+            directory: Directory to write to, or None for a temporary
+                       directory that is removed with the returned buffer
+
+        Returns:
+            NameBuffer over the written files
+        """
+        owned = None
+        if directory is None:
+            directory = owned = tempfile.mkdtemp(prefix="name_buffer_")
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+
+        values = list(values)
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(name) + 1 for name in encoded], out=offsets[1:])
+        blob = b"".join(name + SEPARATOR for name in encoded)
+        with open(path / "names.bin", "wb") as f:
+            f.write(blob)
+        np.save(path / "offsets.npy", offsets)
+
+        # Distinct values by hash, each with its first row
+        sorted_hashes, first = np.unique(_hash_names(values), return_index=True)
+        np.save(path / "sorted_hashes.npy", sorted_hashes)
+        np.save(path / "sorted_first.npy", first.astype(np.int64))
+
+        keys, rows = cls._collect_trigrams(np.frombuffer(blob, dtype=np.uint8), offsets)
+        trigram_keys, starts = np.unique(keys, return_index=True)
+        np.save(path / "trigram_keys.npy", trigram_keys)
+        np.save(path / "trigram_offsets.npy", np.append(starts, len(keys)).astype(np.int64))
+        np.save(path / "trigram_rows.npy", rows)
+
+        buffer = cls(str(path))
+        buffer._owned = owned
+        return buffer
+
+    @staticmethod
+    def _collect_trigrams(codes: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        List the distinct (trigram, row) pairs of the names
+
+        Args:
+            codes: Bytes of the blob
+            offsets: Offset of every name in the blob, and the blob's length
+
+        Returns:
+            Trigram keys and rows, sorted by key and then row
+        """
+        rows_count = len(offsets) - 1
+        key_blocks, row_blocks = [], []
+        for start in range(0, rows_count, BUILD_BLOCK_ROWS):
+            end = min(start + BUILD_BLOCK_ROWS, rows_count)
+            block = codes[offsets[start]:offsets[end]]
+            if len(block) < 3:
+                continue
+
+            # Only trigrams inside one name count
+            separator = block == SEPARATOR[0]
+            valid = ~(separator[:-2] | separator[1:-1] | separator[2:])
+            rows = np.repeat(np.arange(start, end), np.diff(offsets[start:end + 1]))[:-2]
+            key_blocks.append(_trigram_keys(block)[valid])
+            row_blocks.append(rows[valid])
+
+        if not key_blocks:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+
+        keys = np.concatenate(key_blocks)
+        rows = np.concatenate(row_blocks).astype(np.int32 if rows_count < 2 ** 31 else np.int64)
+
+        # Rows are ascending within each key after a stable sort by key;
+        # drop trigrams repeated within a row
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+        distinct = np.ones(len(keys), dtype=bool)
+        distinct[1:] = (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1])
+        return keys[distinct], rows[distinct]
+
+    def find_partial(self, query: str) -> Optional[int]:
+        """
+        Find the first row whose value contains the query or is contained in it
+
+        Args:
+            query: String to match
+
+        Returns:
+            Row position of the earliest matching row, or None
+        """
+        if not len(self):
+            return None
+
+        encoded = query.encode("utf-8")
+        candidates = [position for position in (self._find_containing(encoded),
+                                                self._find_contained_in(query, encoded))
+                      if position is not None]
+        return min(candidates) if candidates else None
+
+    def _find_containing(self, query: bytes) -> Optional[int]:
+        """Find the first row whose value contains the query"""
+        if len(query) < 3:
+            # Too short to have a trigram, fall back to a scan
+            return self._row_at(self.blob.find(query))
+
+        # Every matching row holds each of the query's trigrams; the rows
+        # holding its two rarest ones are few enough to search one by one
+        keys = np.unique(_trigram_keys(np.frombuffer(query, dtype=np.uint8)))
+        slots = np.searchsorted(self.trigram_keys, keys)
+        if np.any(slots >= len(self.trigram_keys)) or \
+                np.any(self.trigram_keys[np.minimum(slots, len(self.trigram_keys) - 1)] != keys):
+            return None
+
+        sizes = self.trigram_offsets[slots + 1] - self.trigram_offsets[slots]
+        rarest = [self.trigram_rows[self.trigram_offsets[slot]:self.trigram_offsets[slot + 1]]
+                  for slot in slots[np.argsort(sizes, kind="stable")[:2]]]
+        rows = rarest[0] if len(rarest) == 1 else \
+            np.intersect1d(rarest[0], rarest[1], assume_unique=True)
+        for row in rows[:SEARCHED_CANDIDATES].tolist():
+            if self.blob.find(query, int(self.offsets[row]), int(self.offsets[row + 1])) >= 0:
+                return row
+
+        # Many candidates: one search over the span holding the rest
+        if len(rows) <= SEARCHED_CANDIDATES:
+            return None
+        return self._row_at(self.blob.find(query, int(self.offsets[rows[SEARCHED_CANDIDATES]]),
+                                           int(self.offsets[rows[-1] + 1])))
+
+    def _find_contained_in(self, query: str, encoded: bytes) -> Optional[int]:
+        """Find the first row whose value is contained in the query"""
+        if len(query) > MAX_SUBSTRING_QUERY:
+            for position in range(len(self)):
+                if self._name(position) in encoded:
+                    return position
+            return None
+
+        # Look up every substring of the query among the distinct values
+        substrings = sorted({query[start:end] for start in range(len(query))
+                             for end in range(start + 1, len(query) + 1)} | {""})
+        hashes = _hash_names(substrings)
+        slots = np.minimum(np.searchsorted(self.sorted_hashes, hashes),
+                           len(self.sorted_hashes) - 1)
+        found = np.flatnonzero(self.sorted_hashes[slots] == hashes)
+
+        # Earliest first; a hash collision is ruled out against the blob
+        firsts = self.sorted_first[slots[found]]
+        for i in np.argsort(firsts, kind="stable"):
+            position = int(firsts[i])
+            if self._name(position) == substrings[found[i]].encode("utf-8"):
+                return position
+        return None
+
+    def _name(self, position: int) -> bytes:
+        """Encoded value of a row"""
+        return self.blob[self.offsets[position]:self.offsets[position + 1] - 1]
+
+    def _row_at(self, offset: int) -> Optional[int]:
+        """Row holding a byte offset of the blob, or None for a failed search (-1)"""
+        if offset < 0:
+            return None
+        return int(np.searchsorted(self.offsets, offset, side="right")) - 1
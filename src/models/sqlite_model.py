@@ -0,0 +1,683 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Excel model backed by a SQLite database, for sheets larger than memory
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from src.models.excel_model import (ExcelModel, LoadCancelled, MAX_KEY_SEGMENTS, STREAM_CHUNK_ROWS,
+                                    _NOT_CACHED, _header_names, _named_width)
+from src.models.file_model import FileModel
+from src.utils.cache_utils import get_cache_dir, hash_file
+from src.utils.file_utils import sniff_csv_format
+from src.utils.string_utils import format_value, normalize_series
+
+# Bump when the database layout changes
+SQLITE_SCHEMA_VERSION = 2
+
+# Longest query whose substrings are looked up in the key index; longer
+# queries scan the keys instead
+MAX_SUBSTRING_QUERY = 256
+
+# Limits of the database directory; the least recently opened databases
+# are deleted beyond them
+DATABASE_MAX_BYTES = 8 * 1024 * 1024 * 1024
+DATABASE_MAX_ENTRIES = 10
+
+
+def _to_sql_value(value: Any) -> Any:
+    """Convert a cell value to something SQLite can store"""
+    if value is None or value is pd.NaT or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, datetime):
+        return format_value(value)
+    if isinstance(value, (str, int, float, bytes)):
+        return value
+    if hasattr(value, "item"):
+        # NumPy scalar
+        return _to_sql_value(value.item())
+    return str(value)
+
+
+def _sql_column(position: int) -> str:
+    """
+    Name the table column of a sheet column
+
+    Table columns are named by position: sheet headers may repeat or
+    differ only in case, which SQLite identifiers cannot.
+    """
+    return f"c{position}"
+
+
+class SQLiteExcelModel(ExcelModel):
+    """
+    Excel model that keeps the sheet in a SQLite database instead of memory
+
+    The sheet is imported once into a database file named after the file's
+    contents, so later loads open it directly. Normalized names are kept in
+    a B-tree indexed table with an FTS5 trigram index for partial matches,
+    and the tuples of key column values in another, so every lookup is a
+    query and memory use does not grow with the sheet.
+
+    data stays None. Fuzzy matching is not supported by this backend.
+    """
+
+    def __init__(self, file_path: str = None, database_dir: str = None,  # type: ignore
+                 max_bytes: int = DATABASE_MAX_BYTES, max_entries: int = DATABASE_MAX_ENTRIES):
+        """
+        Initialize a SQLite-backed Excel model
+
+        Args:
+            file_path: Path to the Excel file (optional)
+            database_dir: Directory for the imported databases (defaults to
+                          the per-user cache directory)
+            max_bytes: Maximum total size of the imported databases
+            max_entries: Maximum number of imported databases
+        """
+        super().__init__()
+        self.database_dir = Path(database_dir) if database_dir else get_cache_dir("databases")
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.connection: Optional[sqlite3.Connection] = None
+        self.row_count = 0
+
+        # Content hash of the imported file, used as the fingerprint
+        self._database_key = ""
+
+        # Name column and normalization the key table was built for
+        self._keys_state: Optional[str] = None
+
+        # Key columns and normalization the composite key table was built for
+        self._composite_state: Optional[str] = None
+
+        # Serializes use of the connection across threads
+        self._lock = threading.Lock()
+
+        if file_path:
+            self.load_data(file_path)
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the imported file's contents"""
+        return self._database_key
+
+    def close(self) -> None:
+        """Close the database connection"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def load_data(self, file_path: str, columns: Optional[List[str]] = None,
+                  chunk_size: int = STREAM_CHUNK_ROWS,
+                  progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                  cancel: Optional[threading.Event] = None,
+                  on_header: Optional[Callable[[List[str]], None]] = None) -> bool:
+        """
+        Open the database for a file, importing the file first if needed
+
+        Args:
+            file_path: Path to the Excel, CSV or TSV file
+            columns: Ignored; every column is imported, since the data is
+                     kept on disk
+            chunk_size: Number of rows inserted at a time while importing
+            progress: Called with (rows imported, total rows or None) after
+                      each chunk
+            cancel: Event that stops importing when set
+            on_header: Called with the column names once they are known
+
+        Returns:
+            True if loading was successful, False otherwise (including
+            when cancelled)
+        """
+        try:
+            source_stat = self._stat_source(file_path)
+            database_key = self._key_for(file_path)
+            database_path = self._database_path(database_key)
+            if database_path.exists():
+                # Mark the database as recently used for eviction
+                os.utime(database_path)
+            else:
+                self._import(file_path, database_path, chunk_size, progress, cancel)
+                self.prune()
+
+            connection = sqlite3.connect(str(database_path), check_same_thread=False)
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+
+            self.close()
+            self.connection = connection
+            self._database_key = database_key
+            self.columns = json.loads(meta["columns"])
+            self.row_count = int(meta["rows"])
+            self.file_path = file_path
+            self._source_stat = source_stat
+            self._keys_state = None
+            self._composite_state = None
+            self.match_cache.clear()
+            self._guess_column_mappings()
+
+            if on_header:
+                on_header(self.columns)
+            return True
+        except LoadCancelled:
+            return False
+        except Exception as e:
+            print(f"Error loading Excel file: {str(e)}")
+            return False
+
+    def load_latest(self) -> Optional["SQLiteExcelModel"]:  # type: ignore[override]
+        """
+        Import the current version of the file into a new model
+
+        Rows are not diffed: the new version gets a database of its own.
+        Safe to call from a background thread.
+
+        Returns:
+            Loaded model to pass to apply_latest(), or None if loading failed
+        """
+        latest = SQLiteExcelModel(database_dir=str(self.database_dir), max_bytes=self.max_bytes,
+                                  max_entries=self.max_entries)
+        if not latest.load_data(self.file_path):  # type: ignore
+            try:
+                self._source_stat = self._stat_source(self.file_path)  # type: ignore
+            except OSError:
+                pass
+            return None
+
+        return latest
+
+    def apply_latest(self, latest: "SQLiteExcelModel") -> Dict[str, int]:  # type: ignore[override]
+        """
+        Switch to the database of a model returned by load_latest()
+
+        The previous database is deleted, since the file it was imported
+        from no longer exists in that version.
+
+        Args:
+            latest: Model holding the current version of the file
+
+        Returns:
+            Dictionary with the number of "kept", "inserted" and "deleted"
+            rows; every row counts as replaced
+        """
+        changes = {"kept": 0, "inserted": latest.row_count, "deleted": self.row_count}
+
+        with self._lock:
+            self.close()
+            if self._database_key and self._database_key != latest._database_key:
+                self._database_path(self._database_key).unlink(missing_ok=True)
+            self.connection, latest.connection = latest.connection, None
+            self._database_key = latest._database_key
+            self.columns = latest.columns
+            self.row_count = latest.row_count
+            self._source_stat = latest._source_stat
+            self._keys_state = None
+            self._composite_state = None
+            self.match_cache.clear()
+
+        return changes
+
+    def prune(self) -> None:
+        """Delete least recently used databases until the directory is within its limits"""
+        if not self.database_dir.exists():
+            return
+
+        entries = [(entry.stat().st_mtime, entry.stat().st_size, entry)
+                   for entry in self.database_dir.glob("*.sqlite")]
+
+        # Newest first; keep databases while both limits allow
+        entries.sort(key=lambda item: item[0], reverse=True)
+        total = 0
+        for count, (_, size, entry) in enumerate(entries):
+            total += size
+            if count > 0 and (count >= self.max_entries or total > self.max_bytes):
+                entry.unlink(missing_ok=True)
+
+    def _database_path(self, database_key: str) -> Path:
+        """Path of the database with the given key"""
+        return self.database_dir / f"{database_key}.sqlite"
+
+    @staticmethod
+    def _key_for(file_path: str) -> str:
+        """Build the database name for a file from its path and contents"""
+        stat = os.stat(file_path)
+        parts = [str(Path(file_path).resolve()), str(stat.st_size), str(stat.st_mtime_ns),
+                 hash_file(file_path), str(SQLITE_SCHEMA_VERSION)]
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _import(self, file_path: str, database_path: Path, chunk_size: int,
+                progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                cancel: Optional[threading.Event] = None) -> None:
+        """
+        Import a file into a new database
+
+        The database is written under a temporary name and renamed when
+        complete, so an interrupted import is never opened.
+
+        Args:
+            file_path: Path to the Excel, CSV or TSV file
+            database_path: Path of the database to create
+            chunk_size: Number of rows inserted at a time
+            progress: Called with (rows imported, total rows or None)
+            cancel: Event that stops importing when set
+        """
+        self.database_dir.mkdir(parents=True, exist_ok=True)
+        partial = database_path.with_suffix(".partial")
+        if partial.exists():
+            partial.unlink()
+
+        connection = sqlite3.connect(str(partial))
+        try:
+            with self._open_chunks(file_path, chunk_size, cancel) as (header, total, chunks,
+                                                                       trailing):
+                connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                connection.execute(
+                    f"CREATE TABLE sheet (_position INTEGER PRIMARY KEY"
+                    f"{''.join(', ' + _sql_column(i) for i in range(len(header)))})")
+                insert = (f"INSERT INTO sheet VALUES (?, "
+                          f"{', '.join('?' for _ in header)})")
+
+                rows = 0
+                for chunk in chunks:
+                    if cancel is not None and cancel.is_set():
+                        raise LoadCancelled()
+
+                    values = chunk.astype(object).to_numpy().tolist()
+                    connection.executemany(insert, (
+                        [rows + i] + [_to_sql_value(value) for value in row]
+                        for i, row in enumerate(values)))
+                    rows += len(values)
+
+                    if progress:
+                        progress(rows, total)
+
+            # Trailing unnamed columns without data are left out, like
+            # read_excel does; their table columns stay unused
+            while trailing and connection.execute(
+                    f"SELECT COUNT({_sql_column(len(header) - 1)}) FROM sheet").fetchone()[0] == 0:
+                header = header[:-1]
+                trailing -= 1
+
+            connection.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("columns", json.dumps(header)), ("rows", str(rows)),
+                ("source", str(Path(file_path).resolve()))])
+            connection.commit()
+        except BaseException:
+            connection.close()
+            partial.unlink()
+            raise
+
+        connection.close()
+        os.replace(partial, database_path)
+
+    @staticmethod
+    @contextmanager
+    def _open_chunks(file_path: str, chunk_size: int, cancel: Optional[threading.Event] = None
+                     ) -> Iterator[Tuple[List[str], Optional[int], Iterator[pd.DataFrame], int]]:
+        """
+        Open a file for reading in chunks
+
+        Args:
+            file_path: Path to the Excel, CSV or TSV file
+            chunk_size: Number of rows per chunk
+            cancel: Event that stops reading when set
+
+        Returns:
+            Context manager giving the column names (like read_excel's),
+            the number of rows (or None), an iterator over DataFrame chunks
+            and the number of unnamed columns at the end of the header,
+            which are dropped if they hold no data
+        """
+        lower = file_path.lower()
+        if lower.endswith((".csv", ".tsv")):
+            encoding, delimiter = sniff_csv_format(file_path)
+            header = [str(column) for column in
+                      pd.read_csv(file_path, sep=delimiter, encoding=encoding, nrows=0).columns]
+            with pd.read_csv(file_path, sep=delimiter, encoding=encoding,
+                             chunksize=chunk_size) as reader:
+                yield header, None, iter(reader), 0
+
+        elif lower.endswith((".xlsx", ".xlsm")):
+            workbook = load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                sheet = workbook.worksheets[0]
+                rows = sheet.iter_rows(values_only=True)
+                header_row = next(rows, ())
+                header = _header_names(header_row)
+                total = sheet.max_row - 1 if sheet.max_row else None
+                yield header, total, ExcelModel._iter_sheet_chunks(
+                    rows, header, header, chunk_size, cancel), \
+                    len(header) - _named_width(header_row)
+            finally:
+                workbook.close()
+
+        else:
+            # Older formats have no streaming reader
+            frame = pd.read_excel(file_path)
+            yield [str(column) for column in frame.columns], len(frame), iter([frame]), 0
+
+    def _ensure_keys(self) -> None:
+        """
+        Build the normalized key table for the current name column
+
+        Keys are stored in the database, so they are only built once per
+        name column and normalization; switching back reuses them only if
+        nothing else was built in between.
+        """
+        state = json.dumps([self.name_column, list(self.normalization)])
+        if state == self._keys_state:
+            return
+
+        connection = self.connection
+        row = connection.execute("SELECT value FROM meta WHERE key = 'keys'").fetchone()  # type: ignore
+        if row is not None and row[0] == state:
+            self._keys_state = state
+            return
+
+        connection.execute("DROP TABLE IF EXISTS match_trigrams")  # type: ignore
+        connection.execute("DROP TABLE IF EXISTS match_fts")  # type: ignore
+        connection.execute("DROP TABLE IF EXISTS match_keys")  # type: ignore
+        connection.execute(  # type: ignore
+            "CREATE TABLE match_keys (position INTEGER PRIMARY KEY, key TEXT)")
+
+        for positions, (names,) in self._iter_normalized([self.name_column]):
+            connection.executemany(  # type: ignore
+                "INSERT INTO match_keys VALUES (?, ?)", zip(positions, names))
+
+        connection.execute("CREATE INDEX match_keys_key ON match_keys (key)")  # type: ignore
+        try:
+            connection.execute(  # type: ignore
+                "CREATE VIRTUAL TABLE match_fts USING fts5(key, content='match_keys', "
+                "content_rowid='position', tokenize='trigram case_sensitive 1')")
+            connection.execute("INSERT INTO match_fts (match_fts) VALUES ('rebuild')")  # type: ignore
+
+            # Row counts per trigram, so queries can pick their rarest ones
+            connection.execute(  # type: ignore
+                "CREATE VIRTUAL TABLE temp.match_vocab USING fts5vocab(main, match_fts, row)")
+            connection.execute(  # type: ignore
+                "CREATE TABLE match_trigrams (trigram TEXT PRIMARY KEY, rows INTEGER) WITHOUT ROWID")
+            connection.execute(  # type: ignore
+                "INSERT INTO match_trigrams SELECT term, doc FROM temp.match_vocab")
+            connection.execute("DROP TABLE temp.match_vocab")  # type: ignore
+        except sqlite3.OperationalError:
+            # No FTS5 or trigram tokenizer: partial matches scan the keys
+            pass
+
+        connection.execute("INSERT OR REPLACE INTO meta VALUES ('keys', ?)", (state,))  # type: ignore
+        connection.commit()  # type: ignore
+        self._keys_state = state
+
+    def _ensure_composite_keys(self) -> None:
+        """
+        Build the composite key table for the current key columns
+
+        Each row's normalized key column values are stored JSON-encoded, so
+        a tuple of filename segments is one lookup in the key index.
+        """
+        state = json.dumps([list(self.key_columns), list(self.normalization)])
+        if state == self._composite_state:
+            return
+
+        connection = self.connection
+        row = connection.execute(  # type: ignore
+            "SELECT value FROM meta WHERE key = 'composite_keys'").fetchone()
+        if row is not None and row[0] == state:
+            self._composite_state = state
+            return
+
+        connection.execute("DROP TABLE IF EXISTS composite_keys")  # type: ignore
+        connection.execute(  # type: ignore
+            "CREATE TABLE composite_keys (position INTEGER PRIMARY KEY, key TEXT)")
+        for positions, columns in self._iter_normalized(list(self.key_columns)):
+            connection.executemany(  # type: ignore
+                "INSERT INTO composite_keys VALUES (?, ?)",
+                zip(positions, (json.dumps(list(key)) for key in zip(*columns))))
+
+        connection.execute("CREATE INDEX composite_keys_key ON composite_keys (key)")  # type: ignore
+        connection.execute(  # type: ignore
+            "INSERT OR REPLACE INTO meta VALUES ('composite_keys', ?)", (state,))
+        connection.commit()  # type: ignore
+        self._composite_state = state
+
+    def _iter_normalized(self, columns: List[str]
+                         ) -> Iterator[Tuple[Tuple[int, ...], List[List[str]]]]:
+        """
+        Read columns in chunks and normalize their values
+
+        Args:
+            columns: Column names
+
+        Returns:
+            Iterator over (row positions, normalized values per column)
+        """
+        cursor = self.connection.execute(  # type: ignore
+            f"SELECT _position, {', '.join(_sql_column(self.columns.index(c)) for c in columns)} "
+            f"FROM sheet ORDER BY _position")
+        while True:
+            rows = cursor.fetchmany(STREAM_CHUNK_ROWS)
+            if not rows:
+                break
+            positions, *values = zip(*rows)
+            # NULL reads back as NaN, like a missing cell in the in-memory model
+            yield positions, [normalize_series(pd.Series(column, dtype=object).fillna(float("nan")),
+                                               self.normalization).tolist()
+                              for column in values]
+
+    def _has_trigram_index(self) -> bool:
+        """Check whether the trigram index exists"""
+        return self.connection.execute(  # type: ignore
+            "SELECT 1 FROM sqlite_master WHERE name = 'match_trigrams'").fetchone() is not None
+
+    def get_row_as_dict(self, row_idx: int) -> Dict[str, Any]:
+        """
+        Get a specific row as a dictionary
+
+        Args:
+            row_idx: Row index
+
+        Returns:
+            Dictionary with column names as keys and row values as values
+        """
+        if self.connection is None or not 0 <= row_idx < self.row_count:
+            return {}
+
+        return self.get_rows([row_idx])[0]
+
+    def get_rows(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        """
+        Get several rows as dictionaries
+
+        Args:
+            indices: Row indices
+
+        Returns:
+            List of dictionaries like get_row_as_dict(), in the order of
+            indices (missing rows give empty dictionaries)
+        """
+        if self.connection is None:
+            return []
+
+        positions = [int(index) for index in indices]
+        with self._lock:
+            rows = {row[0]: row[1:] for row in self.connection.execute(
+                "SELECT * FROM sheet WHERE _position IN (SELECT value FROM json_each(?))",
+                (json.dumps(positions),))}
+
+        return [{column: float("nan") if value is None else value
+                 for column, value in zip(self.columns, rows[position])}
+                if position in rows else {} for position in positions]
+
+    def find_match(self, filename: str) -> Tuple[bool, Optional[int], Optional[Dict[str, Any]]]:
+        """
+        Find a matching row for a filename
+
+        Args:
+            filename: Filename to match
+
+        Returns:
+            Tuple containing:
+            - Boolean indicating if a match was found
+            - Row index of the match (or None)
+            - Row data as dictionary (or None)
+        """
+        if self.connection is None or not self.name_column:
+            return False, None, None
+
+        key = (filename, self.key_columns, self.id_column, self.date_column,
+               self.normalization, self.fingerprint)
+        idx = self.match_cache.get(key, _NOT_CACHED)
+        if idx is _NOT_CACHED:
+            idx, _ = self._match_with_kind(filename)
+            self.match_cache.put(key, idx)
+
+        if idx is None:
+            return False, None, None
+
+        return True, idx, self.get_row_as_dict(idx)
+
+    def find_fuzzy_matches(self, filename: str, top_k: int = 5,
+                           time_budget: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Fuzzy matching is not supported by this backend; always empty"""
+        return []
+
+    def match_all(self, files: List[FileModel], workers: int = 1) -> pd.DataFrame:
+        """
+        Match a whole list of files against the data
+
+        Args:
+            files: List of FileModel objects, e.g. from scan_directory
+            workers: Ignored; lookups run in the database
+
+        Returns:
+            DataFrame like ExcelModel.match_all(), with match kinds
+            "composite", "exact", "partial" or None
+        """
+        matches = [self._match_with_kind(file.name) if self.connection is not None
+                   and self.name_column else (None, None) for file in files]
+        return pd.DataFrame({
+            "file": pd.Series([file.relative_path for file in files], dtype=object),
+            "row_index": pd.array([idx for idx, _ in matches], dtype="Int64"),
+            "match_kind": pd.Series([kind for _, kind in matches], dtype=object)
+        })
+
+    def _match_with_kind(self, filename: str) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Look up the matching row for a filename with indexed queries
+
+        Args:
+            filename: Filename to match
+
+        Returns:
+            Tuple of the matched row position and match kind, or (None, None)
+        """
+        filename_without_ext, filename = self._prepare_filename(filename)
+
+        with self._lock:
+            # With several key columns, try the composite key first
+            if len(self.key_columns) > 1:
+                idx = self._find_composite(filename_without_ext)
+                if idx is not None:
+                    return idx, "composite"
+
+            self._ensure_keys()
+            connection = self.connection
+
+            idx = connection.execute(  # type: ignore
+                "SELECT MIN(position) FROM match_keys WHERE key IN (?, ?)",
+                (filename_without_ext, filename)).fetchone()[0]
+            if idx is not None:
+                return idx, "exact"
+
+            candidates = [self._find_containing(filename_without_ext),
+                          self._find_contained_in(filename_without_ext)]
+            candidates = [idx for idx in candidates if idx is not None]
+            if candidates:
+                return min(candidates), "partial"
+
+        return None, None
+
+    def _find_composite(self, filename_without_ext: str) -> Optional[int]:
+        """
+        Match filename segments against the composite key table
+
+        Segments are split and combined like ExcelModel._find_composite(),
+        and all orderings are looked up in one query.
+
+        Args:
+            filename_without_ext: Normalized filename without extension
+
+        Returns:
+            Earliest matching row position, or None
+        """
+        self._ensure_composite_keys()
+        segments = [segment.strip() for segment in
+                    re.split(r'\s+-\s+', filename_without_ext)]
+        segments = list(dict.fromkeys(segment for segment in segments if segment))
+        segments = segments[:MAX_KEY_SEGMENTS]
+
+        keys = [json.dumps(list(key))
+                for key in itertools.permutations(segments, len(self.key_columns))]
+        if not keys:
+            return None
+
+        return self.connection.execute(  # type: ignore
+            "SELECT MIN(position) FROM composite_keys "
+            "WHERE key IN (SELECT value FROM json_each(?))", (json.dumps(keys),)).fetchone()[0]
+
+    def _find_containing(self, query: str) -> Optional[int]:
+        """Find the first row whose key contains the query"""
+        connection = self.connection
+        if len(query) >= 3 and self._has_trigram_index():
+            trigrams = sorted({query[i:i + 3] for i in range(len(query) - 2)})
+            counts = connection.execute(  # type: ignore
+                f"SELECT trigram, rows FROM match_trigrams WHERE trigram IN "
+                f"({', '.join('?' for _ in trigrams)}) ORDER BY rows", trigrams).fetchall()
+            if len(counts) < len(trigrams):
+                # Some trigram of the query is in no key
+                return None
+
+            # Matching on every trigram reads the long lists of the common
+            # ones; the two rarest narrow the candidates enough to verify
+            terms = " AND ".join('"' + trigram.replace('"', '""') + '"'
+                                 for trigram, _ in counts[:2])
+            return connection.execute(  # type: ignore
+                "SELECT MIN(k.position) FROM match_fts f JOIN match_keys k "
+                "ON k.position = f.rowid WHERE match_fts MATCH ? AND instr(k.key, ?) > 0",
+                (terms, query)).fetchone()[0]
+
+        # Too short for a trigram, fall back to a scan
+        return connection.execute(  # type: ignore
+            "SELECT MIN(position) FROM match_keys WHERE instr(key, ?) > 0",
+            (query,)).fetchone()[0]
+
+    def _find_contained_in(self, query: str) -> Optional[int]:
+        """Find the first row whose key is contained in the query"""
+        connection = self.connection
+        if len(query) > MAX_SUBSTRING_QUERY:
+            return connection.execute(  # type: ignore
+                "SELECT MIN(position) FROM match_keys WHERE instr(?, key) > 0",
+                (query,)).fetchone()[0]
+
+        # Every substring of the query is one lookup in the key index
+        substrings = {query[start:end] for start in range(len(query))
+                      for end in range(start + 1, len(query) + 1)}
+        substrings.add("")
+        return connection.execute(  # type: ignore
+            "SELECT MIN(position) FROM match_keys "
+            "WHERE key IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(substrings)),)).fetchone()[0]
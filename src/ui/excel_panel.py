@@ -6,6 +6,8 @@ Excel panel component for displaying Excel data
 """
 
 from src.models.excel_model import ExcelModel
+from src.utils.cache_utils import get_cache_dir
+from src.utils.string_utils import format_value
 import tkinter as tk
 from tkinter import ttk, StringVar, BOTH, X, Y, LEFT, RIGHT, END, W
 from typing import List, Dict, Any, Callable, Optional, Tuple
@@ -34,11 +36,16 @@ class ExcelPanel:
         self.parent = parent
         self.on_excel_row_select = on_excel_row_select
 
-        self.excel_model = ExcelModel()
+        self.cache_dir = str(get_cache_dir("workbooks"))
+        self.excel_model = self.create_model()
         self.name_column = StringVar()
         self.id_column = StringVar()
         self.date_column = StringVar()
 
+        # Treeview item IDs by row position, and row positions by item ID
+        self._row_items: List[str] = []
+        self._item_rows: Dict[str, int] = {}
+
         # Initialize UI components
         self.frame = ttk.LabelFrame(parent, text="Excel Data", padding="10")
         self._setup_ui()
@@ -113,6 +120,25 @@ class ExcelPanel:
 
         return False
 
+    def create_model(self) -> ExcelModel:
+        """
+        Create an empty Excel model configured for this panel
+
+        Returns:
+            New ExcelModel, e.g. to load in a background thread
+        """
+        return ExcelModel(cache_dir=self.cache_dir)
+
+    def set_model(self, excel_model: ExcelModel):
+        """
+        Show an already loaded Excel model
+
+        Args:
+            excel_model: Loaded ExcelModel
+        """
+        self.excel_model = excel_model
+        self._update_ui_from_model()
+
     def _update_ui_from_model(self):
         """Update UI components from the Excel model"""
         if self.excel_model.data is None:
@@ -122,8 +148,9 @@ class ExcelPanel:
         for column in self.excel_tree["columns"]:
             self.excel_tree.heading(column, text="")
 
-        for item in self.excel_tree.get_children():
-            self.excel_tree.delete(item)
+        self.excel_tree.delete(*self.excel_tree.get_children())
+        self._row_items = []
+        self._item_rows = {}
 
         # Get columns from model
         columns = self.excel_model.columns
@@ -145,14 +172,16 @@ class ExcelPanel:
         for col in columns:
             self.excel_tree.heading(col, text=col)
             # Adjust column width based on content
-            max_width = max([len(str(self.excel_model.data[col].iloc[i])) for i in range(
+            max_width = max([len(format_value(self.excel_model.data[col].iloc[i])) for i in range(
                 min(10, len(self.excel_model.data)))] + [len(col)])
             self.excel_tree.column(col, width=max_width * 10)
 
         # Insert data rows
-        for i, row in self.excel_model.data.iterrows():
-            values = [row[col] for col in columns]
-            self.excel_tree.insert("", END, values=values)
+        for row in self.excel_model.get_rows(range(len(self.excel_model.data))):
+            values = [format_value(row[col]) for col in columns]
+            item = self.excel_tree.insert("", END, values=values)
+            self._item_rows[item] = len(self._row_items)
+            self._row_items.append(item)
 
     def _on_excel_row_select_internal(self, event):
         """Internal handler for Excel row selection"""
@@ -162,17 +191,10 @@ class ExcelPanel:
         # Get selected item
         selected_item = self.excel_tree.selection()[0]
 
-        # Get item values
-        values = self.excel_tree.item(selected_item)["values"]
-
-        # Create a dictionary of column names and values
+        # Read the row from the model rather than the displayed text
         if self.excel_model.data is not None:
-            columns = self.excel_model.columns
-            row_data = {columns[i]: values[i] for i in range(len(columns))}
-
-            # Get the row index
-            items = self.excel_tree.get_children()
-            row_index = items.index(selected_item)
+            row_index = self._item_rows[selected_item]
+            row_data = self.excel_model.get_row_as_dict(row_index)
 
             # Call the external handler if provided
             if self.on_excel_row_select:
@@ -198,36 +220,18 @@ class ExcelPanel:
         self.excel_model.id_column = self.id_column.get()
         self.excel_model.date_column = self.date_column.get()
 
-        # Remove extension from filename for matching
-        filename_without_ext = filename
-        if '.' in filename:
-            filename_without_ext = filename.rsplit('.', 1)[0]
-
         # Clear previous selection
-        for item in self.excel_tree.selection():
-            self.excel_tree.selection_remove(item)
-
-        # Try exact match first
-        for item in self.excel_tree.get_children():
-            values = self.excel_tree.item(item)["values"]
-            col_index = self.excel_model.columns.index(self.name_column.get())
-            excel_value = str(values[col_index])
-
-            if excel_value == filename_without_ext or excel_value == filename:
-                self.excel_tree.selection_set(item)
-                self.excel_tree.see(item)
-                return True, item
-
-        # Try partial match if exact match failed
-        for item in self.excel_tree.get_children():
-            values = self.excel_tree.item(item)["values"]
-            col_index = self.excel_model.columns.index(self.name_column.get())
-            excel_value = str(values[col_index])
-
-            if filename_without_ext in excel_value or excel_value in filename_without_ext:
-                self.excel_tree.selection_set(item)
-                self.excel_tree.see(item)
-                return True, item
+        selection = self.excel_tree.selection()
+        if selection:
+            self.excel_tree.selection_remove(*selection)
+
+        # Match through the model's index and select the corresponding row
+        match_found, row_index, _ = self.excel_model.find_match(filename)
+        if match_found:
+            item = self._row_items[row_index]
+            self.excel_tree.selection_set(item)
+            self.excel_tree.see(item)
+            return True, item
 
         return False, None
 
@@ -243,11 +247,9 @@ class ExcelPanel:
             return None
 
         selected_item = self.excel_tree.selection()[0]
-        values = self.excel_tree.item(selected_item)["values"]
 
         if self.excel_model.data is not None:
-            columns = self.excel_model.columns
-            return {columns[i]: values[i] for i in range(len(columns))}
+            return self.excel_model.get_row_as_dict(self._item_rows[selected_item])
 
         return None
 
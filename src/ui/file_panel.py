@@ -5,7 +5,7 @@
 File panel component for displaying and managing files
 """
 
-from src.utils.file_utils import filter_files_by_extension, search_files_by_name
+from src.utils.file_utils import filter_files_by_extension, search_files_by_name, scan_order_key
 from src.models.file_model import FileModel
 import tkinter as tk
 from tkinter import ttk, StringVar, BOTH, X, Y, LEFT, RIGHT, END, W
@@ -38,6 +38,10 @@ class FilePanel:
         self.filtered_files = []  # Files after filtering
         self.selected_file = None
 
+        # Extension filter and search term behind filtered_files
+        self._extensions: Optional[List[str]] = None
+        self._search_text = ""
+
         # Initialize UI components
         self.frame = ttk.LabelFrame(parent, text="Files", padding="10")
         self._setup_ui()
@@ -132,6 +136,8 @@ class FilePanel:
         else:
             # Custom extension
             extensions = [filter_value.lower()]
+        self._extensions = extensions
+        self._search_text = ""
 
         # Clear listbox
         self.files_listbox.delete(0, END)
@@ -145,7 +151,7 @@ class FilePanel:
 
         # Update listbox
         for file in self.filtered_files:
-            self.files_listbox.insert(END, file.name)
+            self.files_listbox.insert(END, file.relative_path)
 
     def search_files(self):
         """Search files by name"""
@@ -164,10 +170,11 @@ class FilePanel:
 
         # Update filtered_files to only include search matches
         self.filtered_files = matching_files
+        self._search_text = search_text
 
         # Update listbox
         for file in self.filtered_files:
-            self.files_listbox.insert(END, file.name)
+            self.files_listbox.insert(END, file.relative_path)
 
     def _on_file_select_internal(self, event):
         """Internal handler for file selection from listbox"""
@@ -197,6 +204,70 @@ class FilePanel:
         self.all_files = files
         self.apply_filter()
 
+    def apply_delta(self, delta: Dict[str, list]):
+        """
+        Apply the changes found by a rescan without rebuilding the list
+
+        Only the listbox rows of changed files are deleted or inserted;
+        the current filter and search stay in effect.
+
+        Args:
+            delta: Dictionary with "added" and "modified" (lists of
+                   FileModel objects) and "removed" (list of relative
+                   paths), as returned by ScanIndex.scan(), and optionally
+                   "renamed" (list of (old relative path, FileModel)), as
+                   delivered by FolderWatcher
+        """
+        renamed = delta.get("renamed", [])
+        changed = delta["added"] + delta["modified"] + [file for _, file in renamed]
+        if not changed and not delta["removed"]:
+            return
+
+        # Replaced entries go too, including models renamed in place
+        # whose relative_path already holds the new name
+        dropped = (set(delta["removed"]) | {old_path for old_path, _ in renamed} |
+                   {file.relative_path for file in changed})
+        for index in reversed([index for index, file in enumerate(self.filtered_files)
+                               if file.relative_path in dropped]):
+            self.files_listbox.delete(index)
+        self.filtered_files = [file for file in self.filtered_files
+                               if file.relative_path not in dropped]
+        self.all_files = [file for file in self.all_files if file.relative_path not in dropped]
+        if self.selected_file is not None and self.selected_file.relative_path in dropped:
+            self.selected_file = None
+
+        for file in changed:
+            self._insert_sorted(self.all_files, file)
+            if self._is_shown(file):
+                index = self._insert_sorted(self.filtered_files, file)
+                self.files_listbox.insert(index, file.relative_path)
+
+    def _is_shown(self, file: FileModel) -> bool:
+        """Check whether a file passes the current filter and search"""
+        if self._extensions is not None and file.extension.lower() not in [
+                ext.lower() for ext in self._extensions]:
+            return False
+        return not self._search_text or self._search_text in file.name.lower()
+
+    @staticmethod
+    def _insert_sorted(files: List[FileModel], file: FileModel) -> int:
+        """
+        Insert a file into a list kept in scan order
+
+        Returns:
+            Index the file was inserted at
+        """
+        key = scan_order_key(file.relative_path)
+        low, high = 0, len(files)
+        while low < high:
+            middle = (low + high) // 2
+            if scan_order_key(files[middle].relative_path) < key:
+                low = middle + 1
+            else:
+                high = middle
+        files.insert(low, file)
+        return low
+
     def get_selected_file(self) -> Optional[FileModel]:
         """
         Get the currently selected file
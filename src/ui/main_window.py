@@ -5,8 +5,10 @@
 Main window component for the Excel File Renamer application
 """
 
-from src.utils.string_utils import is_valid_filename, sanitize_filename
-from src.utils.file_utils import scan_directory, rename_file
+from src.utils.string_utils import format_value, is_valid_filename, sanitize_filename
+from src.utils.file_utils import rename_file
+from src.utils.scan_index import ScanIndex
+from src.utils.folder_watcher import FolderWatcher
 from src.ui.pattern_builder import PatternBuilder
 from src.ui.excel_panel import ExcelPanel
 from src.ui.file_panel import FilePanel
@@ -14,7 +16,9 @@ from src.models.excel_model import ExcelModel
 from src.models.file_model import FileModel
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, StringVar, BOTH, X, Y, LEFT, RIGHT, END, W, SUNKEN
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import queue
+import threading
 import sys
 import os
 
@@ -22,6 +26,15 @@ import os
 sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '../..')))
 
+# How often the UI checks on a background Excel load, in milliseconds
+EXCEL_LOAD_POLL_MS = 100
+
+# How often the loaded Excel file is checked for changes, in milliseconds
+EXCEL_WATCH_MS = 2000
+
+# How often the UI applies changes found by the folder watcher, in milliseconds
+FOLDER_WATCH_POLL_MS = 200
+
 
 class MainWindow:
     """Main window for the Excel File Renamer application"""
@@ -47,15 +60,35 @@ class MainWindow:
         }
 
         self.source_folder = StringVar()
+        self.include_subfolders = tk.BooleanVar(value=False)
+        self.watch_folder = tk.BooleanVar(value=False)
         self.excel_file_path = StringVar()
         self.manual_filename = StringVar()
         self.keep_extension = tk.BooleanVar(value=True)
 
         self.selected_file = None
 
+        # Snapshot of the scanned folder, for incremental rescans
+        self._scan_index: Optional[ScanIndex] = None
+
+        # Live watching of the scanned folder: the watcher and the queue it
+        # delivers its batches of changes to
+        self._folder_watcher: Optional[FolderWatcher] = None
+        self._folder_changes: queue.Queue = queue.Queue()
+
+        # Background Excel loading: messages from the worker and its cancel flag
+        self._excel_load_queue: Optional[queue.Queue] = None
+        self._excel_load_cancel: Optional[threading.Event] = None
+
         # Initialize UI components
         self.setup_ui()
 
+        # Pick up edits to the loaded Excel file
+        self.root.after(EXCEL_WATCH_MS, self._watch_excel_file)
+
+        # Apply changes found by the folder watcher
+        self.root.after(FOLDER_WATCH_POLL_MS, self._poll_folder_changes)
+
     def setup_ui(self):
         """Set up the user interface"""
         # Main frame
@@ -81,6 +114,12 @@ class MainWindow:
                   width=50).grid(row=0, column=1, padx=5, pady=5)
         ttk.Button(top_frame, text="Browse...", command=self.browse_source).grid(
             row=0, column=2, padx=5, pady=5)
+        ttk.Checkbutton(top_frame, text="Include subfolders", variable=self.include_subfolders,
+                        command=self.toggle_subfolders).grid(row=0, column=3,
+                                                             padx=5, pady=5, sticky=W)
+        ttk.Checkbutton(top_frame, text="Watch folder", variable=self.watch_folder,
+                        command=self.toggle_watch).grid(row=0, column=4,
+                                                        padx=5, pady=5, sticky=W)
 
         # Excel file
         ttk.Label(top_frame, text="Excel File:").grid(
@@ -89,8 +128,12 @@ class MainWindow:
                   width=50).grid(row=1, column=1, padx=5, pady=5)
         ttk.Button(top_frame, text="Browse...", command=self.browse_excel).grid(
             row=1, column=2, padx=5, pady=5)
-        ttk.Button(top_frame, text="Load Excel", command=self.load_excel_data).grid(
-            row=1, column=3, padx=5, pady=5)
+        self.load_excel_button = ttk.Button(
+            top_frame, text="Load Excel", command=self.load_excel_data)
+        self.load_excel_button.grid(row=1, column=3, padx=5, pady=5)
+        self.cancel_load_button = ttk.Button(
+            top_frame, text="Cancel", command=self.cancel_excel_load, state=tk.DISABLED)
+        self.cancel_load_button.grid(row=1, column=4, padx=5, pady=5)
 
         # Pattern builder
         self.pattern_builder = PatternBuilder(
@@ -162,56 +205,280 @@ class MainWindow:
         """Browse for Excel file"""
         file_path = filedialog.askopenfilename(filetypes=[
             ("Excel files", "*.xlsx;*.xls"),
+            ("CSV/TSV files", "*.csv;*.tsv"),
             ("All files", "*.*")
         ])
         if file_path:
             self.excel_file_path.set(file_path)
 
     def load_excel_data(self):
-        """Load data from Excel file"""
+        """Load data from Excel file in a background thread"""
         excel_path = self.excel_file_path.get()
         if not excel_path:
             messagebox.showerror("Error", "Please select an Excel file")
             return
 
-        try:
-            # Load Excel data into the Excel panel
-            success = self.excel_panel.load_excel_data(excel_path)
+        # Ignore clicks while a load is already running
+        if self._excel_load_cancel is not None:
+            return
 
-            if success:
-                # Update pattern builder with available columns
-                columns = self.excel_panel.excel_model.columns
-                self.pattern_builder.set_available_columns(columns)
+        self._excel_load_queue = queue.Queue()
+        self._excel_load_cancel = threading.Event()
+        worker = threading.Thread(
+            target=self._load_excel_worker,
+            args=(self.excel_panel.create_model(), excel_path,
+                  self._excel_load_queue, self._excel_load_cancel),
+            daemon=True)
+
+        self.load_excel_button.config(state=tk.DISABLED)
+        self.cancel_load_button.config(state=tk.NORMAL)
+        self.status_var.set("Loading Excel data...")
+
+        worker.start()
+        self.root.after(EXCEL_LOAD_POLL_MS, self._poll_excel_load)
+
+    def cancel_excel_load(self):
+        """Cancel the running background Excel load"""
+        if self._excel_load_cancel is not None:
+            self._excel_load_cancel.set()
+            self.status_var.set("Cancelling Excel loading...")
+
+    @staticmethod
+    def _load_excel_worker(excel_model: ExcelModel, excel_path: str,
+                           messages: queue.Queue, cancel: threading.Event):
+        """
+        Load an Excel model off the UI thread
 
-                self.status_var.set(
-                    # type: ignore
-                    f"Loaded {len(self.excel_panel.excel_model.data)} rows from Excel")
+        Never touches Tk; everything is reported through the message queue.
+
+        Args:
+            excel_model: Empty model to load into
+            excel_path: Path to the Excel file
+            messages: Queue for ("header" | "progress" | "done" | "cancelled" |
+                      "failed" | "error", ...) messages
+            cancel: Event set by the UI to stop loading
+        """
+        try:
+            success = excel_model.load_data(
+                excel_path,
+                progress=lambda rows, total: messages.put(("progress", rows, total)),
+                cancel=cancel,
+                on_header=lambda columns: messages.put(("header", columns)))
+
+            if cancel.is_set():
+                messages.put(("cancelled",))
+            elif success:
+                # Build the match index here instead of on the first file selection
+                excel_model.prepare_index()
+                messages.put(("done", excel_model))
             else:
-                self.status_var.set("Error loading Excel data")
+                messages.put(("failed",))
+
+        except Exception as e:
+            messages.put(("error", str(e)))
+
+    def _watch_excel_file(self):
+        """Reload the Excel file in the background when it changes on disk"""
+        excel_model = self.excel_panel.excel_model
+        if self._excel_load_cancel is None and excel_model.has_changed():
+            self._excel_load_queue = queue.Queue()
+            self._excel_load_cancel = threading.Event()
+            worker = threading.Thread(
+                target=self._reload_excel_worker,
+                args=(excel_model, self._excel_load_queue),
+                daemon=True)
+
+            self.load_excel_button.config(state=tk.DISABLED)
+            self.status_var.set("Excel file changed, reloading...")
+
+            worker.start()
+            self.root.after(EXCEL_LOAD_POLL_MS, self._poll_excel_load)
+
+        self.root.after(EXCEL_WATCH_MS, self._watch_excel_file)
+
+    @staticmethod
+    def _reload_excel_worker(excel_model: ExcelModel, messages: queue.Queue):
+        """
+        Load the current version of a changed Excel file off the UI thread
+
+        The shown model is only read here; the differences are applied on
+        the UI thread when the "updated" message arrives.
 
+        Args:
+            excel_model: Model shown in the Excel panel
+            messages: Queue for ("updated" | "failed" | "error", ...) messages
+        """
+        try:
+            latest = excel_model.load_latest()
+            if latest is None:
+                messages.put(("failed",))
+            else:
+                messages.put(("updated", excel_model, latest))
         except Exception as e:
+            messages.put(("error", str(e)))
+
+    def _poll_excel_load(self):
+        """Apply the messages posted by the background Excel load"""
+        if self._excel_load_queue is None:
+            return
+
+        while True:
+            try:
+                message = self._excel_load_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if message[0] == "header":
+                # Let the user start building a pattern while rows load
+                self.pattern_builder.set_available_columns(message[1])
+            elif message[0] == "progress":
+                rows, total = message[1], message[2]
+                if total:
+                    self.status_var.set(f"Loading Excel data... {rows} of {total} rows")
+                else:
+                    self.status_var.set(f"Loading Excel data... {rows} rows")
+            else:
+                self._finish_excel_load(message)
+                return
+
+        self.root.after(EXCEL_LOAD_POLL_MS, self._poll_excel_load)
+
+    def _finish_excel_load(self, message: Tuple[Any, ...]):
+        """
+        Handle the end of a background Excel load
+
+        Args:
+            message: Final message from the worker
+        """
+        self._excel_load_queue = None
+        self._excel_load_cancel = None
+        self.load_excel_button.config(state=tk.NORMAL)
+        self.cancel_load_button.config(state=tk.DISABLED)
+
+        if message[0] == "done":
+            excel_model = message[1]
+            self.excel_panel.set_model(excel_model)
+
+            # Update pattern builder with available columns
+            self.pattern_builder.set_available_columns(excel_model.columns)
+
+            self.status_var.set(f"Loaded {len(excel_model.data)} rows from Excel "
+                                f"({excel_model.memory_per_row():.0f} bytes per row)")
+        elif message[0] == "updated":
+            excel_model, latest = message[1], message[2]
+            if excel_model is not self.excel_panel.excel_model:
+                # Another file was loaded in the meantime
+                return
+
+            changes = excel_model.apply_latest(latest)
+            self.excel_panel.set_model(excel_model)
+            self.pattern_builder.set_available_columns(excel_model.columns)
+
+            self.status_var.set(
+                f"Reloaded Excel file: {changes['inserted']} rows added, "
+                f"{changes['deleted']} removed, {changes['kept']} unchanged")
+        elif message[0] == "cancelled":
+            self.status_var.set("Excel loading cancelled")
+        elif message[0] == "failed":
+            self.status_var.set("Error loading Excel data")
+        else:
             messagebox.showerror(
-                "Error", f"Failed to load Excel file: {str(e)}")
+                "Error", f"Failed to load Excel file: {message[1]}")
             self.status_var.set("Error loading Excel data")
 
-    def scan_files(self):
-        """Scan files in the source folder"""
+    def toggle_subfolders(self):
+        """Rescan the source folder when subfolder scanning is switched"""
+        if self.source_folder.get():
+            self.scan_files()
+
+    def scan_files(self, full: bool = True):
+        """
+        Scan files in the source folder
+
+        Args:
+            full: Stat every file. Refreshes after this window's own renames
+                  pass False to list only the directories whose mtime moved,
+                  which misses files rewritten in place.
+        """
         source = self.source_folder.get()
         if not source:
             messagebox.showerror("Error", "Please select a source folder")
             return
 
         try:
-            # Scan directory and update file panel
-            files = scan_directory(source)
-            self.file_panel.update_files(files)
+            recursive = self.include_subfolders.get()
+            index = self._scan_index
+            if index is not None and index.directory_path == source and \
+                    index.recursive == recursive:
+                # Same folder: only apply what changed since the last scan
+                delta = index.scan(full=full)
+                self.file_panel.apply_delta(delta)
+                self.status_var.set(
+                    f"Rescanned files: {len(delta['added'])} added, "
+                    f"{len(delta['removed'])} removed, {len(delta['modified'])} modified")
+                return
+
+            if index is not None:
+                index.close()
+            self._scan_index = None
 
+            # Start from the snapshot kept from earlier sessions, if any; it
+            # may hold stale sizes and times of files rewritten in place
+            index = ScanIndex(source, recursive=recursive)
+            index.scan(full=True)
+            self._scan_index = index
+
+            files = index.files()
+            self.file_panel.update_files(files)
             self.status_var.set(f"Scanned {len(files)} files")
+            self._restart_folder_watcher()
 
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
             self.status_var.set("Error scanning files")
 
+    def toggle_watch(self):
+        """Start or stop watching the scanned folder for changes"""
+        self._restart_folder_watcher()
+        if self._folder_watcher is not None and self._folder_watcher.polling:
+            self.status_var.set("Watching folder (polling; live events are not available)")
+        elif self._folder_watcher is not None:
+            self.status_var.set("Watching folder for changes")
+
+    def _restart_folder_watcher(self):
+        """Watch the scanned folder if watching is enabled, replacing any old watcher"""
+        if self._folder_watcher is not None:
+            self._folder_watcher.stop()
+            self._folder_watcher = None
+
+        # Batches from the old watcher no longer apply
+        self._folder_changes = queue.Queue()
+
+        index = self._scan_index
+        if not self.watch_folder.get() or index is None:
+            return
+
+        self._folder_watcher = FolderWatcher(
+            index.directory_path, self._folder_changes.put,
+            files=self.file_panel.all_files, recursive=index.recursive)
+        self._folder_watcher.start()
+
+    def _poll_folder_changes(self):
+        """Apply the batches of changes delivered by the folder watcher"""
+        while True:
+            try:
+                delta = self._folder_changes.get_nowait()
+            except queue.Empty:
+                break
+
+            self.file_panel.apply_delta(delta)
+            self.status_var.set(
+                f"Folder changed: {len(delta['added'])} added, "
+                f"{len(delta['removed'])} removed, {len(delta['renamed'])} renamed, "
+                f"{len(delta['modified'])} modified")
+
+        self.root.after(FOLDER_WATCH_POLL_MS, self._poll_folder_changes)
+
     def on_file_select(self, file_model: FileModel):
         """
         Handle file selection
@@ -341,14 +608,14 @@ class MainWindow:
         # Format Excel match details
         excel_details = "Excel Match:\n"
         for col, val in excel_data.items():
-            excel_details += f"{col}: {val}\n"
+            excel_details += f"{col}: {format_value(val)}\n"
 
         # Show proposed new filename based on ID column
         mappings = self.excel_panel.get_column_mappings()
         id_val = excel_data.get(mappings["id"], "")
         if id_val:
             extension = file_model.extension
-            proposed_name = f"{id_val}{extension}"
+            proposed_name = f"{format_value(id_val)}{extension}"
             excel_details += f"\nProposed new filename: {proposed_name}"
 
         # Update details label
@@ -377,7 +644,7 @@ class MainWindow:
             return
 
         # Format ID value to ensure it's a valid filename
-        id_val = str(id_val).strip()
+        id_val = format_value(id_val).strip()
         id_val = sanitize_filename(id_val)
 
         # Create new filename
@@ -397,7 +664,7 @@ class MainWindow:
 
             if success:
                 # Refresh file list
-                self.scan_files()
+                self.scan_files(full=False)
 
                 # Update status
                 self.status_var.set(f"Renamed file to {new_filename}")
@@ -438,7 +705,7 @@ class MainWindow:
 
             if success:
                 # Refresh file list
-                self.scan_files()
+                self.scan_files(full=False)
 
                 # Clear the manual filename entry
                 self.manual_filename.set("")
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cache utility classes
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk frame cache layout changes
+FRAME_CACHE_VERSION = 3
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, maxsize: int = 1024, max_cost: Optional[int] = None):
+        """
+        Initialize an LRU cache
+
+        Args:
+            maxsize: Maximum number of entries to keep
+            max_cost: Maximum total cost of the entries (e.g. in bytes), or
+                      None for no limit; the newest entry is always kept
+        """
+        self.maxsize = maxsize
+        self.max_cost = max_cost
+        self.total_cost = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._costs: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Get an entry and mark it as recently used
+
+        Args:
+            key: Entry key
+            default: Value to return if the key is not cached
+
+        Returns:
+            Cached value, or default on a miss
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any, cost: int = 0) -> None:
+        """
+        Store an entry, evicting least recently used ones while over a limit
+
+        Args:
+            key: Entry key
+            value: Value to cache
+            cost: Cost of the entry, counted against max_cost
+        """
+        self.total_cost += cost - self._costs.get(key, 0)
+        self._entries[key] = value
+        self._costs[key] = cost
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.maxsize or
+                (self.max_cost is not None and self.total_cost > self.max_cost)):
+            evicted, _ = self._entries.popitem(last=False)
+            self.total_cost -= self._costs.pop(evicted)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """
+        Get all entries without marking them as used
+
+        Returns:
+            List of (key, value) pairs, least recently used first
+        """
+        return list(self._entries.items())
+
+    def clear(self) -> None:
+        """Remove all entries (hit/miss counters are kept)"""
+        self._entries.clear()
+        self._costs.clear()
+        self.total_cost = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with hits, misses, current size and total cost
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self._entries), "cost": self.total_cost}
+
+
+def get_cache_dir(name: str) -> Path:
+    """
+    Get the per-user cache directory for the application
+
+    Args:
+        name: Name of the cache subdirectory
+
+    Returns:
+        Path to the directory (not created)
+    """
+    if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"]) / "FileSorter"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "file_sorter"
+    return base / name
+
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-1 of a file's contents
+
+    Args:
+        file_path: Path to the file
+        block_size: Number of bytes to read at a time
+
+    Returns:
+        Hex digest of the contents
+    """
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FrameCache:
+    """On-disk columnar cache of parsed DataFrames"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 1024 * 1024 * 1024,
+                 max_entries: int = 20):
+        """
+        Initialize a frame cache
+
+        Each entry is a directory holding one .npy file per column, so that
+        columns can be memory-mapped on load instead of parsed. Numeric,
+        boolean and datetime columns and the codes of categorical columns
+        stay mapped in the loaded frame, so they take no memory until read
+        (and are then shared through the page cache). Text columns are
+        decoded into Python strings on load.
+
+        Args:
+            cache_dir: Directory to keep the cache entries in
+            max_bytes: Maximum total size of the cache entries
+            max_entries: Maximum number of cache entries
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    def key_for(self, file_path: str, variant: Any = None) -> str:
+        """
+        Build the cache key for a source file
+
+        The key covers the resolved path, size, modification time and a hash
+        of the contents, so any change to the file misses the cache.
+
+        Args:
+            file_path: Path to the source file
+            variant: Anything else the parsed result depends on (e.g. the
+                     selected columns); must have a stable repr
+
+        Returns:
+            Cache key
+        """
+        stat = os.stat(file_path)
+        parts = [str(Path(file_path).resolve()), str(stat.st_size), str(stat.st_mtime_ns),
+                 hash_file(file_path), repr(variant), str(FRAME_CACHE_VERSION)]
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Load a cached DataFrame
+
+        Args:
+            key: Cache key from key_for()
+
+        Returns:
+            The cached DataFrame, or None if there is no valid entry
+        """
+        entry = self.cache_dir / key
+        try:
+            with open(entry / "meta.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+            columns = {}
+            for i, column in enumerate(meta["columns"]):
+                columns[i] = self._load_column(entry, i, column)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Mark the entry as recently used for eviction
+        os.utime(entry)
+
+        # Without copy=False the mapped arrays would be copied into blocks
+        frame = pd.DataFrame(columns, copy=False)
+        frame.columns = [column["name"] for column in meta["columns"]]
+        return frame
+
+    def store(self, key: str, frame: pd.DataFrame) -> None:
+        """
+        Store a DataFrame and evict old entries if the cache is too big
+
+        Args:
+            key: Cache key from key_for()
+            frame: DataFrame to store
+        """
+        entry = self.cache_dir / key
+        partial = self.cache_dir / f"{key}.partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        partial.mkdir(parents=True)
+
+        meta: Dict[str, List[Dict[str, Any]]] = {"columns": []}
+        for i, name in enumerate(frame.columns):
+            meta["columns"].append(self._store_column(partial, i, frame.iloc[:, i], name))
+
+        with open(partial / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(partial, entry)
+        self.prune()
+
+    def prune(self) -> None:
+        """Evict least recently used entries until the cache is within its limits"""
+        if not self.cache_dir.exists():
+            return
+
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if entry.is_dir() and not entry.name.endswith(".partial"):
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+
+        # Newest first; keep entries while both limits allow
+        entries.sort(key=lambda item: item[0], reverse=True)
+        total = 0
+        for count, (_, size, entry) in enumerate(entries):
+            total += size
+            if count > 0 and (count >= self.max_entries or total > self.max_bytes):
+                shutil.rmtree(entry, ignore_errors=True)
+
+    @classmethod
+    def _store_column(cls, entry: Path, i: Any, series: pd.Series, name: Any) -> Dict[str, Any]:
+        """Write one column and return its metadata"""
+        column = {"name": name, "dtype": str(series.dtype)}
+        if isinstance(series.dtype, pd.StringDtype) and column["dtype"] == "string":
+            # Keep the storage, which str() leaves out
+            column["dtype"] = f"string[{series.dtype.storage}]"
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Codes are native and can be memory-mapped; categories are small
+            column["kind"] = "category"
+            column["ordered"] = bool(series.dtype.ordered)
+            np.save(entry / f"{i}.npy", series.cat.codes.to_numpy())
+            column["categories"] = cls._store_column(
+                entry, f"{i}.categories", pd.Series(series.cat.categories), None)
+            return column
+
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM":
+            column["kind"] = "native"
+            np.save(entry / f"{i}.npy", series.to_numpy())
+            return column
+
+        values = series.to_numpy(dtype=object)
+        missing = series.isna().to_numpy()
+        if all(isinstance(value, str) for value in values[~missing]):
+            # One UTF-8 blob with character offsets reads without unpickling,
+            # and takes the size of the text rather than rows times the
+            # longest value
+            column["kind"] = "text"
+            text = np.where(missing, "", values).tolist()
+            offsets = np.zeros(len(text) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in text], out=offsets[1:])
+            blob = "".join(text).encode("utf-8", "surrogatepass")
+            np.save(entry / f"{i}.npy", np.frombuffer(blob, dtype=np.uint8))
+            np.save(entry / f"{i}.offsets.npy", offsets)
+            np.save(entry / f"{i}.mask.npy", missing)
+        else:
+            column["kind"] = "object"
+            np.save(entry / f"{i}.npy", values, allow_pickle=True)
+
+        return column
+
+    @classmethod
+    def _load_column(cls, entry: Path, i: Any, column: Dict[str, Any]) -> Any:
+        """
+        Read one column written by _store_column
+
+        Native arrays and category codes are mapped copy-on-write: pages
+        are read from the file on demand, and writes to the frame stay in
+        memory instead of failing on a read-only array.
+        """
+        if column["kind"] == "category":
+            categories = cls._load_column(entry, f"{i}.categories", column["categories"])
+            return pd.Categorical.from_codes(cls._map_array(entry / f"{i}.npy"),
+                                             categories=pd.Index(categories),
+                                             ordered=column["ordered"])
+
+        if column["kind"] == "native":
+            return cls._map_array(entry / f"{i}.npy")
+
+        if column["kind"] == "text":
+            text = np.load(entry / f"{i}.npy").tobytes().decode("utf-8", "surrogatepass")
+            offsets = np.load(entry / f"{i}.offsets.npy").tolist()
+            values = np.empty(len(offsets) - 1, dtype=object)
+            values[:] = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+            missing = np.load(entry / f"{i}.mask.npy", mmap_mode="r")
+            values[missing] = np.nan
+            return pd.Series(values, dtype=object).astype(column["dtype"])
+
+        return pd.Series(np.load(entry / f"{i}.npy", allow_pickle=True),
+                         dtype=object).astype(column["dtype"])
+
+    @staticmethod
+    def _map_array(path: Path) -> np.ndarray:
+        """Map a .npy file copy-on-write, as a plain ndarray rather than a memmap"""
+        return np.load(path, mmap_mode="c").view(np.ndarray)
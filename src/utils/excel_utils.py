@@ -6,6 +6,7 @@ Excel utility functions for Excel operations
 """
 
 from src.models.excel_model import ExcelModel
+from src.utils.string_utils import format_value
 import pandas as pd
 from typing import List, Dict, Any, Optional, Tuple
 import sys
@@ -62,7 +63,7 @@ def generate_filename_from_pattern(
     for part in pattern_parts:
         if part in excel_row:
             # Clean the value - remove special characters
-            value = str(excel_row[part])
+            value = format_value(excel_row[part])
             # Replace invalid filename chars
             value = re.sub(r'[\\/*?:"<>|]', '_', value)
             filename_parts.append(value)
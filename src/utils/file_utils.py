@@ -6,40 +6,175 @@ File utility functions for file operations
 """
 
 from src.models.file_model import FileModel
+import csv
+import fnmatch
 import os
 import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
 import sys
 
 # Add the parent directory to sys.path to allow relative imports
 sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '../..')))
 
+# Default number of threads listing directories in a recursive scan
+DEFAULT_SCAN_WORKERS = 8
 
-def scan_directory(directory_path: str) -> List[FileModel]:
+
+def scan_directory(directory_path: str, recursive: bool = False,
+                   include: Optional[Sequence[str]] = None,
+                   exclude: Optional[Sequence[str]] = None,
+                   max_depth: Optional[int] = None,
+                   workers: int = DEFAULT_SCAN_WORKERS) -> List[FileModel]:
     """
     Scan a directory and return a list of FileModel objects
 
+    Entries are listed with os.scandir, whose cached file type and stat
+    data are reused, so each file costs at most one stat call.
+
     Args:
         directory_path: Path to the directory to scan
+        recursive: Whether to scan subdirectories as well
+        include: Glob patterns a file's name or relative path must match
+                 (optional; all files if omitted)
+        exclude: Glob patterns of files and directories to skip, matched
+                 against the name and the relative path
+        max_depth: Deepest subdirectory level to scan in recursive mode
+                   (0 is the folder itself), or None for no limit
+        workers: Number of threads listing directories in recursive mode
 
     Returns:
-        List of FileModel objects
+        List of FileModel objects, in the order of iter_directory()
+    """
+    if not recursive:
+        max_depth = 0
+    return list(iter_directory(directory_path, include, exclude, max_depth, workers))
+
+
+def iter_directory(directory_path: str,
+                   include: Optional[Sequence[str]] = None,
+                   exclude: Optional[Sequence[str]] = None,
+                   max_depth: Optional[int] = None,
+                   workers: int = DEFAULT_SCAN_WORKERS) -> Iterator[FileModel]:
+    """
+    Walk a directory tree and yield its files as they are found
+
+    Subdirectories are listed ahead of time by a thread pool (scandir
+    releases the GIL while it waits on the file system), but files are
+    yielded in a stable order regardless of the number of threads: a
+    directory's files sorted by name, then each subdirectory in name order.
+    Symbolic links to directories are not followed, and directories that
+    cannot be read are skipped.
+
+    Args:
+        directory_path: Path to the directory to scan
+        include: Glob patterns a file's name or relative path must match
+                 (optional; all files if omitted)
+        exclude: Glob patterns of files and directories to skip, matched
+                 against the name and the relative path
+        max_depth: Deepest subdirectory level to scan (0 is the folder
+                   itself), or None for no limit
+        workers: Number of threads listing directories
+
+    Returns:
+        Iterator over FileModel objects
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        # Depth-first over pending listings; the next one is always on top
+        pending: List[Tuple[int, Future]] = [
+            (0, executor.submit(_list_directory, directory_path, "", include, exclude))]
+        while pending:
+            depth, future = pending.pop()
+            files, subdirectories = future.result()
+            yield from files
+
+            if max_depth is None or depth < max_depth:
+                futures = [(depth + 1, executor.submit(_list_directory, path, relative,
+                                                       include, exclude))
+                           for path, relative in subdirectories]
+                pending.extend(reversed(futures))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _list_directory(path: str, relative: str,
+                    include: Optional[Sequence[str]], exclude: Optional[Sequence[str]]
+                    ) -> Tuple[List[FileModel], List[Tuple[str, str]]]:
     """
-    path = Path(directory_path)
-    if not path.exists() or not path.is_dir():
-        return []
+    List one directory for iter_directory()
 
+    Args:
+        path: Path to the directory
+        relative: Its path relative to the scanned folder ("" for the folder)
+        include: Glob patterns files must match, or None
+        exclude: Glob patterns of entries to skip, or None
+
+    Returns:
+        Tuple of the files sorted by name and the (path, relative path) of
+        the subdirectories sorted by name; both empty if the directory
+        cannot be read
+    """
     files = []
-    for file_path in path.glob("*"):
-        if file_path.is_file():
-            files.append(FileModel(file_path))
+    subdirectories = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                entry_relative = os.path.join(relative, entry.name) if relative else entry.name
+                try:
+                    if exclude and matches_patterns(entry.name, entry_relative, exclude):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append((entry.path, entry_relative))
+                    elif entry.is_file() and (not include or
+                                              matches_patterns(entry.name, entry_relative, include)):
+                        files.append(FileModel.from_dir_entry(entry, entry_relative))
+                except OSError:
+                    # Removed or unreadable since it was listed
+                    continue
+    except OSError:
+        return [], []
+
+    # Sort by name; names differing only in case keep a fixed order
+    files.sort(key=lambda x: (x.name.lower(), x.name))
+    subdirectories.sort(key=lambda item: (item[1].lower(), item[1]))
+
+    return files, subdirectories
+
+
+def matches_patterns(name: str, relative_path: str, patterns: Sequence[str]) -> bool:
+    """
+    Check whether a file or directory matches any glob pattern
 
-    # Sort files by name
-    files.sort(key=lambda x: x.name.lower())
+    Args:
+        name: Name of the entry
+        relative_path: Its path relative to the scanned folder
+        patterns: Glob patterns, matched against the name and against the
+                  relative path with "/" separators
 
-    return files
+    Returns:
+        True if any pattern matches
+    """
+    relative_path = relative_path.replace(os.sep, "/")
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern)
+               for pattern in patterns)
+
+
+def scan_order_key(relative_path: str) -> Tuple[Tuple[int, str, str], ...]:
+    """
+    Sort key that puts relative paths in the order iter_directory() yields them
+
+    Args:
+        relative_path: File path relative to the scanned folder
+
+    Returns:
+        Key comparing a folder's files before its subfolders, each by name
+    """
+    parts = relative_path.split(os.sep)
+    return tuple([(1, part.lower(), part) for part in parts[:-1]] +
+                 [(0, parts[-1].lower(), parts[-1])])
 
 
 def filter_files_by_extension(files: List[FileModel], extensions: List[str] = None) -> List[FileModel]:
@@ -112,8 +247,52 @@ def rename_file(file_model: FileModel, new_name: str, keep_extension: bool = Tru
         # Update file model
         file_model.path = dest_path
         file_model.name = new_name
+        file_model.relative_path = os.path.join(
+            os.path.dirname(file_model.relative_path), new_name)
 
         return True
     except Exception as e:
         print(f"Error renaming file: {str(e)}")
         return False
+
+
+def sniff_csv_format(file_path: str, block_size: int = 64 * 1024) -> Tuple[str, str]:
+    """
+    Guess the encoding and delimiter of a CSV/TSV file
+
+    Only the first block of the file is read.
+
+    Args:
+        file_path: Path to the file
+        block_size: Number of bytes to sniff
+
+    Returns:
+        Tuple of (encoding, delimiter)
+    """
+    with open(file_path, 'rb') as f:
+        block = f.read(block_size)
+
+    encoding = 'latin-1'
+    text = block.decode(encoding)
+    for candidate in ('utf-8-sig', 'cp1252'):
+        try:
+            text = block.decode(candidate)
+        except UnicodeDecodeError as e:
+            # The block may end in the middle of a multi-byte character
+            if candidate != 'utf-8-sig' or e.start < len(block) - 3:
+                continue
+            text = block[:e.start].decode(candidate)
+        encoding = candidate
+        break
+
+    # Drop the last line, which may be cut off
+    if len(block) == block_size and '\n' in text:
+        text = text[:text.rindex('\n')]
+
+    default = '\t' if file_path.lower().endswith('.tsv') else ','
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=',;\t|').delimiter
+    except csv.Error:
+        delimiter = default
+
+    return encoding, delimiter
@@ -0,0 +1,432 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Live watching of a source folder, with inotify on Linux and polling elsewhere
+"""
+
+import ctypes
+import ctypes.util
+import itertools
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from src.models.file_model import FileModel
+from src.utils.file_utils import iter_directory, matches_patterns, scan_order_key
+from src.utils.scan_index import ScanIndex
+
+# Quiet time after the last event before a batch of changes is delivered,
+# and the longest a change waits while events keep coming, in seconds
+DEBOUNCE_SECONDS = 0.3
+MAX_DELAY_SECONDS = 2.0
+
+# Time between rescans when inotify is not available, in seconds, and how
+# many rescans pass between full ones that also notice files rewritten in
+# place (these leave the directory mtime alone)
+POLL_INTERVAL_SECONDS = 2.0
+FULL_RESCAN_POLLS = 15
+
+# inotify event masks (see inotify(7))
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK)
+
+# struct inotify_event: wd, mask, cookie, len, then the name
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify() -> Optional[ctypes.CDLL]:
+    """Load the C library if it provides inotify"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_inotify()
+
+
+def inotify_available() -> bool:
+    """
+    Check whether folders can be watched with inotify
+
+    Returns:
+        True on Linux with a C library that provides inotify
+    """
+    return _libc is not None
+
+
+class FolderWatcher:
+    """Watch a folder and report batches of file changes as they happen"""
+
+    def __init__(self, directory_path: str, on_change: Callable[[Dict[str, list]], None],
+                 files: Sequence[FileModel] = (), recursive: bool = False,
+                 include: Optional[Sequence[str]] = None,
+                 exclude: Optional[Sequence[str]] = None,
+                 max_depth: Optional[int] = None,
+                 use_inotify: Optional[bool] = None):
+        """
+        Initialize a folder watcher
+
+        Changes are collected on a background thread and delivered in
+        batches once events stop for DEBOUNCE_SECONDS (or after at most
+        MAX_DELAY_SECONDS). Each batch is a delta with "added" and
+        "modified" (lists of FileModel objects), "removed" (list of
+        relative paths) and "renamed" (list of (old relative path,
+        FileModel) tuples), like ScanIndex.scan() returns plus renames.
+        A file created and deleted within one batch is not reported.
+
+        on_change is called on the watcher thread; UI code should hand the
+        delta over to its own thread (e.g. through a queue polled with
+        root.after).
+
+        Args:
+            directory_path: Folder to watch
+            on_change: Called with each batch of changes
+            files: Files already known to be in the folder (e.g. from the
+                   last scan), so that they are not reported as added
+            recursive: Whether to watch subdirectories as well
+            include: Glob patterns a file's name or relative path must match
+                     (optional; all files if omitted)
+            exclude: Glob patterns of files and directories to ignore
+            max_depth: Deepest subdirectory level to watch in recursive
+                       mode (0 is the folder itself), or None for no limit
+            use_inotify: Force inotify (True) or polling (False); by default
+                         inotify is used where available
+        """
+        self.directory_path = str(directory_path)
+        self.on_change = on_change
+        self.recursive = recursive
+        self.include = list(include) if include else None
+        self.exclude = list(exclude) if exclude else None
+        self.max_depth = max_depth if recursive else 0
+        self.use_inotify = inotify_available() if use_inotify is None else use_inotify
+
+        # relative path -> (size, mtime) of every file in the folder
+        self._known: Dict[str, Tuple[int, float]] = {
+            file.relative_path: (file.size, file.mod_time) for file in files}
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # inotify state: descriptor, wake-up pipe and watched directories
+        self._fd = -1
+        self._wake: Optional[Tuple[int, int]] = None
+        self._watches: Dict[int, str] = {}
+
+    @property
+    def polling(self) -> bool:
+        """Whether changes are found by polling instead of inotify"""
+        return not self.use_inotify
+
+    def start(self) -> None:
+        """Start watching on a background thread"""
+        if self._thread is not None:
+            return
+
+        if self.use_inotify:
+            self._fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)  # type: ignore
+            if self._fd < 0:
+                # Out of inotify instances, for example
+                self.use_inotify = False
+            else:
+                self._wake = os.pipe()
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch_inotify if self.use_inotify else self._watch_polling,
+            daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and wait for the background thread to finish"""
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        if self._wake is not None:
+            os.write(self._wake[1], b"\0")
+        self._thread.join()
+        self._thread = None
+
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        if self._wake is not None:
+            os.close(self._wake[0])
+            os.close(self._wake[1])
+            self._wake = None
+        self._watches = {}
+
+    def _watch_polling(self) -> None:
+        """Find changes by rescanning the folder incrementally"""
+        try:
+            index = ScanIndex(self.directory_path, recursive=self.recursive,
+                              include=self.include, exclude=self.exclude,
+                              max_depth=self.max_depth, persistent=False)
+            index.scan()
+        except Exception as e:
+            print(f"Error watching folder: {str(e)}")
+            return
+
+        try:
+            # Catch up with changes made since the known files were scanned
+            files = index.files()
+            current = {file.relative_path: file for file in files}
+            delta: Dict[str, list] = {
+                "added": [file for file in files if file.relative_path not in self._known],
+                "removed": sorted((path for path in self._known if path not in current),
+                                  key=scan_order_key),
+                "modified": [file for file in files if file.relative_path in self._known and
+                             self._known[file.relative_path] != (file.size, file.mod_time)],
+                "renamed": []}
+
+            for poll in itertools.count(1):
+                if any(delta.values()):
+                    self.on_change(delta)
+                if self._stop.wait(POLL_INTERVAL_SECONDS):
+                    return
+                delta = index.scan(full=poll % FULL_RESCAN_POLLS == 0)
+                delta["renamed"] = []
+        except Exception as e:
+            print(f"Error watching folder: {str(e)}")
+        finally:
+            index.close()
+
+    def _watch_inotify(self) -> None:
+        """Collect inotify events and deliver them in debounced batches"""
+        try:
+            self._add_watches("")
+        except OSError as e:
+            print(f"Error watching folder: {str(e)}")
+            return
+
+        # Paths touched since the last batch, and pending moves by cookie
+        dirty: Set[str] = set()
+        moves: Dict[int, List[Optional[str]]] = {}
+        first_event = last_event = 0.0
+        rescan = False
+
+        while not self._stop.is_set():
+            timeout = None
+            if dirty or rescan:
+                now = time.monotonic()
+                timeout = max(0.0, min(last_event + DEBOUNCE_SECONDS,
+                                       first_event + MAX_DELAY_SECONDS) - now)
+
+            readable, _, _ = select.select([self._fd, self._wake[0]], [], [],  # type: ignore
+                                           timeout)
+            if self._stop.is_set():
+                break
+
+            if self._fd in readable:
+                try:
+                    events = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    events = b""
+
+                if events:
+                    now = time.monotonic()
+                    if not dirty and not rescan:
+                        first_event = now
+                    last_event = now
+                    rescan = self._read_events(events, dirty, moves) or rescan
+                continue
+
+            # Quiet long enough (or waited too long): deliver the batch
+            delta = self._build_delta(dirty, moves, rescan)
+            dirty = set()
+            moves = {}
+            rescan = False
+            if any(delta.values()):
+                try:
+                    self.on_change(delta)
+                except Exception as e:
+                    print(f"Error handling folder changes: {str(e)}")
+
+    def _read_events(self, events: bytes, dirty: Set[str],
+                     moves: Dict[int, List[Optional[str]]]) -> bool:
+        """
+        Record the paths touched by a buffer of inotify events
+
+        Returns:
+            True if events were lost and the folder must be rescanned
+        """
+        rescan = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(events):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(events, offset)
+            name = os.fsdecode(events[offset + _EVENT_HEADER.size:
+                                      offset + _EVENT_HEADER.size + length].rstrip(b"\0"))
+            offset += _EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if directory == "":
+                    # The folder itself is gone; every file goes with it
+                    dirty.update(self._known)
+                continue
+
+            relative_path = os.path.join(directory, name) if directory else name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Watch the new directory first, then take in what it
+                    # already holds
+                    if self._watches_directory(relative_path):
+                        self._add_watches(relative_path)
+                        dirty.update(os.path.join(relative_path, file.relative_path)
+                                     for file in iter_directory(
+                            os.path.join(self.directory_path, relative_path),
+                            self.include, self.exclude, self._remaining_depth(relative_path),
+                            workers=1))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._remove_watches(relative_path)
+                    prefix = relative_path + os.sep
+                    dirty.update(path for path in self._known if path.startswith(prefix))
+                continue
+
+            dirty.add(relative_path)
+            if mask & (IN_MOVED_FROM | IN_MOVED_TO):
+                pair = moves.setdefault(cookie, [None, None])
+                pair[0 if mask & IN_MOVED_FROM else 1] = relative_path
+
+        return rescan
+
+    def _build_delta(self, dirty: Set[str], moves: Dict[int, List[Optional[str]]],
+                     rescan: bool) -> Dict[str, list]:
+        """Compare the touched paths with the known files and update them"""
+        if rescan:
+            dirty = set(self._known)
+            dirty.update(file.relative_path for file in iter_directory(
+                self.directory_path, self.include, self.exclude, self.max_depth, workers=1))
+
+        added: Dict[str, FileModel] = {}
+        removed: Set[str] = set()
+        modified = []
+        for relative_path in dirty:
+            file_model = self._stat_file(relative_path)
+            known = self._known.get(relative_path)
+            if file_model is None:
+                if known is not None:
+                    del self._known[relative_path]
+                    removed.add(relative_path)
+                continue
+
+            record = (file_model.size, file_model.mod_time)
+            if known is None:
+                added[relative_path] = file_model
+            elif known != record:
+                modified.append(file_model)
+            self._known[relative_path] = record
+
+        # A move within the folder is a rename if both ends were seen
+        renamed = []
+        for old_path, new_path in moves.values():
+            if old_path in removed and new_path in added:
+                removed.discard(old_path)
+                renamed.append((old_path, added.pop(new_path)))
+
+        order = lambda file: scan_order_key(file.relative_path)  # noqa: E731
+        return {"added": sorted(added.values(), key=order),
+                "removed": sorted(removed, key=scan_order_key),
+                "modified": sorted(modified, key=order),
+                "renamed": sorted(renamed, key=lambda item: order(item[1]))}
+
+    def _stat_file(self, relative_path: str) -> Optional[FileModel]:
+        """Get a FileModel for a watched file, or None if it is not one"""
+        name = os.path.basename(relative_path)
+        if self.exclude and matches_patterns(name, relative_path, self.exclude):
+            return None
+        if self.include and not matches_patterns(name, relative_path, self.include):
+            return None
+
+        path = os.path.join(self.directory_path, relative_path)
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
+        return FileModel(path, file_stat, relative_path)
+
+    def _watches_directory(self, relative_path: str) -> bool:
+        """Check whether a subdirectory is within the watched tree"""
+        if self.max_depth is not None and relative_path.count(os.sep) >= self.max_depth:
+            return False
+        name = os.path.basename(relative_path)
+        return not (self.exclude and matches_patterns(name, relative_path, self.exclude))
+
+    def _remaining_depth(self, relative_path: str) -> Optional[int]:
+        """Depth left below a subdirectory before max_depth is reached"""
+        if self.max_depth is None:
+            return None
+        return self.max_depth - relative_path.count(os.sep) - 1
+
+    def _add_watches(self, relative_path: str) -> None:
+        """Watch a directory and the subdirectories below it"""
+        path = os.path.join(self.directory_path, relative_path)
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)  # type: ignore
+        if wd < 0:
+            error = ctypes.get_errno()
+            if relative_path:
+                # Removed again already, or unreadable
+                return
+            raise OSError(error, os.strerror(error), path)
+        self._watches[wd] = relative_path
+
+        depth = relative_path.count(os.sep) + 1 if relative_path else 0
+        if self.max_depth is not None and depth >= self.max_depth:
+            return
+        try:
+            with os.scandir(path) as entries:
+                subdirectories = [entry.name for entry in entries
+                                  if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return
+
+        for name in subdirectories:
+            child = os.path.join(relative_path, name) if relative_path else name
+            if self._watches_directory(child):
+                self._add_watches(child)
+
+    def _remove_watches(self, relative_path: str) -> None:
+        """Stop watching a directory that moved away, and everything below it"""
+        prefix = relative_path + os.sep
+        for wd, directory in list(self._watches.items()):
+            if directory == relative_path or directory.startswith(prefix):
+                _libc.inotify_rm_watch(self._fd, wd)  # type: ignore
+                del self._watches[wd]
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persistent scan index for incremental folder rescans
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from src.models.file_model import FileModel
+from src.utils.cache_utils import get_cache_dir
+from src.utils.file_utils import DEFAULT_SCAN_WORKERS, matches_patterns, scan_order_key
+
+# Bump when the index database layout changes
+SCAN_INDEX_VERSION = 1
+
+# Directories modified this close to the start of a scan are listed again
+# on the next scan, since a change in the same timestamp tick (up to two
+# seconds on FAT) would not move their mtime
+RACY_MTIME_NS = 2 * 1000 * 1000 * 1000
+
+# On Windows the listing carries each file's size and mtime, so every file
+# is compared by them; elsewhere a file with the same inode is taken as
+# unchanged without a stat call
+_STAT_IS_FREE = os.name == "nt"
+
+# (size, mtime in ns, inode) of a file
+FileRecord = Tuple[int, int, int]
+
+# Subdirectory names of a listed directory, and its files by name with
+# their record and a FileModel if the file is new or changed
+Listing = Tuple[List[str], Dict[str, Tuple[FileRecord, Optional[FileModel]]]]
+
+
+class ScanIndex:
+    """Snapshot of a folder scan kept in SQLite, for incremental rescans"""
+
+    def __init__(self, directory_path: str, index_dir: str = None,  # type: ignore
+                 recursive: bool = False,
+                 include: Optional[Sequence[str]] = None,
+                 exclude: Optional[Sequence[str]] = None,
+                 max_depth: Optional[int] = None,
+                 workers: int = DEFAULT_SCAN_WORKERS,
+                 persistent: bool = True):
+        """
+        Open (or create) the scan index of a folder
+
+        The snapshot records the size, modification time and inode of
+        every file and the modification time of every directory. A rescan
+        stats each directory, but lists only those whose mtime moved, and
+        in those stats only the files that are new or were replaced.
+
+        Files rewritten in place do not change their directory's mtime, so
+        only scan(full=True) notices them.
+
+        Args:
+            directory_path: Folder to scan
+            index_dir: Directory for the index databases (defaults to the
+                       per-user cache directory)
+            recursive: Whether to scan subdirectories as well
+            include: Glob patterns a file's name or relative path must match
+                     (optional; all files if omitted)
+            exclude: Glob patterns of files and directories to skip
+            max_depth: Deepest subdirectory level to scan in recursive mode
+                       (0 is the folder itself), or None for no limit
+            workers: Number of threads checking directories
+            persistent: Whether to keep the snapshot on disk; otherwise it
+                        lives in memory and starts empty
+        """
+        self.directory_path = str(directory_path)
+        self.recursive = recursive
+        self.include = list(include) if include else None
+        self.exclude = list(exclude) if exclude else None
+        self.max_depth = max_depth if recursive else 0
+        self.workers = workers
+
+        self.index_path: Optional[Path] = None
+        if persistent:
+            options = repr((str(Path(directory_path).resolve()), self.include, self.exclude,
+                            self.max_depth, SCAN_INDEX_VERSION))
+            index_dir = Path(index_dir) if index_dir else get_cache_dir("scan_index")
+            index_dir.mkdir(parents=True, exist_ok=True)
+            self.index_path = index_dir / f"{hashlib.sha1(options.encode('utf-8')).hexdigest()}.sqlite"
+
+        # Snapshot: directory -> (mtime in ns, or -1 to list it again),
+        # directory -> names of its subdirectories and files
+        self._directories: Dict[str, int] = {}
+        self._subdirectories: Dict[str, Set[str]] = {}
+        self._files: Dict[str, Dict[str, FileRecord]] = {}
+
+        self.connection = sqlite3.connect(str(self.index_path) if persistent else ":memory:")
+        self._load()
+
+    def close(self) -> None:
+        """Close the index database"""
+        self.connection.close()
+
+    def files(self) -> List[FileModel]:
+        """
+        List the files in the snapshot
+
+        No file is stat'ed; sizes and times are those of the last scan.
+
+        Returns:
+            List of FileModel objects, in the order of iter_directory()
+        """
+        files = []
+        pending = [""]
+        while pending:
+            directory = pending.pop()
+            records = self._files.get(directory, {})
+            for name in sorted(records, key=lambda name: (name.lower(), name)):
+                size, mtime_ns, inode = records[name]
+                relative_path = os.path.join(directory, name) if directory else name
+                # Same float os.stat() would give for st_mtime
+                seconds, nanoseconds = divmod(mtime_ns, 10 ** 9)
+                files.append(FileModel.from_values(
+                    os.path.join(self.directory_path, relative_path), size,
+                    seconds + nanoseconds * 1e-9, relative_path))
+
+            # Depth-first, so the next subdirectory in name order is on top
+            subdirectories = sorted(self._subdirectories.get(directory, ()),
+                                    key=lambda name: (name.lower(), name), reverse=True)
+            pending.extend(os.path.join(directory, name) if directory else name
+                           for name in subdirectories)
+
+        return files
+
+    def scan(self, full: bool = False) -> Dict[str, list]:
+        """
+        Bring the snapshot up to date with the folder
+
+        Args:
+            full: List every directory and stat every file, instead of
+                  skipping directories whose mtime did not change
+
+        Returns:
+            Dictionary with "added" and "modified" (lists of FileModel
+            objects) and "removed" (list of relative paths)
+        """
+        delta: Dict[str, list] = {"added": [], "removed": [], "modified": []}
+        changed_files: Dict[str, Dict[str, Optional[FileRecord]]] = {}
+        changed_directories: Dict[str, Optional[int]] = {}
+        scan_start = time.time_ns()
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            level = [""]
+            depth = 0
+            while level:
+                results = executor.map(
+                    lambda directory: self._check_directory(directory, full), level)
+
+                next_level = []
+                for directory, result in zip(level, results):
+                    if result is None:
+                        # Gone (or unreadable) since its parent was listed
+                        self._remove_directory(directory, delta, changed_files,
+                                               changed_directories)
+                        continue
+
+                    mtime_ns, listing = result
+                    if listing is not None:
+                        self._apply_listing(directory, listing, delta, changed_files,
+                                            changed_directories)
+
+                    # Changes within the racy window may not move the mtime
+                    if mtime_ns >= scan_start - RACY_MTIME_NS:
+                        mtime_ns = -1
+                    if self._directories.get(directory) != mtime_ns:
+                        self._directories[directory] = mtime_ns
+                        changed_directories[directory] = mtime_ns
+
+                    if self.max_depth is None or depth < self.max_depth:
+                        next_level.extend(os.path.join(directory, name) if directory else name
+                                          for name in sorted(self._subdirectories[directory]))
+
+                level = next_level
+                depth += 1
+
+        self._save(changed_files, changed_directories)
+
+        for key in ("added", "modified"):
+            delta[key].sort(key=lambda file: scan_order_key(file.relative_path))
+        delta["removed"].sort(key=scan_order_key)
+        return delta
+
+    def _check_directory(self, directory: str, full: bool) -> Optional[Tuple[int, Optional[Listing]]]:
+        """
+        Stat a directory and list it if it changed; runs in a worker thread
+
+        Args:
+            directory: Directory relative to the scanned folder
+            full: List the directory and stat its files regardless
+
+        Returns:
+            None if the directory cannot be read, otherwise its mtime and
+            its listing, or None in place of the listing if it is unchanged
+        """
+        path = os.path.join(self.directory_path, directory)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        known_mtime = self._directories.get(directory)
+        if not full and known_mtime is not None and known_mtime >= 0 and known_mtime == mtime_ns:
+            return mtime_ns, None
+
+        known_files = self._files.get(directory, {})
+        subdirectories = []
+        files: Dict[str, Tuple[FileRecord, Optional[FileModel]]] = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    relative_path = os.path.join(directory, entry.name) if directory else entry.name
+                    try:
+                        if self.exclude and matches_patterns(entry.name, relative_path,
+                                                             self.exclude):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.name)
+                            continue
+                        if not entry.is_file() or (self.include and not matches_patterns(
+                                entry.name, relative_path, self.include)):
+                            continue
+
+                        known = known_files.get(entry.name)
+                        if not full and not _STAT_IS_FREE and known is not None and \
+                                known[2] == entry.inode():
+                            files[entry.name] = (known, None)
+                            continue
+
+                        file_stat = entry.stat()
+                        record = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+                        files[entry.name] = (record, None if record == known else
+                                             FileModel(entry.path, file_stat, relative_path))
+                    except OSError:
+                        # Removed or unreadable since it was listed
+                        continue
+        except OSError:
+            return None
+
+        return mtime_ns, (subdirectories, files)
+
+    def _apply_listing(self, directory: str, listing: Listing, delta: Dict[str, list],
+                       changed_files: Dict[str, Dict[str, Optional[FileRecord]]],
+                       changed_directories: Dict[str, Optional[int]]) -> None:
+        """Compare a fresh listing of a directory with the snapshot"""
+        subdirectories, files = listing
+        known_files = self._files.setdefault(directory, {})
+        changes = changed_files.setdefault(directory, {})
+
+        for name in set(known_files) - set(files):
+            del known_files[name]
+            changes[name] = None
+            delta["removed"].append(os.path.join(directory, name) if directory else name)
+
+        for name, (record, file_model) in files.items():
+            if file_model is None:
+                continue
+            delta["modified" if name in known_files else "added"].append(file_model)
+            known_files[name] = record
+            changes[name] = record
+
+        known_subdirectories = self._subdirectories.get(directory, set())
+        for name in known_subdirectories - set(subdirectories):
+            self._remove_directory(os.path.join(directory, name) if directory else name,
+                                   delta, changed_files, changed_directories)
+        self._subdirectories[directory] = set(subdirectories)
+
+    def _remove_directory(self, directory: str, delta: Dict[str, list],
+                          changed_files: Dict[str, Dict[str, Optional[FileRecord]]],
+                          changed_directories: Dict[str, Optional[int]]) -> None:
+        """Drop a directory and everything below it from the snapshot"""
+        for name in self._subdirectories.pop(directory, set()):
+            self._remove_directory(os.path.join(directory, name) if directory else name,
+                                   delta, changed_files, changed_directories)
+
+        changes = changed_files.setdefault(directory, {})
+        for name in self._files.pop(directory, {}):
+            changes[name] = None
+            delta["removed"].append(os.path.join(directory, name) if directory else name)
+
+        if directory in self._directories:
+            del self._directories[directory]
+            changed_directories[directory] = None
+
+        if directory == "":
+            # The scanned folder itself; keep an empty entry to rescan
+            self._subdirectories[directory] = set()
+
+    def _load(self) -> None:
+        """Create the tables if needed and read the snapshot"""
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS directories (
+                    directory TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS files (
+                    directory TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    PRIMARY KEY (directory, name)
+                );
+            """)
+
+        for directory, mtime_ns in self.connection.execute(
+                "SELECT directory, mtime_ns FROM directories"):
+            self._directories[directory] = mtime_ns
+            self._subdirectories.setdefault(directory, set())
+            self._files.setdefault(directory, {})
+            if directory:
+                parent, name = os.path.split(directory)
+                self._subdirectories.setdefault(parent, set()).add(name)
+
+        for directory, name, size, mtime_ns, inode in self.connection.execute(
+                "SELECT directory, name, size, mtime_ns, inode FROM files"):
+            self._files.setdefault(directory, {})[name] = (size, mtime_ns, inode)
+
+    def _save(self, changed_files: Dict[str, Dict[str, Optional[FileRecord]]],
+              changed_directories: Dict[str, Optional[int]]) -> None:
+        """Write the changes of a scan to the database in one transaction"""
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM files WHERE directory = ? AND name = ?",
+                [(directory, name) for directory, changes in changed_files.items()
+                 for name, record in changes.items() if record is None])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                [(directory, name) + record for directory, changes in changed_files.items()
+                 for name, record in changes.items() if record is not None])
+            self.connection.executemany(
+                "DELETE FROM directories WHERE directory = ?",
+                [(directory,) for directory, mtime_ns in changed_directories.items()
+                 if mtime_ns is None])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?)",
+                [(directory, mtime_ns) for directory, mtime_ns in changed_directories.items()
+                 if mtime_ns is not None])
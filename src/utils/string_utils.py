@@ -6,7 +6,44 @@ String utility functions for string operations
 """
 
 import re
-from typing import Optional
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Name normalization steps, each as a (scalar function, Series function)
+# pair. Both forms must give identical results so that filenames and
+# spreadsheet values normalized separately still compare equal.
+NORMALIZATION_STEPS: Dict[str, Tuple[Callable[[str], str], Callable[[Any], Any]]] = {
+    # Ignore letter case
+    "casefold": (
+        lambda value: value.casefold(),
+        lambda series: series.str.casefold()
+    ),
+    # Treat underscores as spaces
+    "underscores": (
+        lambda value: value.replace("_", " "),
+        lambda series: series.str.replace("_", " ", regex=False)
+    ),
+    # Collapse runs of whitespace and trim the ends
+    "whitespace": (
+        lambda value: re.sub(r'\s+', ' ', value).strip(),
+        lambda series: series.str.replace(r'\s+', ' ', regex=True).str.strip()
+    ),
+    # Drop bracketed qualifiers such as "(Draft)" or "[Active]"
+    "qualifiers": (
+        lambda value: re.sub(r'\s*[(\[][^)\]]*[)\]]', '', value),
+        lambda series: series.str.replace(r'\s*[(\[][^)\]]*[)\]]', '', regex=True)
+    ),
+    # Drop a leading "YYYYMMDD - " date prefix
+    "date_prefix": (
+        lambda value: re.sub(r'^\d{8}\s*-\s*', '', value),
+        lambda series: series.str.replace(r'^\d{8}\s*-\s*', '', regex=True)
+    ),
+}
+
+# Steps applied to names unless configured otherwise
+DEFAULT_NORMALIZATION: Tuple[str, ...] = ("casefold", "underscores", "whitespace")
 
 
 def is_valid_filename(filename: str) -> bool:
@@ -42,3 +79,63 @@ def sanitize_filename(filename: str) -> str:
     """
     # Replace invalid characters with underscore
     return re.sub(r'[\\/*?:"<>|]', '_', filename)
+
+
+def format_value(value: Any) -> str:
+    """
+    Render a spreadsheet value as text
+
+    Timestamps at midnight are shown as ISO dates ("2025-06-15"), so date
+    columns stored as datetimes read the same as date strings would.
+
+    Args:
+        value: Cell value
+
+    Returns:
+        Text form of the value
+    """
+    if value is pd.NaT:
+        return str(float("nan"))
+    if isinstance(value, datetime) and value.time() == datetime.min.time():
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def normalize_name(value: str, steps: Sequence[str] = DEFAULT_NORMALIZATION) -> str:
+    """
+    Normalize a name for matching
+
+    Args:
+        value: Name to normalize
+        steps: Names of the NORMALIZATION_STEPS to apply, in order
+
+    Returns:
+        Normalized name
+    """
+    for step in steps:
+        value = NORMALIZATION_STEPS[step][0](value)
+    return value
+
+
+def normalize_series(series: Any, steps: Sequence[str] = DEFAULT_NORMALIZATION) -> Any:
+    """
+    Normalize a pandas Series of names for matching
+
+    Values are converted with str() (format_value() for datetimes) first,
+    then each step is applied to the whole Series at once. The result
+    equals normalize_name() per value.
+
+    Args:
+        series: Series of names
+        steps: Names of the NORMALIZATION_STEPS to apply, in order
+
+    Returns:
+        Series of normalized names with object dtype
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        series = series.astype(object).map(format_value)
+    else:
+        series = series.map(str).astype(object)
+    for step in steps:
+        series = NORMALIZATION_STEPS[step][1](series)
+    return series.astype(object)
@@ -0,0 +1,3 @@
+"""
+Tests for the file sorter models
+"""
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the cache utilities
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.cache_utils import FrameCache
+
+
+def test_frame_cache_stores_text_in_the_space_of_the_text(tmp_path):
+    names = [f"Project {i} – ünïcode" for i in range(2000)]
+    names[5] = "x" * 5000
+    names[7] = np.nan
+    names[8] = ""
+    names[9] = "ends in nul\x00"
+    frame = pd.DataFrame({
+        "ProjectName": pd.Series(names, dtype=object),
+        "Phase": pd.Categorical([f"Phase {i % 3}" for i in range(2000)]),
+        "Budget": np.arange(2000, dtype=np.float64),
+    })
+    cache = FrameCache(tmp_path)
+    cache.store("projects", frame)
+
+    pd.testing.assert_frame_equal(cache.load("projects"), frame)
+    # Fixed width would take rows times the longest value
+    size = sum(file.stat().st_size for file in (tmp_path / "projects").iterdir())
+    assert size < 200_000
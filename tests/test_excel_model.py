@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the Excel data model
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+from src.models.excel_model import INDEX_CACHE_MAX_BYTES, ExcelModel
+
+WORDS = ["Marketing", "Campaign", "Website", "Redesign", "Annual", "Financial", "Audit",
+         "Product", "Launch", "Employee", "Training", "Program", "Cybersecurity", "Upgrade"]
+
+
+def make_model(rows: int) -> ExcelModel:
+    """Build a model over a generated project sheet"""
+    model = ExcelModel()
+    model.data = pd.DataFrame({
+        "ProjectName": [f"{WORDS[i % 14]} {i:06d} {WORDS[i * 5 % 14]} {WORDS[i * 3 % 13]}"
+                        for i in range(rows)],
+        "ClientName": [f"Client {WORDS[i * 7 % 14]} {i % 997:03d} Inc." for i in range(rows)],
+        "ID": [f"PRJ{i:06d}" for i in range(rows)],
+    })
+    model.columns = list(model.data.columns)
+    model.name_column = "ProjectName"
+    return model
+
+
+def test_switching_back_to_a_column_hits_the_index_cache():
+    model = make_model(2000)
+    projects, clients = model.data["ProjectName"], model.data["ClientName"]  # type: ignore
+    assert model.find_match(f"{projects[0]}.pdf")[1] == 0
+    # A miss also builds the partial lookups
+    assert model.find_match("Nothing like it.pdf")[0] is False
+    project_index = model._get_name_index()
+
+    model.name_column = "ClientName"
+    assert model.find_match(f"{clients[1]}.pdf")[1] == 1
+
+    misses = model._index_cache.misses
+    model.name_column = "ProjectName"
+    assert model.find_match(f"{projects[2]}.pdf")[1] == 2
+    assert model.find_match("Still nothing.pdf")[0] is False
+    assert model._index_cache.misses == misses
+    assert model._get_name_index() is project_index
+
+
+def test_prepared_indexes_of_several_columns_fit_the_cache_cap():
+    # Scaled up tenfold, the indexes of a 200k-row sheet must still leave
+    # room for more than one column
+    model = make_model(20000)
+    model.fuzzy_threshold = 0.5
+    for column in ("ProjectName", "ClientName"):
+        model.name_column = column
+        model.prepare_index()
+
+    assert len(model._index_cache) == 2
+    assert model._index_cache.total_cost * 10 < INDEX_CACHE_MAX_BYTES
+
+
+def write_workbook(path, rows) -> str:
+    """Save rows, header first, as the first sheet of a workbook"""
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def test_streaming_load_renames_repeated_headers_like_read_excel(tmp_path):
+    path = write_workbook(tmp_path / "notes.xlsx", [
+        ["Name", "ID", "Notes", "Notes", "Notes.1", None],
+        ["Alpha", "A1", "first", "second", "third", 1],
+        ["Beta", "B1", None, "fourth", "fifth", 2],
+    ])
+    expected = pd.read_excel(path)
+
+    # Progress or cancel selects the streaming reader
+    streamed = ExcelModel()
+    assert streamed.load_data(path, cancel=threading.Event())
+    assert streamed.columns == list(expected.columns)
+    pd.testing.assert_frame_equal(streamed.data, ExcelModel(path).data)
+    assert streamed.find_match("Alpha.pdf")[2] == {
+        "Name": "Alpha", "ID": "A1", "Notes": "first", "Notes.2": "second",
+        "Notes.1": "third", "Unnamed: 5": 1}
+
+    projected = ExcelModel()
+    assert projected.load_data(path, columns=["Notes.2"])
+    assert projected.columns == ["Name", "ID", "Notes.2"]
+    assert projected.get_rows([0, 1]) == [
+        {"Name": "Alpha", "ID": "A1", "Notes.2": "second"},
+        {"Name": "Beta", "ID": "B1", "Notes.2": "fourth"}]
+
+
+def test_streaming_load_drops_formatted_empty_trailing_columns(tmp_path):
+    path = write_workbook(tmp_path / "formatted.xlsx", [
+        ["Name", "ID"], ["Alpha", 1, None, "kept"], ["Beta", 2]])
+    workbook = load_workbook(path)
+    for row in range(1, 6):
+        for column in range(3, 8):
+            workbook.active.cell(row, column).font = Font(bold=True)
+    workbook.save(path)
+
+    streamed = ExcelModel()
+    assert streamed.load_data(path, cancel=threading.Event())
+    assert streamed.columns == list(pd.read_excel(path).columns)
+    assert streamed.columns == ["Name", "ID", "Unnamed: 2", "Unnamed: 3"]
+    pd.testing.assert_frame_equal(streamed.data, ExcelModel(path).data)
+
+
+def test_streaming_load_of_an_empty_sheet_gives_an_empty_frame(tmp_path):
+    path = tmp_path / "empty.xlsx"
+    Workbook().save(path)
+
+    streamed = ExcelModel()
+    assert streamed.load_data(str(path), cancel=threading.Event())
+    assert streamed.columns == []
+    assert len(streamed.data) == 0  # type: ignore
+    assert streamed.find_match("Alpha.pdf") == (False, None, None)
+
+
+def test_streaming_load_matches_read_excel(tmp_path):
+    path = write_workbook(tmp_path / "projects.xlsx", [
+        ["ProjectName", "ID", "Budget", "StartDate", "Status", "Notes"],
+        ["Website Redesign", "PRJ1", 85000, "2025-07-01", "Active", None],
+        ["Annual Audit", "PRJ2", 45000.5, "2025-08-15", "Planning", "late"],
+        [None, None, None, None, None, None],
+        ["Product Launch", "PRJ3", None, "2025-07-20", "Active", 7],
+    ])
+    progress = []
+    streamed = ExcelModel()
+    assert streamed.load_data(path, progress=lambda rows, total: progress.append((rows, total)))
+
+    pd.testing.assert_frame_equal(streamed.data, ExcelModel(path).data)
+    assert progress[-1] == (4, 4)
+
+
+def test_read_excel_load_reports_progress_and_honours_cancel(tmp_path):
+    # Only .xlsx/.xlsm are streamed; read_excel detects the real format
+    path = write_workbook(tmp_path / "legacy.xls", [
+        ["Name", "ID"], ["Alpha", 1], ["Beta", 2]])
+
+    progress, headers = [], []
+    model = ExcelModel()
+    assert model.load_data(path, progress=lambda rows, total: progress.append((rows, total)),
+                           cancel=threading.Event(), on_header=headers.append)
+    assert progress == [(2, 2)]
+    assert headers == [["Name", "ID"]]
+
+    cancel = threading.Event()
+    cancel.set()
+    cancelled = ExcelModel()
+    assert not cancelled.load_data(path, cancel=cancel)
+    assert cancelled.data is None
+
+
+def test_reload_keeps_rows_when_a_blank_cell_turns_an_int_column_to_float(tmp_path):
+    path = tmp_path / "jobs.csv"
+    rows = [{"ProjectName": f"Job {i}", "Job": 1000 + i, "Hours": i * 8} for i in range(10)]
+    pd.DataFrame(rows).to_csv(path, index=False)
+    model = ExcelModel(str(path))
+    assert model.data["Hours"].dtype == np.int64  # type: ignore
+    assert model.find_match("Job 3.pdf")[1] == 3
+    name_index = model._get_name_index()
+
+    # The inserted row has no hours, so Hours is read as float
+    rows.insert(5, {"ProjectName": "Job new", "Job": 2000, "Hours": None})
+    pd.DataFrame(rows).to_csv(path, index=False)
+    assert model.reload() == {"kept": 10, "inserted": 1, "deleted": 0}
+    assert model.data["Hours"].dtype == np.float64  # type: ignore
+    assert model._get_name_index() is name_index
+    assert model.find_match("Job 7.pdf")[1] == 8
+
+    # The same change in the name column renders the kept names differently
+    model.name_column = "Job"
+    model._get_name_index()
+    rows[0]["Job"] = None
+    pd.DataFrame(rows).to_csv(path, index=False)
+    assert model.reload() == {"kept": 0, "inserted": 11, "deleted": 11}
+    assert model._get_normalized_names().tolist() == \
+        ExcelModel(str(path))._get_normalized_names("Job").tolist()
+
+
+def test_chunked_load_indexes_names_as_the_final_column_renders_them(tmp_path):
+    # The first chunk reads the numbers as int, the blank in the second
+    # makes the whole column float
+    path = write_workbook(tmp_path / "jobs.xlsx", [
+        ["Job", "Client"], [1, "A"], [2, "B"], [3, "C"], [None, "D"], [5, "E"]])
+    streamed = ExcelModel()
+    streamed.name_column = "Job"
+    assert streamed.load_data(path, chunk_size=3, cancel=threading.Event())
+    pd.testing.assert_frame_equal(streamed.data, ExcelModel(path).data)
+
+    names = streamed._get_normalized_names().tolist()
+    assert names == ["1.0", "2.0", "3.0", "nan", "5.0"]
+    assert streamed._get_name_index().find_exact("2.0") == [1]
+    assert streamed.find_match("1.0.pdf")[1] == 0
+
+
+UNGUARDED_SCRIPT = """
+import pandas as pd
+from src.models.excel_model import ExcelModel
+from src.models.file_model import FileModel
+
+model = ExcelModel()
+model.data = pd.DataFrame({"ProjectName": ["Website Redesign", "Annual Audit"]})
+model.columns = ["ProjectName"]
+model.name_column = "ProjectName"
+files = [FileModel(name) for name in ["Redesign.pdf", "Audit.pdf", "Other.pdf"]]
+print(model.match_all(files, workers=2)["row_index"].tolist())
+"""
+
+
+def test_parallel_match_all_falls_back_when_workers_cannot_start(tmp_path):
+    # Without a __main__ guard every worker reruns the script and dies
+    script = tmp_path / "unguarded.py"
+    script.write_text(UNGUARDED_SCRIPT)
+    for name in ["Redesign.pdf", "Audit.pdf", "Other.pdf"]:
+        (tmp_path / name).write_text(name)
+
+    root = str(Path(__file__).resolve().parents[1])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    result = subprocess.run([sys.executable, str(script)], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == "[0, 1, <NA>]"
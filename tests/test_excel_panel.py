@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the Excel panel
+"""
+
+import tkinter as tk
+
+import pandas as pd
+import pytest
+
+from src.models.excel_model import ExcelModel
+from src.ui.excel_panel import ExcelPanel
+
+
+@pytest.fixture
+def root():
+    """Hidden Tk root window, skipping the test where there is no display"""
+    try:
+        window = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    window.withdraw()
+    yield window
+    window.destroy()
+
+
+def test_reload_through_the_panel_keeps_cached_matches(root, tmp_path):
+    path = tmp_path / "jobs.csv"
+    rows = [{"ProjectName": f"Job {i}", "ID": f"J{i}"} for i in range(10)]
+    pd.DataFrame(rows).to_csv(path, index=False)
+    model = ExcelModel(str(path))
+    panel = ExcelPanel(root)
+    panel.set_model(model)
+    assert panel.find_match_for_filename("Job 3.pdf")[0]
+    assert len(model.match_cache) == 1
+
+    # What MainWindow does with an "updated" message from the reload worker
+    rows.append({"ProjectName": "Job new", "ID": "J10"})
+    pd.DataFrame(rows).to_csv(path, index=False)
+    model.apply_latest(model.load_latest())  # type: ignore
+    panel.set_model(model)
+
+    assert len(model.match_cache) == 1
+    hits = model.match_cache.hits
+    assert panel.find_match_for_filename("Job 3.pdf")[0]
+    assert model.match_cache.hits == hits + 1
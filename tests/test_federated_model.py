@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the federated Excel model
+"""
+
+import pandas as pd
+
+from src.models.federated_model import FederatedExcelModel
+
+
+def write_csv(path, start: int, rows: int) -> str:
+    """Write a project list with a low-cardinality category column"""
+    pd.DataFrame({
+        "ProjectName": [f"Project {i:05d}" for i in range(start, start + rows)],
+        "ID": range(start, start + rows),
+        "Phase": [f"Phase {i % 3}" for i in range(start, start + rows)],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_add_sheet_keeps_the_loaded_rows_and_their_dtypes(tmp_path):
+    first = write_csv(tmp_path / "first.csv", 0, 40)
+    second = write_csv(tmp_path / "second.csv", 40, 20)
+    model = FederatedExcelModel()
+    assert model.load_files([first])
+    loaded = model.data.copy()  # type: ignore
+    assert model.find_match("Project 00003.pdf")[1] == 3
+
+    assert model.add_sheet(second)
+    data = model.data
+    assert len(data) == 60  # type: ignore
+    # Sheet columns are copied as they are; categories of the source columns grow
+    columns = ["ProjectName", "ID", "Phase"]
+    pd.testing.assert_frame_equal(data[columns].iloc[:40], loaded[columns])  # type: ignore
+    assert isinstance(data["Phase"].dtype, pd.CategoricalDtype)  # type: ignore
+    assert data["Source File"].iloc[:40].astype(str).tolist() == [first] * 40  # type: ignore
+    assert model.sources == [(first, "first"), (second, "second")]
+    assert model.get_source(45) == (second, "second")
+    assert model.find_match("Project 00045.pdf")[1] == 45
+
+
+def test_load_files_reads_unchanged_files_from_the_frame_cache(tmp_path, monkeypatch):
+    files = [write_csv(tmp_path / "first.csv", 0, 40), write_csv(tmp_path / "second.csv", 40, 20)]
+    model = FederatedExcelModel(cache_dir=str(tmp_path / "cache"))
+    assert model.load_files(files)
+
+    def parse(*args, **kwargs):
+        raise AssertionError("parsed a cached file")
+
+    cached = FederatedExcelModel(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(cached, "_read_sheets", parse)
+    assert cached.load_files(files)
+    pd.testing.assert_frame_equal(cached.data, model.data)  # type: ignore
+    assert cached.sources == model.sources
+
+
+def test_add_sheet_rebuilds_the_name_index_when_the_name_column_changes_dtype(tmp_path):
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    pd.DataFrame({"Job": [1, 2, 3], "Client": ["A", "B", "C"]}).to_csv(first, index=False)
+    pd.DataFrame({"Job": [None, 5], "Client": ["D", "E"]}).to_csv(second, index=False)
+    model = FederatedExcelModel()
+    assert model.load_files([str(first)])
+    model.name_column = "Job"
+    assert model.find_match("2.pdf")[1] == 1
+
+    # The blank makes the stacked column float, so "2" is now "2.0"
+    assert model.add_sheet(str(second))
+    assert model._get_normalized_names().tolist() == ["1.0", "2.0", "3.0", "nan", "5.0"]
+    assert model.find_match("2.0.pdf")[1] == 1
+    assert model.find_match("5.0.pdf")[1] == 4
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the file utilities
+"""
+
+import os
+
+from src.utils.file_utils import iter_directory, sniff_csv_format
+
+
+def make_tree(root) -> None:
+    """Create a small folder tree of reports, drafts and scratch files"""
+    for relative in ["b.pdf", "A.pdf", "notes.txt", "2025/q1.pdf", "2025/q1.txt",
+                     "2025/drafts/q2.pdf", "tmp/scratch.pdf", "2025/tmp/old.pdf"]:
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relative)
+
+
+def test_iter_directory_applies_globs_and_depth_in_a_stable_order(tmp_path):
+    make_tree(tmp_path)
+
+    def scan(**kwargs):
+        return [file.relative_path.replace(os.sep, "/")
+                for file in iter_directory(str(tmp_path), workers=4, **kwargs)]
+
+    # A directory's files by name, then each subdirectory
+    assert scan() == ["A.pdf", "b.pdf", "notes.txt", "2025/q1.pdf", "2025/q1.txt",
+                      "2025/drafts/q2.pdf", "2025/tmp/old.pdf", "tmp/scratch.pdf"]
+    assert scan(include=["*.pdf"], exclude=["tmp"]) == [
+        "A.pdf", "b.pdf", "2025/q1.pdf", "2025/drafts/q2.pdf"]
+    # Patterns also match the relative path; excluding a path prunes only that folder
+    assert scan(include=["2025/*"], exclude=["2025/drafts"]) == [
+        "2025/q1.pdf", "2025/q1.txt", "2025/tmp/old.pdf"]
+    assert scan(include=["*.pdf"], max_depth=1) == ["A.pdf", "b.pdf", "2025/q1.pdf",
+                                                    "tmp/scratch.pdf"]
+
+
+def test_sniff_csv_format_detects_encoding_and_delimiter(tmp_path):
+    semicolons = tmp_path / "export.csv"
+    semicolons.write_bytes("Name;Client\nCafé Relaunch;Müller AG\n".encode("utf-8-sig"))
+    assert sniff_csv_format(str(semicolons)) == ("utf-8-sig", ";")
+
+    windows = tmp_path / "windows.csv"
+    windows.write_bytes("Name|Budget\nCafé Relaunch|€ 1000\n".encode("cp1252"))
+    assert sniff_csv_format(str(windows)) == ("cp1252", "|")
+
+    # A block ending inside a character is still UTF-8
+    cut = tmp_path / "cut.csv"
+    cut.write_bytes("Name,ID\n".encode() + "Überprüfung,1\n".encode() * 10)
+    assert sniff_csv_format(str(cut), block_size=9) == ("utf-8-sig", ",")
+
+    # One column gives the sniffer nothing to go on
+    single = tmp_path / "names.tsv"
+    single.write_text("Name\nAlpha\nBeta\n")
+    assert sniff_csv_format(str(single)) == ("utf-8-sig", "\t")
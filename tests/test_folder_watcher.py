@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the folder watcher
+"""
+
+import os
+import queue
+
+import pytest
+
+import src.utils.folder_watcher as folder_watcher
+from src.utils.file_utils import scan_directory
+from src.utils.folder_watcher import FolderWatcher, inotify_available
+
+
+def paths(delta):
+    """Summarize a delta by relative paths"""
+    return {"added": [file.relative_path for file in delta["added"]],
+            "removed": delta["removed"],
+            "modified": [file.relative_path for file in delta["modified"]],
+            "renamed": [(old, file.relative_path) for old, file in delta["renamed"]]}
+
+
+def make_folder(tmp_path):
+    """Create a watched folder with two files and a subfolder"""
+    folder = tmp_path / "folder"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "a.pdf").write_text("a")
+    (folder / "sub" / "b.pdf").write_text("b")
+    return folder
+
+
+@pytest.mark.skipif(not inotify_available(), reason="needs inotify")
+def test_inotify_reports_moves_within_the_folder_as_renames(tmp_path):
+    folder = make_folder(tmp_path)
+    changes = queue.Queue()
+    watcher = FolderWatcher(str(folder), changes.put,
+                            files=scan_directory(str(folder), recursive=True), recursive=True)
+    watcher.start()
+    try:
+        os.rename(folder / "a.pdf", folder / "sub" / "renamed.pdf")
+        (folder / "c.pdf").write_text("c")
+        # Moved out of the watched folder: only the old end is seen
+        os.rename(folder / "sub" / "b.pdf", tmp_path / "b.pdf")
+
+        delta = paths(changes.get(timeout=10))
+    finally:
+        watcher.stop()
+
+    assert not watcher.polling
+    assert delta == {"added": ["c.pdf"], "removed": [os.path.join("sub", "b.pdf")],
+                     "modified": [], "renamed": [("a.pdf", os.path.join("sub", "renamed.pdf"))]}
+
+
+def test_polling_catches_up_and_then_reports_each_rescan(tmp_path, monkeypatch):
+    monkeypatch.setattr(folder_watcher, "POLL_INTERVAL_SECONDS", 0.05)
+    folder = make_folder(tmp_path)
+    files = scan_directory(str(folder), recursive=True)
+    # Changed after the scan the watcher starts from
+    (folder / "a.pdf").unlink()
+    (folder / "new.pdf").write_text("new")
+
+    changes = queue.Queue()
+    watcher = FolderWatcher(str(folder), changes.put, files=files, recursive=True,
+                            use_inotify=False)
+    watcher.start()
+    try:
+        assert paths(changes.get(timeout=10)) == {
+            "added": ["new.pdf"], "removed": ["a.pdf"], "modified": [], "renamed": []}
+
+        # Without inotify a rename is a removal and an addition
+        os.rename(folder / "sub" / "b.pdf", folder / "sub" / "c.pdf")
+        delta = paths(changes.get(timeout=10))
+    finally:
+        watcher.stop()
+
+    assert watcher.polling
+    assert delta == {"added": [os.path.join("sub", "c.pdf")],
+                     "removed": [os.path.join("sub", "b.pdf")], "modified": [], "renamed": []}
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the background Excel load of the main window, without a display
+"""
+
+import queue
+import threading
+
+from openpyxl import Workbook
+
+from src.models.excel_model import ExcelModel
+from src.ui.main_window import EXCEL_LOAD_POLL_MS, MainWindow
+
+
+class Recorder:
+    """Stands in for a widget, recording the calls made to it"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+
+class Variable:
+    """Stands in for a Tk StringVar"""
+
+    def __init__(self):
+        self.value = ""
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def make_window() -> MainWindow:
+    """Build a main window whose widgets are recorders, without Tk"""
+    window = MainWindow.__new__(MainWindow)
+    window.root = Recorder()
+    window.status_var = Variable()
+    window.load_excel_button = Recorder()
+    window.cancel_load_button = Recorder()
+    window.pattern_builder = Recorder()
+    window.excel_panel = Recorder()
+    window._excel_load_queue = queue.Queue()
+    window._excel_load_cancel = threading.Event()
+    return window
+
+
+def write_workbook(path, rows: int) -> str:
+    """Save a project sheet with the given number of rows"""
+    workbook = Workbook()
+    workbook.active.append(["ProjectName", "ID"])
+    for i in range(rows):
+        workbook.active.append([f"Project {i}", f"PRJ{i}"])
+    workbook.save(path)
+    return str(path)
+
+
+def run_worker(window: MainWindow, path: str) -> None:
+    """Run the load worker on a thread, as load_excel_data does, and wait for it"""
+    worker = threading.Thread(target=window._load_excel_worker, args=(
+        ExcelModel(), path, window._excel_load_queue, window._excel_load_cancel))
+    worker.start()
+    worker.join(timeout=60)
+
+
+def test_worker_messages_are_applied_by_the_poll(tmp_path):
+    path = write_workbook(tmp_path / "projects.xlsx", 30)
+    window = make_window()
+
+    # Nothing posted yet: the poll only reschedules itself
+    window._poll_excel_load()
+    assert window.root.calls == [("after", (EXCEL_LOAD_POLL_MS, window._poll_excel_load), {})]
+
+    run_worker(window, path)
+    window._poll_excel_load()
+
+    assert window.status_var.get().startswith("Loaded 30 rows from Excel")
+    (name, (model,), _), = window.excel_panel.calls
+    assert name == "set_model" and model.find_match("Project 7.pdf")[1] == 7
+    # Columns as soon as the header is read, then again with the data
+    assert window.pattern_builder.calls == [
+        ("set_available_columns", (["ProjectName", "ID"],), {})] * 2
+    assert ("config", (), {"state": "normal"}) in window.load_excel_button.calls
+    assert ("config", (), {"state": "disabled"}) in window.cancel_load_button.calls
+    assert window._excel_load_queue is None and window._excel_load_cancel is None
+    assert len(window.root.calls) == 1
+
+
+def test_cancel_stops_the_worker_and_resets_the_window(tmp_path):
+    path = write_workbook(tmp_path / "projects.xlsx", 30)
+    window = make_window()
+
+    window.cancel_excel_load()
+    assert window.status_var.get() == "Cancelling Excel loading..."
+    run_worker(window, path)
+    window._poll_excel_load()
+
+    assert window.status_var.get() == "Excel loading cancelled"
+    assert window.excel_panel.calls == []
+    assert window._excel_load_queue is None and window._excel_load_cancel is None
+    assert ("config", (), {"state": "normal"}) in window.load_excel_button.calls
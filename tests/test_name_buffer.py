@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the memory-mapped name buffer
+"""
+
+import os
+import pickle
+import random
+
+from src.models.match_index import MatchIndex
+from src.models.name_buffer import NameBuffer
+
+
+def test_partial_matches_equal_the_match_index():
+    rng = random.Random(7)
+    alphabet = "abcé d-ü"
+    values = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+              for _ in range(2000)] + ["", "x" * 300]
+    rng.shuffle(values)
+    queries = ["".join(rng.choice(alphabet + "z") for _ in range(rng.randint(0, 12)))
+               for _ in range(1000)] + ["", "x" * 260, "x" * 300 + "q"]
+
+    name_index, name_buffer = MatchIndex(values), NameBuffer.build(values)
+    assert [name_buffer.find_partial(query) for query in queries] == \
+        [name_index.find_partial(query) for query in queries]
+    assert NameBuffer.build([]).find_partial("a") is None
+
+
+def test_files_take_the_size_of_the_text_and_reopen_from_a_pickle(tmp_path):
+    values = [f"Project {i:05d}" for i in range(5000)]
+    values[3] = "y" * 5000
+    name_buffer = NameBuffer.build(values, str(tmp_path / "names"))
+
+    # Fixed width would take rows times the longest value
+    size = sum(file.stat().st_size for file in (tmp_path / "names").iterdir())
+    assert size < 1_000_000
+
+    reopened = pickle.loads(pickle.dumps(name_buffer))
+    assert reopened.directory == str(tmp_path / "names")
+    assert reopened.find_partial("Project 04321") == 4321
+    assert reopened.find_partial("yyyy") == 3
+    assert reopened.find_partial("Old Project 00007 notes") == 7
+    assert os.path.isdir(tmp_path / "names")
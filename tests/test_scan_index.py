@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the persistent scan index
+"""
+
+import os
+
+from src.utils.scan_index import ScanIndex
+
+
+def test_incremental_scan_finds_new_and_removed_files(tmp_path):
+    folder = tmp_path / "folder"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "a.txt").write_text("a")
+    (folder / "sub" / "b.txt").write_text("b")
+
+    index = ScanIndex(str(folder), index_dir=str(tmp_path / "index"), recursive=True)
+    delta = index.scan()
+    assert [file.relative_path for file in delta["added"]] == ["a.txt", os.path.join("sub", "b.txt")]
+
+    (folder / "c.txt").write_text("c")
+    (folder / "sub" / "b.txt").unlink()
+    delta = index.scan()
+    assert [file.relative_path for file in delta["added"]] == ["c.txt"]
+    assert delta["removed"] == [os.path.join("sub", "b.txt")]
+    assert delta["modified"] == []
+    index.close()
+
+    # The snapshot outlives the index object
+    reopened = ScanIndex(str(folder), index_dir=str(tmp_path / "index"), recursive=True)
+    assert [file.relative_path for file in reopened.files()] == ["a.txt", "c.txt"]
+    reopened.close()
+
+
+def test_full_scan_finds_files_rewritten_in_place(tmp_path):
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    (folder / "a.txt").write_text("a")
+    index = ScanIndex(str(folder), index_dir=str(tmp_path / "index"))
+    index.scan()
+
+    # Same inode, and the directory's mtime does not move
+    with open(folder / "a.txt", "w") as f:
+        f.write("twenty bytes of text")
+
+    delta = index.scan(full=True)
+    assert [(file.relative_path, file.size) for file in delta["modified"]] == [("a.txt", 20)]
+    assert [file.size for file in index.files()] == [20]
+    index.close()
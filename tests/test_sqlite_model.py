@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the SQLite-backed Excel model
+"""
+
+import os
+
+import pandas as pd
+from openpyxl import Workbook
+
+from src.models.excel_model import ExcelModel
+from src.models.file_model import FileModel
+from src.models.sqlite_model import SQLiteExcelModel
+
+
+def write_workbook(path, rows) -> str:
+    """Save rows, header first, as the first sheet of a workbook"""
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def test_matches_agree_with_the_in_memory_model(tmp_path):
+    path = write_workbook(tmp_path / "projects.xlsx", [
+        ["ProjectName", "Manager", "ID", "Budget"],
+        ["Website Redesign", "Sarah Johnson", "PRJ1", 85000],
+        ["Annual Audit", "Michael Brown", "PRJ2", None],
+        ["Annual Audit", "Emily Davis", "PRJ3", 45000.5],
+        ["Product Launch", "Sarah Johnson", "PRJ4", 120000],
+        [None, "Nobody", "PRJ5", 0],
+    ])
+    folder = tmp_path / "files"
+    folder.mkdir()
+    names = ["Website Redesign.pdf", "annual audit.docx", "Product Launch - Final.pdf",
+             "Audit.pdf", "Emily Davis - Annual Audit - Notes.pdf",
+             "Annual Audit - Michael Brown.pdf", "Sarah Johnson - Product Launch.xlsx",
+             "Unrelated.txt", "PRJ4.pdf"]
+    files = []
+    for name in names:
+        (folder / name).write_text(name)
+        files.append(FileModel(folder / name))
+
+    expected = ExcelModel(path)
+    model = SQLiteExcelModel(path, database_dir=str(tmp_path / "databases"))
+    for key_columns in [("ProjectName",), ("ProjectName", "Manager"), ("ID",)]:
+        expected.key_columns = model.key_columns = key_columns
+        pd.testing.assert_frame_equal(model.match_all(files), expected.match_all(files))
+        for name in names:
+            found, idx, row = model.find_match(name)
+            assert (found, idx) == expected.find_match(name)[:2]
+            if found:
+                pd.testing.assert_frame_equal(pd.DataFrame([row]),
+                                              pd.DataFrame(expected.get_rows([idx])))
+
+    expected.key_columns = model.key_columns = ("ProjectName", "Manager")
+    kinds = dict(zip(names, model.match_all(files)["match_kind"]))
+    assert kinds["Emily Davis - Annual Audit - Notes.pdf"] == "composite"
+    assert kinds["Website Redesign.pdf"] == "exact"
+    assert kinds["Audit.pdf"] == "partial"
+    assert kinds["Unrelated.txt"] is None
+    assert model.find_match("Emily Davis - Annual Audit - Notes.pdf")[1] == 2
+    model.close()
+
+
+def test_repeated_and_case_only_different_headers_are_imported(tmp_path):
+    path = write_workbook(tmp_path / "notes.xlsx", [
+        ["Name", "ID", "Notes", "Notes", "notes", "NOTES", None, None],
+        ["Alpha", "A1", "first", "second", "third", "fourth", 1, None],
+        ["Beta", "B1", None, "fifth", "sixth", "seventh", None, None],
+    ])
+
+    model = SQLiteExcelModel(path, database_dir=str(tmp_path / "databases"))
+    expected = ExcelModel(path)
+    assert model.columns == expected.columns
+    assert model.columns == ["Name", "ID", "Notes", "Notes.1", "notes", "NOTES", "Unnamed: 6"]
+    pd.testing.assert_frame_equal(pd.DataFrame(model.get_rows([0, 1])),
+                                  pd.DataFrame(expected.get_rows([0, 1])))
+    model.close()
+
+
+def test_reopening_uses_the_imported_database(tmp_path):
+    path = write_workbook(tmp_path / "projects.xlsx", [
+        ["ProjectName", "ID"], ["Website Redesign", "PRJ1"], ["Annual Audit", "PRJ2"]])
+    databases = tmp_path / "databases"
+    SQLiteExcelModel(path, database_dir=str(databases)).close()
+    imported = list(databases.iterdir())
+
+    def fail(*args, **kwargs):
+        raise AssertionError("imported again")
+
+    reopened = SQLiteExcelModel(database_dir=str(databases))
+    reopened._import = fail  # type: ignore
+    assert reopened.load_data(path)
+    assert list(databases.iterdir()) == imported
+    assert reopened.find_match("Annual Audit.pdf")[2] == {"ProjectName": "Annual Audit",
+                                                          "ID": "PRJ2"}
+    reopened.close()
+
+
+def test_reloading_deletes_the_previous_database(tmp_path):
+    path = tmp_path / "projects.csv"
+    databases = tmp_path / "databases"
+    pd.DataFrame({"ProjectName": ["Website Redesign"], "ID": ["PRJ1"]}).to_csv(path, index=False)
+    model = SQLiteExcelModel(str(path), database_dir=str(databases))
+    previous = list(databases.iterdir())
+
+    pd.DataFrame({"ProjectName": ["Website Redesign", "Annual Audit"],
+                  "ID": ["PRJ1", "PRJ2"]}).to_csv(path, index=False)
+    assert model.apply_latest(model.load_latest()) == {  # type: ignore
+        "kept": 0, "inserted": 2, "deleted": 1}
+    assert not previous[0].exists()
+    assert len(list(databases.iterdir())) == 1
+    assert model.find_match("Annual Audit.pdf")[1] == 1
+    model.close()
+
+
+def test_import_evicts_the_least_recently_used_databases(tmp_path):
+    databases = tmp_path / "databases"
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f"projects{i}.csv")
+        pd.DataFrame({"ProjectName": [f"Project {i}"]}).to_csv(paths[-1], index=False)
+        SQLiteExcelModel(str(paths[-1]), database_dir=str(databases), max_entries=3).close()
+        # Distinct modification times, oldest first
+        for age, database in enumerate(sorted(databases.iterdir(), key=os.path.getmtime)):
+            os.utime(database, (1000 + age, 1000 + age))
+
+    # Opening the first one again makes the second the least recently used
+    SQLiteExcelModel(str(paths[0]), database_dir=str(databases)).close()
+    first = max(databases.iterdir(), key=os.path.getmtime)
+
+    pd.DataFrame({"ProjectName": ["Project 3"]}).to_csv(tmp_path / "projects3.csv", index=False)
+    model = SQLiteExcelModel(str(tmp_path / "projects3.csv"), database_dir=str(databases),
+                             max_entries=3)
+    remaining = set(databases.iterdir())
+    assert len(remaining) == 3
+    assert first in remaining
+    assert model._database_path(model.fingerprint) in remaining
+    model.close()
+
+    # The newest database is kept even beyond the size limit
+    pd.DataFrame({"ProjectName": ["Project 4"]}).to_csv(tmp_path / "projects4.csv", index=False)
+    model = SQLiteExcelModel(str(tmp_path / "projects4.csv"), database_dir=str(databases),
+                             max_bytes=0)
+    assert list(databases.iterdir()) == [model._database_path(model.fingerprint)]
+    model.close()